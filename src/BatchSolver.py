@@ -0,0 +1,300 @@
+# Author: Noe Florence
+# Description: Solves many Sudoku grids in parallel with a pool of worker processes.
+# Each worker builds the deduction rule chain once and reuses it for every grid it receives.
+
+import time
+from collections import Counter
+from itertools import islice
+from multiprocessing import Pool
+
+from DeductionRuleFactory import DeductionRuleFactory
+from DifficultyRater import STALLED_SCORE, score_of
+from ResultsFile import ResultsFile
+from SolutionCache import SolutionCache
+from SudokuGrid import SudokuGrid
+from SudokuSolver import SudokuSolver
+from VectorizedPropagator import VectorizedPropagator
+
+# Rule chain of the current worker process, created once by _init_worker
+_worker_rule_chain = None
+_worker_backend = 'rules'
+_worker_collect_stats = False
+_worker_results = None
+
+
+def _init_worker(backend, collect_stats=False, rule_names=None, adaptive=False, results_path=None):
+    """
+    Initialize a worker process with its own rule chain.
+    Args:
+        backend (str): The backend used when the deduction rules stall.
+        collect_stats (bool): Whether to record per-rule statistics for each grid.
+        rule_names (list): The rules to schedule, in order, or None for the default chain.
+        adaptive (bool): Whether to schedule the rules adaptively; the order learned by a worker
+                         carries over from one grid to the next.
+        results_path (str): Path of the results file the worker writes its results to, or None.
+    """
+    global _worker_rule_chain, _worker_backend, _worker_collect_stats, _worker_results
+    factory = DeductionRuleFactory()
+    if rule_names is None and not adaptive:
+        _worker_rule_chain = factory.create_rules()
+    else:
+        _worker_rule_chain = factory.create_scheduler(rule_names, adaptive)
+    _worker_backend = backend
+    _worker_collect_stats = collect_stats
+    _worker_results = ResultsFile(results_path) if results_path is not None else None
+
+
+def _solve_and_write(task):
+    """
+    Solve a single grid in a worker process and write its result to the worker's results file.
+    Args:
+        task (tuple): See solve_grid.
+    Returns:
+        dict: The result of the grid (see solve_grid).
+    """
+    result = solve_grid(task)
+    _worker_results.write(result)
+    return result
+
+
+def _locate(task):
+    """
+    Find the cache key and transform of a grid in a worker process, canonicalizing it there.
+    Args:
+        task (tuple): The cell values of the grid and the namespace of the results (see SolutionCache.locate).
+    Returns:
+        tuple: The key and the GridTransform of the grid.
+    """
+    values, namespace = task
+    return SolutionCache.locate(values, namespace)
+
+
+def solve_grid(task, rule_chain=None, backend='rules', collect_stats=False):
+    """
+    Solve a single grid without ever prompting the user.
+    Args:
+        task (tuple): The position of the grid in the input, its initial values and the number of steps
+                      of each rule already applied to it, keyed by rule name (or an empty tuple).
+        rule_chain (DeductionRule or RuleScheduler): The rule chain to use, or None for the worker's chain.
+        backend (str): The backend used when the deduction rules stall, if no worker chain is set.
+        collect_stats (bool): Whether to record per-rule statistics, if no worker chain is set.
+    Returns:
+        dict: The index, status ('solved', 'unsolved' or 'invalid'), difficulty, rules used and cells of the grid,
+              plus the per-rule statistics under 'stats' and the score of the solve (see
+              DifficultyRater.rate_grid) under 'score' when the statistics are collected.
+    """
+    index, values, steps = task
+    if rule_chain is None:
+        rule_chain, backend, collect_stats = _worker_rule_chain, _worker_backend, _worker_collect_stats
+    status = 'invalid'
+    difficulty = None
+    rules = []
+    cells = values
+    solver = None
+    try:
+        grid = SudokuGrid(values)
+        cells = grid.cells
+        solver = SudokuSolver(grid, backend, rule_chain, interactive=False, collect_stats=collect_stats)
+        solver.used_rules.update(steps)
+        solver.apply_rules()
+        rules = sorted(solver.used_rules)
+        if grid.is_solved():
+            status = 'solved'
+            difficulty = solver.evaluate_difficulty()
+        else:
+            status = 'unsolved'
+    except ValueError:
+        pass
+    result = {'index': index, 'status': status, 'difficulty': difficulty, 'rules': rules, 'cells': list(cells)}
+    if solver is not None and solver.stats is not None:
+        result['stats'] = solver.stats.as_dict()
+        if status == 'invalid':
+            result['score'] = None
+        elif status == 'unsolved' or solver.exact_cover_used or solver.search_used:
+            result['score'] = STALLED_SCORE
+        else:
+            # The firings of a rule are its steps, after the steps applied before the grid reached this solver
+            steps = Counter(steps)
+            for name, counters in result['stats'].items():
+                steps[name] += counters['firings']
+            result['score'] = score_of(steps)
+    return result
+
+
+class BatchSolver:
+    """
+    Spreads the solving of many grids across a multiprocessing worker pool.
+    """
+
+    def __init__(self, backend='rules', processes=None, chunksize=64, vectorized=False, block_size=4096,
+                 collect_stats=False, rule_names=None, adaptive=False, cache=None, results=None,
+                 checkpoint_interval=1.0):
+        """
+        Initialize the BatchSolver.
+        Args:
+            backend (str): The backend used when the deduction rules stall, one of SudokuSolver.BACKENDS.
+                           With 'rules', grids the rules cannot finish are reported as 'unsolved'; 'parallel'
+                           is not supported, the grids being already solved in parallel.
+            processes (int): The number of worker processes, or None for one per CPU.
+            chunksize (int): The number of grids sent to a worker at once.
+            vectorized (bool): Whether to run the singles on blocks of grids with VectorizedPropagator
+                               first, and only send the grids it cannot finish to the workers.
+            block_size (int): The number of grids propagated together in vectorized mode.
+            collect_stats (bool): Whether to add the per-rule statistics of each grid solved by the workers.
+            rule_names (list): The rules the workers schedule, in order, or None for the default chain.
+            adaptive (bool): Whether the workers reorder the rules from their observed hit rate and cost.
+            cache (SolutionCache): The cache of results to reuse for grids equal up to symmetry to grids
+                                   already solved with the same settings, or None to solve every grid.
+            results (ResultsFile): The results file of the run, or None. The workers write the records of the
+                                   grids they solve in place, this process those of the other grids; grids
+                                   already done in the file are skipped, and the statistics are always
+                                   collected, the records holding them.
+            checkpoint_interval (float): The number of seconds between two checkpoints of the results file.
+        Raises:
+            ValueError: If the backend or a rule name is unknown.
+        """
+        if backend not in SudokuSolver.BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {', '.join(SudokuSolver.BACKENDS)}.")
+        if backend == 'parallel':
+            raise ValueError("The parallel backend spreads one grid over every core, use 'search' for many grids.")
+        self.backend = backend
+        self.processes = processes
+        self.chunksize = chunksize
+        self.vectorized = vectorized
+        self.block_size = block_size
+        self.collect_stats = collect_stats or results is not None
+        if rule_names is not None:
+            for name in rule_names:
+                DeductionRuleFactory.create_rule(name)
+        self.rule_names = rule_names
+        self.adaptive = adaptive
+        self.cache = cache
+        self.results = results
+        self.checkpoint_interval = checkpoint_interval
+        # Results depend on the backend and the rules, so each setting has its own keys in the cache
+        self.namespace = SolutionCache.namespace_of(backend, rule_names, adaptive)
+
+    def solve(self, grids):
+        """
+        Solve the grids in parallel.
+        Args:
+            grids (iterable): Lists of cell values, with -1 for empty cells.
+        Yields:
+            dict: One result per grid, in input order (see solve_grid); with a results file, one per grid
+                  not done yet. A grid is marked done in the file at the first checkpoint after its result
+                  is yielded, and at the latest when the iteration ends or is interrupted.
+        """
+        tasks = enumerate(grids)
+        results_path = None
+        if self.results is not None:
+            tasks = ((index, values) for index, values in tasks if not self.results.is_done(index))
+            results_path = self.results.path
+        done = []
+        last_checkpoint = time.monotonic()
+        with Pool(self.processes, _init_worker,
+                  (self.backend, self.collect_stats, self.rule_names, self.adaptive, results_path)) as pool:
+            if not self.vectorized and self.cache is None:
+                solve = solve_grid if self.results is None else _solve_and_write
+                results = pool.imap(solve, ((index, values, ()) for index, values in tasks), self.chunksize)
+            else:
+                results = self._solve_blocks(pool, tasks)
+            try:
+                for result in results:
+                    if self.results is not None:
+                        done.append(result['index'])
+                        if time.monotonic() - last_checkpoint >= self.checkpoint_interval:
+                            self.results.checkpoint(done)
+                            done = []
+                            last_checkpoint = time.monotonic()
+                    yield result
+            finally:
+                if done:
+                    self.results.checkpoint(done)
+
+    def _solve_blocks(self, pool, tasks):
+        """
+        Solve the grids block by block (see _solve_block).
+        Args:
+            pool (Pool): The worker pool.
+            tasks (iterable): The position of each grid in the input and its cell values.
+        Yields:
+            dict: The result of each grid, in input order.
+        """
+        while True:
+            block = list(islice(tasks, self.block_size))
+            if not block:
+                break
+            yield from self._solve_block(pool, block)
+
+    def _solve_block(self, pool, block):
+        """
+        Solve a block of grids: look them up in the cache, propagate the singles over the others at once
+        in vectorized mode, then finish the remaining ones in the pool.
+        Args:
+            pool (Pool): The worker pool.
+            block (list): The position of each grid of the block in the whole input, and its cell values.
+        Returns:
+            list: The results of the block, in input order.
+        """
+        indices = [index for index, _ in block]
+        block = [values for _, values in block]
+        results = [None] * len(block)
+        missing = range(len(block))
+        duplicates = []
+        if self.cache is not None:
+            # Canonicalizing can take a while on grids with many symmetries, the workers share it
+            frames = pool.map(_locate, [(values, self.namespace) for values in block], self.chunksize)
+            missing = []
+            # Position of the first grid of the block with each missing key, solved once for its duplicates
+            first = {}
+            for k, (key, transform) in enumerate(frames):
+                entry = self.cache.get(key, transform)
+                if entry is not None and self.results is not None and entry.get('score') is None \
+                        and entry['status'] != 'invalid':
+                    # Cached by a run without statistics: solved again, to write the record's score
+                    entry = None
+                if entry is not None:
+                    results[k] = dict(entry, index=indices[k])
+                elif key in first:
+                    duplicates.append(k)
+                else:
+                    first[key] = k
+                    missing.append(k)
+        pending = []
+        if self.vectorized:
+            # The tensor engine only holds 9x9 grids, the other sizes go straight to the pool
+            pending = [(k, block[k], ()) for k in missing if len(block[k]) != 81]
+            missing_9x9 = [k for k in missing if len(block[k]) == 81]
+            if missing_9x9:
+                propagator = VectorizedPropagator([block[k] for k in missing_9x9])
+                propagator.propagate()
+                for j, k in enumerate(missing_9x9):
+                    if propagator.status_name(j) == 'stalled':
+                        pending.append((k, propagator.grid_values(j), propagator.steps(j)))
+                    else:
+                        results[k] = propagator.result(j, indices[k])
+        else:
+            pending = [(k, block[k], ()) for k in missing]
+        solve = solve_grid if self.results is None else _solve_and_write
+        tasks = [(indices[k], values, steps) for k, values, steps in pending]
+        for (k, _, _), result in zip(pending, pool.imap(solve, tasks, self.chunksize)):
+            results[k] = result
+        if self.cache is not None:
+            for k in missing:
+                self.cache.put(*frames[k], results[k])
+            for k in duplicates:
+                key, transform = frames[k]
+                entry = self.cache.get(key, transform)
+                if entry is None:
+                    # Not cached: the cells of the first grid are mapped through the canonical frame
+                    result = results[first[key]]
+                    cells = transform.invert(frames[first[key]][1].apply(result['cells']))
+                    entry = dict(result, cells=cells)
+                results[k] = dict(entry, index=indices[k])
+        if self.results is not None:
+            # The workers wrote the records of the grids they solved, the others are written here
+            solved_by_workers = {k for k, _, _ in pending}
+            for k, result in enumerate(results):
+                if k not in solved_by_workers:
+                    self.results.write(result)
+        return results
@@ -0,0 +1,280 @@
+# Author: Noe Florence
+# Description: Reproducible benchmark of the solver over the example corpus and generated workloads.
+# Reports throughput, p50/p99 latency and peak memory, saves JSON baselines and detects regressions.
+
+import argparse
+import glob
+import io
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+from DeductionRuleFactory import DeductionRuleFactory
+from ExactCoverSolver import ExactCoverSolver
+from Main import parse_input
+from SudokuFacade import SudokuFacade
+from SudokuGrid import SudokuGrid
+from SudokuSolver import SudokuSolver
+
+EXAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'example')
+
+
+def percentile(samples, fraction):
+    """
+    Compute a percentile with the nearest-rank method.
+    Args:
+        samples (list): The sorted samples.
+        fraction (float): The percentile, between 0 and 1.
+    Returns:
+        float: The sample at that percentile.
+    """
+    rank = max(1, int(round(fraction * len(samples) + 0.5)))
+    return samples[min(rank, len(samples)) - 1]
+
+
+def generate_puzzles(count, seed, clues=30):
+    """
+    Generate reproducible puzzles with a unique solution.
+    Args:
+        count (int): The number of puzzles.
+        seed (int): The random seed.
+        clues (int): The number of clues to aim for; clues are kept when removing them breaks uniqueness.
+    Returns:
+        list: Lists of 81 integers, with -1 for empty cells.
+    """
+    rng = random.Random(seed)
+    solver = ExactCoverSolver()
+    puzzles = []
+    for _ in range(count):
+        first_row = list(range(1, 10))
+        rng.shuffle(first_row)
+        solution = solver.solve(SudokuGrid(first_row + [-1] * 72))[0]
+        puzzle = solution[:]
+        order = list(range(81))
+        rng.shuffle(order)
+        filled = 81
+        for index in order:
+            if filled <= clues:
+                break
+            value = puzzle[index]
+            puzzle[index] = -1
+            if len(solver.solve(SudokuGrid(puzzle), 2)) == 1:
+                filled -= 1
+            else:
+                puzzle[index] = value
+        puzzles.append(puzzle)
+    return puzzles
+
+
+class Benchmark:
+    """
+    Times the solver end to end and each deduction rule individually over groups of puzzles.
+    """
+
+    def __init__(self, repeat=5, generated=20, seed=2024):
+        """
+        Initialize the benchmark.
+        Args:
+            repeat (int): The number of timed passes over each group.
+            generated (int): The number of generated puzzles added as the 'generated' group.
+            seed (int): The seed of the generated puzzles.
+        """
+        self.repeat = repeat
+        self.generated = generated
+        self.seed = seed
+
+    def load_corpora(self):
+        """
+        Load the bundled example grids grouped by difficulty, plus the generated workload. Unreadable or
+        inconsistent grids are skipped.
+        Returns:
+            dict: The puzzles of each group, keyed by group name.
+        """
+        corpora = {}
+        for path in sorted(glob.glob(os.path.join(EXAMPLE_DIR, '*.txt'))):
+            # Easy1.txt and Easy2.txt both belong to the 'easy' group
+            group = os.path.splitext(os.path.basename(path))[0].rstrip('0123456789').lower()
+            try:
+                values = parse_input(path)
+                # Grids whose givens contradict each other are left out of every group
+                SudokuGrid(values)
+            except ValueError:
+                continue
+            corpora.setdefault(group, []).append(values)
+        if self.generated:
+            corpora['generated'] = generate_puzzles(self.generated, self.seed)
+        return corpora
+
+    @staticmethod
+    def _targets():
+        """
+        List the timed operations. Each one has an untimed setup, taking the initial values of a puzzle,
+        and a timed run taking the result of the setup.
+        Returns:
+            list: (name, setup, run) tuples.
+        """
+        def facade(values):
+            with redirect_stdout(io.StringIO()):
+                SudokuFacade(values, 'dlx').solve()
+
+        def solver(values):
+            SudokuSolver(SudokuGrid(values), 'dlx', interactive=False).solve()
+
+        def unchanged(values):
+            return values
+
+        targets = [('facade', unchanged, facade), ('solver', unchanged, solver)]
+        rule = DeductionRuleFactory.create_rules()
+        while rule:
+            # Rules are timed alone, on a freshly constructed grid
+            targets.append((rule.__class__.__name__, SudokuGrid, rule.apply))
+            rule = rule.next_rule
+        return targets
+
+    def _measure(self, setup, run, puzzles):
+        """
+        Time an operation over a group of puzzles.
+        Args:
+            setup (callable): The untimed preparation, taking the initial values of a puzzle.
+            run (callable): The timed operation, taking the result of the setup.
+            puzzles (list): The puzzles of the group.
+        Returns:
+            dict: The count, throughput (puzzles/s), p50 and p99 latency (ms) and peak memory (KiB),
+                  computed from the best latency of each puzzle over the repeated passes.
+        """
+        # One untimed pass warms up the caches and the tables built on first use
+        self._run_all(setup, run, puzzles)
+        passes = [self._run_all(setup, run, puzzles) for _ in range(self.repeat)]
+        # The best of the passes for each puzzle filters out the scheduling noise of the machine
+        latencies = sorted(min(samples) for samples in zip(*passes))
+        # Memory is measured in a separate pass, tracing would distort the timings
+        tracemalloc.start()
+        self._run_all(setup, run, puzzles)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        elapsed = sum(latencies)
+        return {
+            'count': len(latencies),
+            'throughput': len(latencies) / elapsed if elapsed else 0.0,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'peak_kib': peak / 1024,
+        }
+
+    @staticmethod
+    def _run_all(setup, run, puzzles):
+        """
+        Run an operation once on each puzzle.
+        Args:
+            setup (callable): The untimed preparation, taking the initial values of a puzzle.
+            run (callable): The timed operation, taking the result of the setup.
+            puzzles (list): The puzzles of the group.
+        Returns:
+            list: The latency of each run, in seconds.
+        """
+        latencies = []
+        for values in puzzles:
+            try:
+                prepared = setup(values)
+            except ValueError:
+                # Grids the setup rejects are never run, so they have no latency
+                continue
+            start = time.perf_counter()
+            try:
+                run(prepared)
+            except ValueError:
+                # Grids found inconsistent while running are timed up to the contradiction
+                pass
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    def run(self):
+        """
+        Run every timed operation over every group.
+        Returns:
+            dict: The measures, keyed by group then operation name.
+        """
+        results = {}
+        for group, puzzles in self.load_corpora().items():
+            results[group] = {name: self._measure(setup, run, puzzles) for name, setup, run in self._targets()}
+        return results
+
+    @staticmethod
+    def compare(baseline, results, threshold):
+        """
+        Find the measures that regressed compared to a baseline.
+        Args:
+            baseline (dict): The measures of a previous run.
+            results (dict): The current measures.
+            threshold (float): The tolerated relative regression (0.2 allows 20%).
+        Returns:
+            list: A description of each regression.
+        """
+        regressions = []
+        for group, targets in results.items():
+            for name, current in targets.items():
+                previous = baseline.get(group, {}).get(name)
+                if previous is None:
+                    continue
+                if current['p50_ms'] > previous['p50_ms'] * (1 + threshold):
+                    regressions.append(f"{group}/{name}: p50 {previous['p50_ms']:.3f} ms -> {current['p50_ms']:.3f} ms")
+                if current['throughput'] < previous['throughput'] / (1 + threshold):
+                    regressions.append(f"{group}/{name}: throughput {previous['throughput']:.1f}/s "
+                                       f"-> {current['throughput']:.1f}/s")
+                if current['peak_kib'] > previous['peak_kib'] * (1 + threshold):
+                    regressions.append(f"{group}/{name}: peak memory {previous['peak_kib']:.1f} KiB "
+                                       f"-> {current['peak_kib']:.1f} KiB")
+        return regressions
+
+
+def print_results(results):
+    """
+    Print the measures as a table.
+    Args:
+        results (dict): The measures, keyed by group then operation name.
+    """
+    print(f"{'group':<14}{'target':<10}{'count':>7}{'puzzles/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'peak KiB':>11}")
+    for group, targets in results.items():
+        for name, measure in targets.items():
+            print(f"{group:<14}{name:<10}{measure['count']:>7}{measure['throughput']:>12.1f}"
+                  f"{measure['p50_ms']:>10.3f}{measure['p99_ms']:>10.3f}{measure['peak_kib']:>11.1f}")
+
+
+def main():
+    """
+    Run the benchmark from the command line.
+    Returns:
+        int: 0 on success, 1 if a regression beyond the threshold was found.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the Sudoku solver.")
+    parser.add_argument('--repeat', type=int, default=5, help="timed passes over each group")
+    parser.add_argument('--generated', type=int, default=20, help="number of generated puzzles (0 to disable)")
+    parser.add_argument('--seed', type=int, default=2024, help="seed of the generated puzzles")
+    parser.add_argument('--save', metavar='FILE', help="save the results as a JSON baseline")
+    parser.add_argument('--compare', metavar='FILE', help="compare the results with a JSON baseline")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="tolerated relative regression when comparing (default: 0.2)")
+    args = parser.parse_args()
+    results = Benchmark(args.repeat, args.generated, args.seed).run()
+    print_results(results)
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = Benchmark.compare(baseline, results, args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            return 1
+        print("No regression beyond the threshold.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
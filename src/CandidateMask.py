@@ -0,0 +1,168 @@
+# Author: Noe Florence
+# Description: Bitmask helpers and lookup tables for the compact candidate representation.
+# Each cell stores its candidates as an int of one bit per digit (9 bits on a 9x9 grid),
+# bit (d - 1) being set when digit d is still possible.
+
+
+class _Memo(dict):
+    """
+    Lookup table computing and keeping each entry on first use, for masks too wide to tabulate up front.
+    """
+
+    def __init__(self, function):
+        super().__init__()
+        self.function = function
+
+    def __missing__(self, mask):
+        value = self[mask] = self.function(mask)
+        return value
+
+
+class MaskTables:
+    """
+    The lookup tables of the candidate masks of one grid size, indexed like tuples.
+    Masks of up to 9 digits are tabulated up front; wider masks (16 or 25 digits) have too many values,
+    so their tables fill in as masks are met.
+    """
+
+    def __init__(self, size):
+        """
+        Build the tables.
+        Args:
+            size (int): The number of digits (4, 9, 16 or 25).
+        """
+        self.size = size
+        self.all_digits = (1 << size) - 1  # Mask with every digit set
+        # bit[d] is the mask of digit d (bit[0] is unused and kept at 0)
+        self.bit = tuple(0 if digit == 0 else 1 << (digit - 1) for digit in range(size + 1))
+        if size <= 9:
+            masks = range(self.all_digits + 1)
+            self.popcount = tuple(map(self._popcount, masks))
+            self.lowest_digit = tuple(map(self._lowest_digit, masks))
+            self.digits = tuple(map(self._digits, masks))
+        else:
+            self.popcount = _Memo(self._popcount)
+            self.lowest_digit = _Memo(self._lowest_digit)
+            self.digits = _Memo(self._digits)
+
+    @staticmethod
+    def _popcount(mask):
+        """
+        Args:
+            mask (int): A candidate mask.
+        Returns:
+            int: The number of candidates in the mask.
+        """
+        return bin(mask).count('1')
+
+    @staticmethod
+    def _lowest_digit(mask):
+        """
+        Args:
+            mask (int): A candidate mask.
+        Returns:
+            int: The smallest digit in the mask (0 for the empty mask).
+        """
+        return (mask & -mask).bit_length()
+
+    @staticmethod
+    def _digits(mask):
+        """
+        Args:
+            mask (int): A candidate mask.
+        Returns:
+            tuple: The ascending tuple of digits in the mask, kept so iterating allocates nothing.
+        """
+        digits = []
+        while mask:
+            lowest = mask & -mask
+            digits.append(lowest.bit_length())
+            mask ^= lowest
+        return tuple(digits)
+
+
+# Tables of each grid size, built on first use by tables_of
+_tables = {}
+
+
+def tables_of(size):
+    """
+    Get the lookup tables of the candidate masks of a grid size, shared by every grid of that size.
+    Args:
+        size (int): The number of digits.
+    Returns:
+        MaskTables: The tables.
+    """
+    tables = _tables.get(size)
+    if tables is None:
+        tables = _tables[size] = MaskTables(size)
+    return tables
+
+
+# Tables of the 9x9 grid
+_TABLES_9 = tables_of(9)
+
+ALL_DIGITS = _TABLES_9.all_digits  # Mask with every digit 1-9 set
+
+# BIT[d] is the mask of digit d (BIT[0] is unused and kept at 0)
+BIT = _TABLES_9.bit
+
+# POPCOUNT[mask] is the number of candidates in the mask
+POPCOUNT = _TABLES_9.popcount
+
+# LOWEST_DIGIT[mask] is the smallest digit in the mask (0 for the empty mask)
+LOWEST_DIGIT = _TABLES_9.lowest_digit
+
+# DIGITS[mask] is the ascending tuple of digits in the mask, precomputed so iterating allocates nothing
+DIGITS = _TABLES_9.digits
+
+
+def mask_of(digits):
+    """
+    Build a candidate mask from an iterable of digits.
+    Args:
+        digits (iterable): Digits between 1 and 9.
+    Returns:
+        int: The corresponding candidate mask.
+    """
+    mask = 0
+    for digit in digits:
+        mask |= BIT[digit]
+    return mask
+
+
+def digits_of(mask):
+    """
+    Return the digits contained in a candidate mask.
+    Args:
+        mask (int): A candidate mask.
+    Returns:
+        tuple: The digits of the mask in ascending order.
+    """
+    return DIGITS[mask]
+
+
+def subsets(items, size, popcount=POPCOUNT):
+    """
+    Enumerate the combinations of items whose masks cover exactly size bits.
+    Branches are cut as soon as the union of the masks exceeds size bits, which keeps the search bounded.
+    Args:
+        items (list): (key, mask) pairs.
+        size (int): The number of items to combine.
+        popcount (tuple): The popcount table of the masks (MaskTables.popcount of wider masks).
+    Yields:
+        tuple: The union of the keys and the union of the masks of each matching combination.
+    """
+    items = [item for item in items if popcount[item[1]] <= size]
+
+    def extend(start, count, keys, union):
+        if count == size:
+            yield keys, union
+            return
+        for i in range(start, len(items) - (size - count) + 1):
+            key, mask = items[i]
+            merged = union | mask
+            if popcount[merged] <= size:
+                yield from extend(i + 1, count + 1, keys | key, merged)
+
+    yield from extend(0, 0, 0, 0)
@@ -0,0 +1,232 @@
+# Author: Noe Florence
+# Description: Maps a grid to a canonical representative of its symmetry class (transposition, band and
+# stack permutations, row and column permutations within them, digit relabeling) and back.
+
+from itertools import permutations, product
+from math import isqrt
+
+# The 6 orders of 3 lines, and the 1296 orders of the 9 lines that keep the bands (or stacks) together:
+# 6 band orders times 6 orders of the lines inside each band
+TRIPLE_ORDERS = tuple(permutations(range(3)))
+LINE_ORDERS = tuple(
+    tuple(3 * band + line for band, lines in zip(bands, inner) for line in lines)
+    for bands in TRIPLE_ORDERS
+    for inner in product(TRIPLE_ORDERS, repeat=3)
+)
+
+# For each 3-bit mask of the givens of a band of a row and each order of its 3 lines, the resulting pattern
+_TRIPLE_PATTERNS = tuple(
+    tuple((mask >> order[0] & 1) << 2 | (mask >> order[1] & 1) << 1 | (mask >> order[2] & 1)
+          for order in TRIPLE_ORDERS)
+    for mask in range(8)
+)
+
+# Number of tied partial transforms kept at each row, bounding the time spent on grids with many symmetries
+MAX_PARTIALS = 7776
+
+# Labels of the digits before any digit is read
+_NO_LABELS = (0,) * 10
+
+# The next rows of each partial choice of rows, computed on first use
+_next = {}
+
+# For each 9-bit mask of the givens of a row, the pattern each line order makes of it (the first column as
+# the highest bit), and the smallest pattern with the orders making it, computed on first use
+_patterns = {}
+_smallest = {}
+
+
+class GridTransform:
+    """
+    A symmetry of the grid: the original cell of each canonical cell, and the relabeling of the digits.
+    """
+
+    def __init__(self, cells, relabel):
+        """
+        Initialize the transform.
+        Args:
+            cells (tuple): For each canonical cell (81 on a 9x9 grid), the index of the original cell it comes from.
+            relabel (tuple): For each original digit (index 0 unused), its canonical digit.
+        """
+        self.cells = cells
+        self.relabel = relabel
+        self.unlabel = [0] * len(relabel)
+        for digit in range(1, len(relabel)):
+            self.unlabel[relabel[digit]] = digit
+
+    def apply(self, values):
+        """
+        Map original cell values to the canonical frame.
+        Args:
+            values (list): The cell values, with -1 for empty cells.
+        Returns:
+            list: The canonical cell values.
+        """
+        relabel = self.relabel
+        return [-1 if values[index] == -1 else relabel[values[index]] for index in self.cells]
+
+    def invert(self, values):
+        """
+        Map canonical cell values back to the original frame.
+        Args:
+            values (list): The canonical cell values, with -1 for empty cells.
+        Returns:
+            list: The original cell values.
+        """
+        unlabel = self.unlabel
+        original = [-1] * len(self.cells)
+        for position, index in enumerate(self.cells):
+            if values[position] != -1:
+                original[index] = unlabel[values[position]]
+        return original
+
+
+def canonicalize(values):
+    """
+    Find the canonical form of a grid: among the grids of its symmetry class, the one that is the smallest
+    read row by row, each row compared first on its pattern of givens (as bits, empty cells first), then on
+    its digits relabeled in order of first appearance.
+    The rows are chosen one at a time, keeping every partial transform that ties for the smallest rows so far:
+    the digits break the ties the pattern leaves, so that only grids with many symmetries keep many partial
+    transforms. At most MAX_PARTIALS are kept; beyond that (nearly empty or full grids), the form is still a
+    member of the class but may depend on which member was given.
+    Only 9x9 grids are canonicalized: other sizes are their own canonical form, under the identity transform.
+    Args:
+        values (list): The cell values, with -1 for empty cells (as produced by Main.parse_input).
+    Returns:
+        tuple: The canonical cell values and the GridTransform mapping the grid to them.
+    """
+    if len(values) != 81:
+        size = isqrt(len(values))
+        return list(values), GridTransform(tuple(range(len(values))), tuple(range(size + 1)))
+    values = [0 if value == -1 else value for value in values]
+    if not any(values):
+        # Every transform of the empty grid ties, it is its own canonical form
+        return [-1] * 81, GridTransform(tuple(range(81)), tuple(range(10)))
+    sources = (values, [values[col * 9 + row] for row in range(9) for col in range(9)])
+    # Pattern of the givens of each row of each source, as one table of line order patterns per row
+    patterns = []
+    masks = []
+    for source in sources:
+        for row in range(9):
+            mask = 0
+            for col in range(9):
+                if source[row * 9 + col]:
+                    mask |= 1 << col
+            masks.append(mask)
+        patterns.append([_patterns_of(mask) for mask in masks[-9:]])
+    # Each partial transform: (source number, rows chosen, column order number, label of each digit, next label),
+    # and the extensions of the partial transforms by one row whose pattern ties for the smallest
+    best = None
+    tied = []
+    for position, mask in enumerate(masks):
+        key, orders = _smallest_of(mask)
+        if best is None or key < best:
+            best = key
+            tied = []
+        if key == best:
+            number, row = divmod(position, 9)
+            tied.extend(((number, (), order, _NO_LABELS, 1), row) for order in orders)
+    canonical = []
+    for depth in range(9):
+        if depth:
+            best = None
+            tied = []
+            for partial in partials:
+                number, rows, order = partial[:3]
+                table = patterns[number]
+                for row in _next_rows(rows):
+                    key = table[row][order]
+                    if best is None or key < best:
+                        best = key
+                        tied = []
+                    if key == best:
+                        tied.append((partial, row))
+        # Break the ties on the digits of the row
+        best = None
+        partials = []
+        for (number, rows, order, labels, label), row in tied:
+            source = sources[number]
+            start = row * 9
+            labels = list(labels)
+            relabeled = []
+            for col in LINE_ORDERS[order]:
+                digit = source[start + col]
+                if digit and not labels[digit]:
+                    labels[digit] = label
+                    label += 1
+                relabeled.append(labels[digit])
+            if best is None or relabeled < best:
+                best = relabeled
+                partials = []
+            if relabeled == best and len(partials) < MAX_PARTIALS:
+                partials.append((number, rows + (row,), order, labels, label))
+        canonical.extend(best)
+    number, rows, order, labels, label = partials[0]
+    cells = tuple(
+        (col * 9 + row) if number else (row * 9 + col)
+        for row in rows for col in LINE_ORDERS[order]
+    )
+    # Digits absent from the grid take the remaining labels in ascending order
+    for digit in range(1, 10):
+        if not labels[digit]:
+            labels[digit] = label
+            label += 1
+    canonical = [value if value else -1 for value in canonical]
+    return canonical, GridTransform(cells, tuple(labels))
+
+
+def _next_rows(rows):
+    """
+    Get the rows that may come next in a partial transform, keeping the bands together.
+    Args:
+        rows (tuple): The rows already chosen.
+    Returns:
+        list: The candidate rows.
+    """
+    found = _next.get(rows)
+    if found is None:
+        if len(rows) % 3:
+            band = rows[-1] // 3
+            found = [row for row in range(3 * band, 3 * band + 3) if row not in rows]
+        else:
+            used = {row // 3 for row in rows}
+            found = [row for row in range(9) if row // 3 not in used]
+        _next[rows] = found
+    return found
+
+
+def _patterns_of(mask):
+    """
+    Get the patterns the line orders make of a row's givens.
+    Args:
+        mask (int): The 9-bit mask of the columns holding a given.
+    Returns:
+        list: For each line order, the pattern as an int, the first column as the highest bit.
+    """
+    found = _patterns.get(mask)
+    if found is None:
+        # Patterns of each band of the row under each order of its lines
+        bands = [_TRIPLE_PATTERNS[mask >> (3 * band) & 7] for band in range(3)]
+        found = _patterns[mask] = [
+            first << 6 | second << 3 | third
+            for order in TRIPLE_ORDERS
+            for first, second, third in product(bands[order[0]], bands[order[1]], bands[order[2]])
+        ]
+    return found
+
+
+def _smallest_of(mask):
+    """
+    Get the smallest pattern the line orders make of a row's givens, and the orders making it.
+    Args:
+        mask (int): The 9-bit mask of the columns holding a given.
+    Returns:
+        tuple: The smallest pattern and the list of the numbers of the line orders making it.
+    """
+    found = _smallest.get(mask)
+    if found is None:
+        found = _patterns_of(mask)
+        best = min(found)
+        found = _smallest[mask] = (best, [order for order, key in enumerate(found) if key == best])
+    return found
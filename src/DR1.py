@@ -24,9 +24,15 @@ class DR1(DeductionRule):
             bool: True if any changes were made to the grid, False otherwise.
         """
         changed = False
-        for index in range(81):
-            if grid.cells[index] == -1 and len(grid.candidates[index]) == 1:
-                value = grid.candidates[index].pop()
-                grid.set_value(index, value)
+        checkpoint = grid.checkpoint()
+        candidates = grid.candidates
+        popcount = grid.masks.popcount
+        lowest_digit = grid.masks.lowest_digit
+        # Only cells whose candidates changed since the last run can have become naked singles
+        for index in grid.dirty_cells('DR1'):
+            mask = candidates[index]
+            if grid.cells[index] == -1 and popcount[mask] == 1:
+                grid.set_value(index, lowest_digit[mask])
                 changed = True
-        return changed
\ No newline at end of file
+        grid.mark_seen('DR1', checkpoint)
+        return changed
@@ -24,16 +24,27 @@ class DR2(DeductionRule):
             bool: True if any changes were made to the grid, False otherwise.
         """
         changed = False
-        for unit in grid.units:
-            counts = {}  # Dictionary to count occurrences of each candidate in the unit
+        checkpoint = grid.checkpoint()
+        candidates = grid.candidates
+        # Only units touched since the last run can hold new hidden singles
+        for number in grid.dirty_units('DR2'):
+            unit = grid.units[number]
+            # Masks of the candidates seen at least once and at least twice in the unit
+            once = 0
+            twice = 0
             for index in unit:
-                for candidate in grid.candidates[index]:
-                    # Map each candidate to the list of cell indices where it appears
-                    counts.setdefault(candidate, []).append(index)
-            for candidate, indices in counts.items():
-                # If a candidate appears only once in the unit
-                if len(indices) == 1 and grid.cells[indices[0]] == -1:
+                mask = candidates[index]
+                twice |= once & mask
+                once |= mask
+            singles = once & ~twice
+            if not singles:
+                continue
+            for index in unit:
+                # If a candidate appears only once in the unit, it belongs to that cell
+                hidden = candidates[index] & singles
+                if hidden and grid.cells[index] == -1:
                     # Assign that candidate to the cell
-                    grid.set_value(indices[0], candidate)
+                    grid.set_value(index, grid.masks.lowest_digit[hidden])
                     changed = True
+        grid.mark_seen('DR2', checkpoint)
         return changed
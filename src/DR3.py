@@ -26,21 +26,31 @@ class DR3(DeductionRule):
         """
 
         changed = False
-        for unit in grid.units:
-            pairs = {}  # Dictionary to store pairs of candidates and their cell indices
-            for index in unit:
-                if len(grid.candidates[index]) == 2:
-                    # Create a key based on the sorted tuple of candidates
-                    key = tuple(sorted(grid.candidates[index]))
-                    pairs.setdefault(key, []).append(index)
-            for key, indices in pairs.items():
+        checkpoint = grid.checkpoint()
+        candidates = grid.candidates
+        popcount = grid.masks.popcount
+        # Only units touched since the last run can hold new naked pairs
+        for number in grid.dirty_units('DR3'):
+            unit = grid.units[number]
+            for position, first in enumerate(unit):
+                pair = candidates[first]
+                if popcount[pair] != 2:
+                    continue
+                # Count the cells sharing this pair, skipping pairs already handled at an earlier position
+                count = 0
+                for other_position, index in enumerate(unit):
+                    if candidates[index] == pair:
+                        if other_position < position:
+                            count = 0
+                            break
+                        count += 1
                 # If the same pair of candidates appears in exactly two cells
-                if len(indices) == 2:
-                    for index in unit:
-                        if index not in indices and grid.cells[index] == -1:
-                            # Remove these candidates from other cells in the unit
-                            before = len(grid.candidates[index])
-                            grid.candidates[index] -= set(key)
-                            if len(grid.candidates[index]) != before:
-                                changed = True
+                if count != 2:
+                    continue
+                for index in unit:
+                    if candidates[index] != pair and grid.cells[index] == -1:
+                        # Remove these candidates from other cells in the unit
+                        if grid.remove_candidates(index, pair):
+                            changed = True
+        grid.mark_seen('DR3', checkpoint)
         return changed
@@ -14,6 +14,9 @@ class DR4(DeductionRule):
         Constructor for the Hidden Pairs deduction rule.
         """
         super().__init__()
+        # Reusable buffer: for each candidate, the mask of the unit positions where it appears
+        # (resized when the rule meets a grid of another size)
+        self._positions = [0] * 10
 
     def apply(self, grid):
         """
@@ -24,26 +27,37 @@ class DR4(DeductionRule):
             bool: True if any changes were made to the grid, False otherwise.
         """
         changed = False
-        for unit in grid.units:
-            # Build a mapping from candidates to the cells they appear in
-            candidate_cells = {}
-            for candidate in range(1, 10):
-                candidate_cells[candidate] = [index for index in unit if candidate in grid.candidates[index]]
+        checkpoint = grid.checkpoint()
+        candidates = grid.candidates
+        masks = grid.masks
+        size = grid.size
+        if len(self._positions) != size + 1:
+            self._positions = [0] * (size + 1)
+        positions = self._positions
+        # Only units touched since the last run can hold new hidden pairs
+        for number in grid.dirty_units('DR4'):
+            unit = grid.units[number]
+            # Build a mapping from candidates to the unit positions they appear in
+            for candidate in range(1, size + 1):
+                bit = masks.bit[candidate]
+                where = 0
+                for position, index in enumerate(unit):
+                    if candidates[index] & bit:
+                        where |= 1 << position
+                positions[candidate] = where
             # For each pair of candidates
-            for candidate1 in range(1, 9):
-                for candidate2 in range(candidate1 + 1, 10):
-                    cells_c1 = set(candidate_cells[candidate1])
-                    cells_c2 = set(candidate_cells[candidate2])
-                    # Find common cells where both candidates appear
-                    common_cells = cells_c1 & cells_c2
-                    if len(common_cells) == 2:
-                        # Check that these candidates appear only in these two cells within the unit
-                        total_cells = cells_c1 | cells_c2
-                        if len(total_cells) == 2:
-                            # Hidden pair found, eliminate other candidates from these cells
-                            for index in common_cells:
-                                before = grid.candidates[index].copy()
-                                grid.candidates[index].intersection_update({candidate1, candidate2})
-                                if grid.candidates[index] != before:
-                                    changed = True
+            for candidate1 in range(1, size):
+                where = positions[candidate1]
+                # Both candidates must appear in exactly the same two cells of the unit
+                if masks.popcount[where] != 2:
+                    continue
+                for candidate2 in range(candidate1 + 1, size + 1):
+                    if positions[candidate2] != where:
+                        continue
+                    # Hidden pair found, eliminate other candidates from these cells
+                    pair = masks.bit[candidate1] | masks.bit[candidate2]
+                    for position, index in enumerate(unit):
+                        if where >> position & 1 and grid.remove_candidates(index, masks.all_digits ^ pair):
+                            changed = True
+        grid.mark_seen('DR4', checkpoint)
         return changed
@@ -24,33 +24,28 @@ class DR5(DeductionRule):
             bool: True if any changes were made to the grid, False otherwise.
         """
         changed = False
-        # Process each block (blocks are units[18:27])
-        for block in grid.units[18:27]:
-            candidate_cells = {}
-            # Map candidates to their cells within the block
-            for candidate in range(1, 10):
-                candidate_cells[candidate] = [index for index in block if candidate in grid.candidates[index]]
-            # Check if candidates are confined to a single row or column
-            for candidate in range(1, 10):
-                cells = candidate_cells[candidate]
-                if not cells:
+        checkpoint = grid.checkpoint()
+        boards = grid.boards
+        unit_masks = grid.unit_masks
+        size = grid.size
+        # Process each block touched since the last run (blocks are the last size units)
+        for number in grid.dirty_units('DR5'):
+            if number < 2 * size:
+                continue
+            block_mask = unit_masks[number]
+            # Units of the rows and columns crossing the block
+            lines = grid.crossings[number]
+            for candidate in range(1, size + 1):
+                inside = boards[candidate] & block_mask
+                if not inside:
                     continue
-                rows = set(index // 9 for index in cells)
-                cols = set(index % 9 for index in cells)
-                if len(rows) == 1:
-                    # Candidate is confined to a single row within the block
-                    row = rows.pop()
-                    for index in range(row * 9, (row + 1) * 9):
-                        if index not in block and candidate in grid.candidates[index]:
-                            # Eliminate candidate from other cells in the row outside the block
-                            grid.candidates[index].remove(candidate)
-                            changed = True
-                elif len(cols) == 1:
-                    # Candidate is confined to a single column within the block
-                    col = cols.pop()
-                    for index in range(col, 81, 9):
-                        if index not in block and candidate in grid.candidates[index]:
-                            # Eliminate candidate from other cells in the column outside the block
-                            grid.candidates[index].remove(candidate)
+                # Check if the candidate is confined to a single row or column within the block
+                for line in lines:
+                    line_mask = unit_masks[line]
+                    if not inside & ~line_mask:
+                        # Eliminate the candidate from the other cells of the line, outside the block
+                        if grid.eliminate(boards[candidate] & line_mask & ~block_mask, candidate):
                             changed = True
+                        break
+        grid.mark_seen('DR5', checkpoint)
         return changed
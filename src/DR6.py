@@ -0,0 +1,104 @@
+# Author: Noe Florence
+# Description: Implementation of the Naked and Hidden Subsets deduction rule (DR6), for pairs, triples and quads.
+
+from CandidateMask import subsets
+from DeductionRule import DeductionRule
+
+
+class DR6(DeductionRule):
+    """
+    Naked and Hidden Subsets: If N cells of a unit hold only N candidates between them (naked subset),
+    those candidates can be eliminated from the other cells of the unit. If N candidates of a unit appear
+    only in N cells (hidden subset), the other candidates of these cells can be eliminated.
+    """
+
+    def __init__(self, min_size=2, max_size=4):
+        """
+        Constructor for the Naked and Hidden Subsets deduction rule.
+        Args:
+            min_size (int): The smallest subset size searched.
+            max_size (int): The largest subset size searched (at most 4, larger subsets are the
+                            complement of a smaller subset of the other kind).
+        """
+        super().__init__()
+        self.min_size = min_size
+        self.max_size = max_size
+
+    def apply(self, grid):
+        """
+        Apply the Naked and Hidden Subsets rule to the Sudoku grid.
+        Args:
+            grid (SudokuGrid): The Sudoku grid to apply the rule to.
+        Returns:
+            bool: True if any changes were made to the grid, False otherwise.
+        """
+        changed = False
+        checkpoint = grid.checkpoint()
+        candidates = grid.candidates
+        # Only units touched since the last run can hold new subsets
+        for number in grid.dirty_units('DR6'):
+            unit = grid.units[number]
+            # Candidate mask of each empty cell, keyed by the bit of its position in the unit
+            cells = [(1 << position, candidates[index]) for position, index in enumerate(unit) if candidates[index]]
+            if len(cells) <= self.min_size:
+                continue
+            # Position mask of each candidate left in the unit, keyed by the candidate's bit
+            digits = []
+            for candidate in range(1, grid.size + 1):
+                bit = grid.masks.bit[candidate]
+                where = 0
+                for position, mask in cells:
+                    if mask & bit:
+                        where |= position
+                if where:
+                    digits.append((bit, where))
+            for size in range(self.min_size, min(self.max_size, len(cells) - 1) + 1):
+                if self._naked(grid, unit, cells, size) or self._hidden(grid, unit, digits, size):
+                    # The unit changed, it will be scanned again on the next run
+                    changed = True
+                    break
+        grid.mark_seen('DR6', checkpoint)
+        return changed
+
+    def _naked(self, grid, unit, cells, size):
+        """
+        Find a naked subset of the given size in a unit and apply its eliminations.
+        Args:
+            grid (SudokuGrid): The Sudoku grid.
+            unit (tuple): The cells of the unit.
+            cells (list): (position bit, candidate mask) pairs of the empty cells of the unit.
+            size (int): The size of the subset.
+        Returns:
+            bool: True if any candidate was eliminated, False otherwise.
+        """
+        for positions, subset in subsets(cells, size, grid.masks.popcount):
+            changed = False
+            for position, index in enumerate(unit):
+                # Remove the subset's candidates from the other cells of the unit
+                if not positions >> position & 1 and grid.remove_candidates(index, subset):
+                    changed = True
+            if changed:
+                return True
+        return False
+
+    def _hidden(self, grid, unit, digits, size):
+        """
+        Find a hidden subset of the given size in a unit and apply its eliminations.
+        Args:
+            grid (SudokuGrid): The Sudoku grid.
+            unit (tuple): The cells of the unit.
+            digits (list): (candidate bit, position mask) pairs of the candidates left in the unit.
+            size (int): The size of the subset.
+        Returns:
+            bool: True if any candidate was eliminated, False otherwise.
+        """
+        all_digits = grid.masks.all_digits
+        for subset, positions in subsets(digits, size, grid.masks.popcount):
+            changed = False
+            for position, index in enumerate(unit):
+                # Keep only the subset's candidates in the cells holding it
+                if positions >> position & 1 and grid.remove_candidates(index, all_digits ^ subset):
+                    changed = True
+            if changed:
+                return True
+        return False
@@ -0,0 +1,52 @@
+# Author: Noe Florence
+# Description: Implementation of the Claiming (Box/Line Reduction) deduction rule (DR7).
+
+from DeductionRule import DeductionRule
+
+
+class DR7(DeductionRule):
+    """
+    Claiming: If in a row or column, all candidates of a number are confined to a single block,
+    then this candidate can be eliminated from other cells in that block outside the row or column.
+    """
+
+    def __init__(self):
+        """
+        Constructor for the Claiming deduction rule.
+        """
+        super().__init__()
+
+    def apply(self, grid):
+        """
+        Apply the Claiming rule to the Sudoku grid.
+        Args:
+            grid (SudokuGrid): The Sudoku grid to apply the rule to.
+        Returns:
+            bool: True if any changes were made to the grid, False otherwise.
+        """
+        changed = False
+        checkpoint = grid.checkpoint()
+        boards = grid.boards
+        unit_masks = grid.unit_masks
+        size = grid.size
+        # Process each row and column touched since the last run (the first 2 * size units)
+        for number in grid.dirty_units('DR7'):
+            if number >= 2 * size:
+                continue
+            line_mask = unit_masks[number]
+            # Units of the blocks crossed by the line
+            blocks = grid.crossings[number]
+            for candidate in range(1, size + 1):
+                inside = boards[candidate] & line_mask
+                if not inside:
+                    continue
+                # Check if the candidate is confined to a single block within the line
+                for block in blocks:
+                    block_mask = unit_masks[block]
+                    if not inside & ~block_mask:
+                        # Eliminate the candidate from the other cells of the block, outside the line
+                        if grid.eliminate(boards[candidate] & block_mask & ~line_mask, candidate):
+                            changed = True
+                        break
+        grid.mark_seen('DR7', checkpoint)
+        return changed
@@ -0,0 +1,92 @@
+# Author: Noe Florence
+# Description: Implementation of the Fish deduction rule (DR8): X-Wing, Swordfish and Jellyfish.
+
+from CandidateMask import subsets
+from DeductionRule import DeductionRule
+
+
+class DR8(DeductionRule):
+    """
+    Fish: If the candidates of a number in N rows are confined to the same N columns, this candidate
+    can be eliminated from the other cells of these columns (and likewise with rows and columns swapped).
+    N = 2 is an X-Wing, N = 3 a Swordfish and N = 4 a Jellyfish.
+    """
+
+    def __init__(self, min_size=2, max_size=4):
+        """
+        Constructor for the Fish deduction rule.
+        Args:
+            min_size (int): The smallest fish size searched.
+            max_size (int): The largest fish size searched.
+        """
+        super().__init__()
+        self.min_size = min_size
+        self.max_size = max_size
+
+    def apply(self, grid):
+        """
+        Apply the Fish rule to the Sudoku grid.
+        Args:
+            grid (SudokuGrid): The Sudoku grid to apply the rule to.
+        Returns:
+            bool: True if any changes were made to the grid, False otherwise.
+        """
+        changed = False
+        checkpoint = grid.checkpoint()
+        # A fish spans the whole board, so the rule runs again as soon as any cell changed
+        if not grid.has_changes('DR8'):
+            grid.mark_seen('DR8', checkpoint)
+            return False
+        boards = grid.boards
+        size = grid.size
+        all_digits = grid.masks.all_digits
+        row_masks = grid.unit_masks[0:size]
+        col_masks = grid.unit_masks[size:2 * size]
+        for candidate in range(1, size + 1):
+            board = boards[candidate]
+            if not board:
+                continue
+            # For each line holding the candidate, its bit and the mask of the crossing lines holding it
+            rows = []
+            cols = []
+            for line in range(size):
+                in_row = (board >> (line * size)) & all_digits
+                if in_row:
+                    rows.append((1 << line, in_row))
+                in_col = 0
+                for row in range(size):
+                    if board >> (row * size + line) & 1:
+                        in_col |= 1 << row
+                if in_col:
+                    cols.append((1 << line, in_col))
+            if (self._find(grid, candidate, rows, row_masks, col_masks)
+                    or self._find(grid, candidate, cols, col_masks, row_masks)):
+                changed = True
+        grid.mark_seen('DR8', checkpoint)
+        return changed
+
+    def _find(self, grid, candidate, lines, base_masks, cover_masks):
+        """
+        Find a fish of a candidate with the given base lines and apply its eliminations.
+        Args:
+            grid (SudokuGrid): The Sudoku grid.
+            candidate (int): The candidate (1 to the grid size).
+            lines (list): (line bit, crossing lines mask) pairs of the base lines holding the candidate.
+            base_masks (tuple): The cell masks of the base lines (rows or columns).
+            cover_masks (tuple): The cell masks of the crossing lines.
+        Returns:
+            bool: True if any candidate was eliminated, False otherwise.
+        """
+        for size in range(self.min_size, min(self.max_size, len(lines) - 1) + 1):
+            for base, cover in subsets(lines, size, grid.masks.popcount):
+                base_cells = 0
+                cover_cells = 0
+                for line in range(len(base_masks)):
+                    if base >> line & 1:
+                        base_cells |= base_masks[line]
+                    if cover >> line & 1:
+                        cover_cells |= cover_masks[line]
+                # Eliminate the candidate from the cover lines, outside the base lines
+                if grid.eliminate(grid.boards[candidate] & cover_cells & ~base_cells, candidate):
+                    return True
+        return False
@@ -0,0 +1,215 @@
+# Author: Noe Florence
+# Description: Implementation of the Chains deduction rule (DR9): XY-Wing, simple coloring and
+# alternating inference chains, searched on a link graph between candidates.
+
+from DeductionRule import DeductionRule
+from LinkGraph import LinkGraph
+
+
+class DR9(DeductionRule):
+    """
+    Chains: Candidates are linked strongly (at least one is true) or weakly (at most one is true).
+    - XY-Wing: a bivalue pivot {x, y} sees two bivalue pincers {x, z} and {y, z}; one pincer holds z,
+      so z can be eliminated from the cells seeing both pincers.
+    - Simple coloring: the conjugate pairs of a digit split its cells into two colors, one of them true.
+      A color holding two peers is false; a cell seeing both colors cannot hold the digit.
+    - Alternating inference chain (AIC): a chain of alternately strong and weak links, starting and ending
+      with a strong link, proves that one of its two ends is true. Candidates seeing both ends are eliminated.
+    The chain search is bounded by a length and a budget of nodes expanded per call. A call that runs out of
+    budget reports itself interrupted, and the next call resumes where it stopped; the chain applies the rule
+    again until the search completes (see DeductionRule.handle), so a grid is never left stalled with chains
+    unsearched. The budget counts nodes rather than seconds, so that a grid gets the same steps, and the same
+    rating, however loaded the machine is.
+    """
+
+    def __init__(self, max_length=12, node_budget=20000):
+        """
+        Constructor for the Chains deduction rule.
+        Args:
+            max_length (int): The maximum number of links of an alternating inference chain.
+            node_budget (int): The maximum number of nodes whose links are followed while searching chains
+                               per call (about 50 ms of search on a 9x9 grid).
+        """
+        super().__init__()
+        self.max_length = max_length
+        self.node_budget = node_budget
+        self.graph = LinkGraph('DR9')
+        self._next_start = None  # Candidate where an interrupted chain search resumes, None when it completed
+
+    def apply(self, grid):
+        """
+        Apply the Chains rule to the Sudoku grid.
+        Args:
+            grid (SudokuGrid): The Sudoku grid to apply the rule to.
+        Returns:
+            bool: True if any changes were made to the grid, False otherwise.
+        """
+        checkpoint = grid.checkpoint()
+        if self.graph.update(grid):
+            # The grid changed, every chain has to be searched again
+            self._next_start = 0
+        grid.mark_seen('DR9', checkpoint)
+        if self._xy_wing(grid) or self._coloring(grid):
+            return True
+        if self._next_start is None:
+            return False
+        return self._chains(grid)
+
+    def interrupted(self):
+        """
+        Check whether the last call ran out of budget before the chain search was complete.
+        Returns:
+            bool: True if the chain search resumes on the next call, False otherwise.
+        """
+        return self._next_start is not None
+
+    def _xy_wing(self, grid):
+        """
+        Find an XY-Wing and apply its eliminations.
+        Args:
+            grid (SudokuGrid): The Sudoku grid.
+        Returns:
+            bool: True if any candidate was eliminated, False otherwise.
+        """
+        candidates = grid.candidates
+        peer_masks = grid.peer_masks
+        bivalues = self.graph.bivalues
+        pivots = bivalues
+        while pivots:
+            lowest = pivots & -pivots
+            pivots ^= lowest
+            pivot = lowest.bit_length() - 1
+            pivot_mask = candidates[pivot]
+            # Bivalue peers sharing exactly one candidate with the pivot
+            pincers = []
+            cells = bivalues & peer_masks[pivot]
+            while cells:
+                bit = cells & -cells
+                cells ^= bit
+                cell = bit.bit_length() - 1
+                mask = candidates[cell]
+                shared = mask & pivot_mask
+                if shared and shared != pivot_mask:
+                    pincers.append((cell, shared, mask & ~pivot_mask))
+            for i, (first, first_shared, z) in enumerate(pincers):
+                for second, second_shared, other_z in pincers[i + 1:]:
+                    if other_z == z and first_shared != second_shared:
+                        digit = z.bit_length()
+                        targets = grid.boards[digit] & peer_masks[first] & peer_masks[second]
+                        if grid.eliminate(targets, digit):
+                            return True
+        return False
+
+    def _coloring(self, grid):
+        """
+        Color the conjugate pairs of each digit and apply the color wrap and color trap eliminations.
+        Args:
+            grid (SudokuGrid): The Sudoku grid.
+        Returns:
+            bool: True if any candidate was eliminated, False otherwise.
+        """
+        peer_masks = grid.peer_masks
+        for digit in range(1, grid.size + 1):
+            strong = self.graph.strong[digit]
+            colored = set()
+            for start in strong:
+                if start in colored:
+                    continue
+                # Two-color the connected component of the start cell
+                colors = [0, 0]
+                seen = [0, 0]
+                stack = [(start, 0)]
+                colored.add(start)
+                while stack:
+                    cell, color = stack.pop()
+                    colors[color] |= 1 << cell
+                    seen[color] |= peer_masks[cell]
+                    for other in strong[cell]:
+                        if other not in colored:
+                            colored.add(other)
+                            stack.append((other, 1 - color))
+                for color in (0, 1):
+                    # Color wrap: two cells of the same color see each other, so this color is false
+                    if seen[color] & colors[color]:
+                        return grid.eliminate(colors[color], digit)
+                # Color trap: cells seeing both colors lose the digit
+                if grid.eliminate(grid.boards[digit] & seen[0] & seen[1] & ~(colors[0] | colors[1]), digit):
+                    return True
+        return False
+
+    def _chains(self, grid):
+        """
+        Search alternating inference chains from each candidate, within the length and node budget.
+        Assuming the start candidate false, strong links lead to candidates that must then be true and
+        weak links from those to candidates that must then be false, breadth first so that the shortest
+        chains are found first.
+        Args:
+            grid (SudokuGrid): The Sudoku grid.
+        Returns:
+            bool: True if any candidate was eliminated, False otherwise.
+        """
+        graph = self.graph
+        expanded = 0
+        candidates = grid.candidates
+        size = grid.size
+        for start in range(self._next_start, len(candidates) * size):
+            index, digit = divmod(start, size)
+            if not candidates[index] >> digit & 1:
+                continue
+            if expanded >= self.node_budget:
+                self._next_start = start
+                return False
+            off = {start}
+            on = set()
+            frontier = [start]
+            for _ in range(0, self.max_length, 2):
+                reached = []
+                expanded += len(frontier)
+                for node in frontier:
+                    for end in graph.strong_links(node):
+                        if end not in on:
+                            on.add(end)
+                            reached.append(end)
+                            if self._eliminate(grid, start, end):
+                                return True
+                frontier = []
+                expanded += len(reached)
+                for node in reached:
+                    for link in graph.weak_links(node):
+                        if link not in off:
+                            off.add(link)
+                            frontier.append(link)
+                if not frontier:
+                    break
+        self._next_start = None
+        return False
+
+    @staticmethod
+    def _eliminate(grid, first, second):
+        """
+        Eliminate the candidates seeing both ends of a chain, one of which is true.
+        Args:
+            grid (SudokuGrid): The Sudoku grid.
+            first (int): The first end, numbered index * size + digit - 1.
+            second (int): The second end, numbered index * size + digit - 1.
+        Returns:
+            bool: True if any candidate was eliminated, False otherwise.
+        """
+        first_index, first_digit = divmod(first, grid.size)
+        second_index, second_digit = divmod(second, grid.size)
+        first_digit += 1
+        second_digit += 1
+        peer_masks = grid.peer_masks
+        bit = grid.masks.bit
+        if first_digit == second_digit:
+            # The digit is in one of the two cells, so it leaves their common peers
+            targets = grid.boards[first_digit] & peer_masks[first_index] & peer_masks[second_index]
+            return grid.eliminate(targets, first_digit)
+        if first_index == second_index:
+            # The cell holds one of the two digits, so it loses its other candidates
+            return grid.remove_candidates(first_index, grid.masks.all_digits ^ (bit[first_digit] | bit[second_digit]))
+        if not peer_masks[first_index] >> second_index & 1:
+            return False
+        # Each end's digit leaves the other end's cell, which it sees
+        changed = grid.remove_candidates(second_index, bit[first_digit])
+        return grid.remove_candidates(first_index, bit[second_digit]) or changed
@@ -0,0 +1,187 @@
+# Author: Noe Florence
+# Description: Generic exact-cover solver implementing Knuth's Algorithm X with Dancing Links.
+# Nodes are stored in parallel lists instead of objects to keep the link updates cheap.
+
+
+class DancingLinks:
+    """
+    Exact-cover matrix solved with Algorithm X over a toroidal doubly linked list.
+    """
+
+    def __init__(self, num_columns):
+        """
+        Initialize an empty matrix with the given number of columns.
+        Args:
+            num_columns (int): The number of constraints (columns) of the matrix.
+        """
+        # Node 0 is the root header, nodes 1..num_columns are the column headers
+        self.num_columns = num_columns
+        self.left = [num_columns] + list(range(num_columns))
+        self.right = list(range(1, num_columns + 1)) + [0]
+        self.up = list(range(num_columns + 1))
+        self.down = list(range(num_columns + 1))
+        self.column = list(range(num_columns + 1))
+        self.row_id = [None] * (num_columns + 1)
+        self.size = [0] * (num_columns + 1)
+        self.covered = [False] * (num_columns + 1)
+        # First node of each row, keyed by row identifier
+        self.row_start = {}
+
+    def add_row(self, row_id, columns):
+        """
+        Add a row to the matrix.
+        Args:
+            row_id: Identifier returned in the solutions when this row is selected.
+            columns (iterable): The indices (0-based) of the columns covered by the row.
+        """
+        first = None
+        for col in columns:
+            header = col + 1
+            node = len(self.column)
+            # Insert the node at the bottom of its column
+            self.up.append(self.up[header])
+            self.down.append(header)
+            self.down[self.up[header]] = node
+            self.up[header] = node
+            self.column.append(header)
+            self.row_id.append(row_id)
+            self.size[header] += 1
+            # Link the node horizontally with the rest of the row
+            if first is None:
+                first = node
+                self.row_start[row_id] = node
+                self.left.append(node)
+                self.right.append(node)
+            else:
+                self.left.append(self.left[first])
+                self.right.append(first)
+                self.right[self.left[first]] = node
+                self.left[first] = node
+
+    def _cover(self, header):
+        """
+        Remove a column and every row intersecting it from the matrix.
+        Args:
+            header (int): The header node of the column.
+        """
+        left, right, up, down, column, size = self.left, self.right, self.up, self.down, self.column, self.size
+        self.covered[header] = True
+        right[left[header]] = right[header]
+        left[right[header]] = left[header]
+        i = down[header]
+        while i != header:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                size[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def _uncover(self, header):
+        """
+        Restore a column previously removed by _cover.
+        Args:
+            header (int): The header node of the column.
+        """
+        left, right, up, down, column, size = self.left, self.right, self.up, self.down, self.column, self.size
+        i = up[header]
+        while i != header:
+            j = left[i]
+            while j != i:
+                size[column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[header]] = header
+        left[right[header]] = header
+        self.covered[header] = False
+
+    def select(self, row_id):
+        """
+        Force a row into every solution by covering its columns before the search.
+        Args:
+            row_id: The identifier of a row previously added with add_row.
+        Returns:
+            bool: True if the row could be selected, False if it conflicts with a previous selection.
+        """
+        node = self.row_start.get(row_id)
+        if node is None:
+            return False
+        columns = [node] + self._row_nodes(node)
+        if any(self.covered[self.column[j]] for j in columns):
+            return False
+        for j in columns:
+            self._cover(self.column[j])
+        return True
+
+    def _row_nodes(self, node):
+        """
+        List the other nodes of the row containing a node.
+        Args:
+            node (int): A node of the row.
+        Returns:
+            list: The nodes to the right of the given node, in order.
+        """
+        nodes = []
+        j = self.right[node]
+        while j != node:
+            nodes.append(j)
+            j = self.right[j]
+        return nodes
+
+    def solve(self, limit=1):
+        """
+        Search for exact covers of the remaining columns.
+        Args:
+            limit (int): The maximum number of solutions to collect.
+        Returns:
+            list: Up to limit solutions, each being the list of selected row identifiers.
+        """
+        solutions = []
+        self._search([], solutions, limit)
+        return solutions
+
+    def _search(self, partial, solutions, limit):
+        """
+        Recursive step of Algorithm X.
+        Args:
+            partial (list): The row identifiers selected so far.
+            solutions (list): The solutions found so far, extended in place.
+            limit (int): The maximum number of solutions to collect.
+        Returns:
+            bool: True if the search should stop because the limit was reached.
+        """
+        right, down, size = self.right, self.down, self.size
+        if right[0] == 0:
+            solutions.append(partial[:])
+            return len(solutions) >= limit
+        # Choose the column with the fewest remaining rows
+        header = right[0]
+        best = size[header]
+        c = right[header]
+        while c != 0 and best > 1:
+            if size[c] < best:
+                header, best = c, size[c]
+            c = right[c]
+        if best == 0:
+            return False
+        self._cover(header)
+        r = down[header]
+        stop = False
+        while r != header and not stop:
+            partial.append(self.row_id[r])
+            j = right[r]
+            while j != r:
+                self._cover(self.column[j])
+                j = right[j]
+            stop = self._search(partial, solutions, limit)
+            j = self.left[r]
+            while j != r:
+                self._uncover(self.column[j])
+                j = self.left[j]
+            partial.pop()
+            r = down[r]
+        self._uncover(header)
+        return stop
@@ -26,17 +26,30 @@ class DeductionRule:
         """
         raise NotImplementedError("This method should be implemented by subclasses.")
 
-    def handle(self, grid):
+    def interrupted(self):
+        """
+        Check whether the last call to apply stopped on a budget before its search was complete.
+        Returns:
+            bool: True if applying the rule again to the unchanged grid may still make changes, False otherwise.
+        """
+        return False
+
+    def handle(self, grid, stats=None):
         """
         Apply the deduction rule to the grid, or pass it to the next rule if no changes are made.
+        A rule interrupted by its budget is applied again until it makes changes or completes its search.
         Args:
             grid (SudokuGrid): The Sudoku grid to apply the rule to.
+            stats (RuleStats): Statistics recording each rule application, or None to skip the measures.
         Returns:
             str: The name of the rule that was applied, or None if no changes were made.
         """
-        if self.apply(grid):
-            return self.__class__.__name__
-        elif self.next_rule:
-            return self.next_rule.handle(grid)
+        while True:
+            if self.apply(grid) if stats is None else stats.run(self, grid):
+                return self.__class__.__name__
+            if not self.interrupted():
+                break
+        if self.next_rule:
+            return self.next_rule.handle(grid, stats)
         else:
             return None
\ No newline at end of file
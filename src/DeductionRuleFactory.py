@@ -7,6 +7,11 @@ from DR2 import DR2
 from DR3 import DR3
 from DR4 import DR4
 from DR5 import DR5
+from DR6 import DR6
+from DR7 import DR7
+from DR8 import DR8
+from DR9 import DR9
+from RuleScheduler import RuleScheduler
 
 
 class DeductionRuleFactory:
@@ -15,6 +20,10 @@ class DeductionRuleFactory:
     """
     _instance = None # Singleton instance
 
+    # Available rules by name, in the default order of application
+    RULES = {'DR1': DR1, 'DR2': DR2, 'DR3': DR3, 'DR4': DR4, 'DR5': DR5, 'DR6': DR6, 'DR7': DR7, 'DR8': DR8,
+             'DR9': DR9}
+
     def __new__(cls):
         """
         Singleton instance creation.
@@ -25,6 +34,36 @@ class DeductionRuleFactory:
             cls._instance = super(DeductionRuleFactory, cls).__new__(cls)
         return cls._instance
 
+    @classmethod
+    def create_rule(cls, name):
+        """
+        Create a deduction rule from its name.
+        Args:
+            name (str): The name of the rule (e.g. 'DR3').
+        Returns:
+            DeductionRule: The new rule.
+        Raises:
+            ValueError: If no rule has this name.
+        """
+        if name not in cls.RULES:
+            raise ValueError(f"Unknown rule '{name}', expected one of {', '.join(cls.RULES)}.")
+        return cls.RULES[name]()
+
+    @classmethod
+    def create_scheduler(cls, names=None, adaptive=False):
+        """
+        Create a scheduler applying the given rules, to be used in place of the rule chain.
+        Args:
+            names (list): The names of the rules in their initial order, or None for every rule.
+            adaptive (bool): Whether the scheduler reorders the rules from their observed hit rate and cost.
+        Returns:
+            RuleScheduler: The scheduler.
+        Raises:
+            ValueError: If a rule name is unknown.
+        """
+        names = list(cls.RULES) if names is None else names
+        return RuleScheduler([cls.create_rule(name) for name in names], adaptive)
+
     @staticmethod
     def create_rules():
         """
@@ -38,10 +77,18 @@ class DeductionRuleFactory:
         dr3 = DR3()
         dr4 = DR4()
         dr5 = DR5()
+        dr6 = DR6()
+        dr7 = DR7()
+        dr8 = DR8()
+        dr9 = DR9()
         # Set the next rule in the chain
         dr1.set_next(dr2)
         dr2.set_next(dr3)
         dr3.set_next(dr4)
         dr4.set_next(dr5)
+        dr5.set_next(dr6)
+        dr6.set_next(dr7)
+        dr7.set_next(dr8)
+        dr8.set_next(dr9)
         # Return the first rule in the chain
         return dr1
\ No newline at end of file
@@ -0,0 +1,212 @@
+# Author: Noe Florence
+# Description: Compact trace of the deduction steps applied to a Sudoku grid, recorded as an observer of
+# the grid, streamed to a binary file and replayed to explain or audit a solve.
+
+import struct
+from array import array
+
+from SudokuGrid import SudokuGrid
+
+# File header: magic, format version, box size; the starting cell values follow, one byte per cell
+_HEADER = struct.Struct('<4sBB')
+_MAGIC = b'SDKT'
+_VERSION = 1
+
+# One record per changed cell: step number, rule code, cell index, digit placed (0 if none), candidates eliminated
+_RECORD = struct.Struct('<IBHBI')
+
+
+class DeductionTrace:
+    """
+    Records, for every change a step makes to a grid, the step, the rule that made it, the cell, the digit
+    placed and the mask of the candidates eliminated. Records are kept in parallel arrays (12 bytes each on
+    file), written as they come when a path is given, and can be loaded back and replayed step by step.
+    The trace must be attached to the grid before the solving starts.
+    """
+
+    # Rule of each code: the deduction rules, the exact-cover backend, values set outside any rule step,
+    # and the search backend (new codes go last, so that older trace files keep their meaning)
+    RULES = ('DR1', 'DR2', 'DR3', 'DR4', 'DR5', 'DR6', 'DR7', 'DR8', 'DR9', 'dlx', 'manual', 'search')
+
+    _CODES = {rule: code for code, rule in enumerate(RULES)}
+
+    def __init__(self, grid=None, path=None):
+        """
+        Initialize the trace, attaching it to a grid if one is given.
+        Args:
+            grid (SudokuGrid): The grid whose steps to record, or None to attach it later.
+            path (str): Path of the trace file, overwritten, or None to keep the trace in memory only.
+        """
+        self.path = path
+        self.file = None
+        self.grid = None
+        self.start = None
+        self.box = None
+        self.step_count = 0
+        self.steps_of = array('L')
+        self.rules = array('B')
+        self.cells = array('H')
+        self.digits = array('B')
+        self.eliminated = array('L')
+        if grid is not None:
+            self.attach(grid)
+
+    def attach(self, grid):
+        """
+        Start recording the steps of a grid, from its current values.
+        Args:
+            grid (SudokuGrid): The grid, not yet solved.
+        """
+        self.grid = grid
+        self.start = grid.cells[:]
+        self.box = grid.box
+        if self.path is not None:
+            self.file = open(self.path, 'wb')
+            self.file.write(_HEADER.pack(_MAGIC, _VERSION, grid.box))
+            self.file.write(bytes(value if value != -1 else 0 for value in self.start))
+        grid.add_observer(self)
+
+    def update(self, grid, event):
+        """
+        Record the changes of an event of the grid.
+        Args:
+            grid (SudokuGrid): The grid.
+            event (tuple): ('step', rule_name, changes), ('set_value', index, value) or ('batch', events).
+        Raises:
+            ValueError: If the rule of a step cannot be recorded.
+        """
+        kind = event[0]
+        if kind == 'batch':
+            for inner in event[1]:
+                self.update(grid, inner)
+            return
+        if kind == 'step':
+            rule = event[1]
+            changes = event[2]
+        else:
+            rule = 'manual'
+            changes = [(event[1], event[2], 0)]
+        code = self._CODES.get(rule)
+        if code is None:
+            raise ValueError(f"Cannot record a step of the rule {rule!r}.")
+        step = self.step_count
+        self.step_count += 1
+        for index, digit, eliminated in changes:
+            self._append(step, code, index, digit, eliminated)
+            if self.file is not None:
+                self.file.write(_RECORD.pack(step, code, index, digit, eliminated))
+
+    def _append(self, step, code, index, digit, eliminated):
+        """
+        Append a record to the arrays.
+        """
+        self.steps_of.append(step)
+        self.rules.append(code)
+        self.cells.append(index)
+        self.digits.append(digit)
+        self.eliminated.append(eliminated)
+
+    def close(self):
+        """
+        Stop recording and close the trace file.
+        """
+        if self.grid is not None:
+            self.grid.remove_observer(self)
+            self.grid = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self.cells)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a trace file.
+        Args:
+            path (str): Path of a trace file, as written by a trace given that path.
+        Returns:
+            DeductionTrace: The trace, not attached to any grid.
+        Raises:
+            ValueError: If the file is not a trace or is truncated.
+        """
+        trace = cls()
+        with open(path, 'rb') as file:
+            header = file.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise ValueError(f"{path} is not a deduction trace.")
+            magic, version, box = _HEADER.unpack(header)
+            if magic != _MAGIC or version != _VERSION or not 2 <= box <= 5:
+                raise ValueError(f"{path} is not a deduction trace.")
+            num_cells = box ** 4
+            start = file.read(num_cells)
+            data = file.read()
+        if len(start) < num_cells or len(data) % _RECORD.size:
+            raise ValueError(f"{path} is truncated.")
+        trace.box = box
+        trace.start = [value or -1 for value in start]
+        for record in _RECORD.iter_unpack(data):
+            trace._append(*record)
+        trace.step_count = trace.steps_of[-1] + 1 if trace.steps_of else 0
+        return trace
+
+    def steps(self):
+        """
+        Group the records by step.
+        Yields:
+            tuple: The rule of each step and its changes, a list of (index, digit, eliminated) tuples.
+        """
+        step = rule = None
+        changes = []
+        for k, current in enumerate(self.steps_of):
+            if current != step:
+                if changes:
+                    yield rule, changes
+                step, rule, changes = current, self.RULES[self.rules[k]], []
+            changes.append((self.cells[k], self.digits[k], self.eliminated[k]))
+        if changes:
+            yield rule, changes
+
+    def replay(self):
+        """
+        Replay the steps on a new grid built from the starting values.
+        Yields:
+            tuple: The rule of each step, its changes, and the grid once the step is applied.
+        Raises:
+            ValueError: If a step does not apply to the grid.
+        """
+        grid = SudokuGrid(self.start)
+        for rule, changes in self.steps():
+            for index, digit, eliminated in changes:
+                if digit:
+                    grid.set_value(index, digit)
+                if eliminated:
+                    grid.remove_candidates(index, eliminated)
+            yield rule, changes, grid
+
+    def explain(self):
+        """
+        Describe each step in words, replaying the trace to check it.
+        Yields:
+            str: One line per step, e.g. 'Step 3 (DR2): r1c5 = 4; r2c7 - 3,5'.
+        Raises:
+            ValueError: If a step does not apply to the grid.
+        """
+        for number, (rule, changes, grid) in enumerate(self.replay(), 1):
+            size = grid.size
+            digits = grid.masks.digits
+            parts = []
+            for index, digit, eliminated in changes:
+                cell = f"r{index // size + 1}c{index % size + 1}"
+                if digit:
+                    parts.append(f"{cell} = {digit}")
+                if eliminated:
+                    parts.append(f"{cell} - {','.join(map(str, digits[eliminated]))}")
+            yield f"Step {number} ({rule}): {'; '.join(parts)}"
@@ -0,0 +1,268 @@
+# Author: Noe Florence
+# Description: Rates the difficulty of Sudoku grids with a numeric score, without prompting,
+# memoizing the ratings by puzzle string.
+
+from itertools import islice
+from multiprocessing import Pool
+
+from Canonicalizer import canonicalize
+from DeductionRuleFactory import DeductionRuleFactory
+from SudokuGrid import SudokuGrid
+from SudokuSolver import SudokuSolver
+
+# Rule chain of the current worker process, created once by _init_worker
+_worker_rule_chain = None
+_worker_max_score = None
+
+# Weight of a step applying each rule: the integer part of a score is the weight of the hardest step
+WEIGHTS = {'DR1': 1, 'DR2': 2, 'DR3': 3, 'DR5': 4, 'DR7': 4, 'DR4': 5, 'DR6': 6, 'DR8': 7, 'DR9': 8}
+
+# Score of a grid the rules cannot finish
+STALLED_SCORE = 10.0
+
+# Number of hardest steps after which the score stops growing (each one after the first adds 0.1)
+MAX_REPEATS = 10
+
+# Character of each value in a puzzle string: '.' for empty cells, then 1-9 and letters from 10 up to 25
+SYMBOLS = '.123456789ABCDEFGHIJKLMNOP'
+
+# Value of each character read from a puzzle string, -1 for empty cells ('.' or '0'), letters in either case
+_SYMBOL_VALUES = {symbol: value or -1 for value, symbol in enumerate(SYMBOLS)}
+_SYMBOL_VALUES.update({symbol.lower(): value for symbol, value in _SYMBOL_VALUES.items() if symbol.isalpha()})
+_SYMBOL_VALUES['0'] = -1
+
+
+def puzzle_key(values):
+    """
+    Build the puzzle string of a grid, used as memo key.
+    Args:
+        values (list): The cell values, with -1 for empty cells.
+    Returns:
+        str: One character per cell (see SYMBOLS), '.' for empty cells.
+    """
+    return ''.join(SYMBOLS[value] if value != -1 else '.' for value in values)
+
+
+def puzzle_values(key):
+    """
+    Read the cell values back from a puzzle string.
+    Args:
+        key (str): One character per cell, as built by puzzle_key; '0' is also read as an empty cell.
+    Returns:
+        list: The cell values, with -1 for empty cells.
+    Raises:
+        ValueError: If a character is not a value.
+    """
+    try:
+        return list(map(_SYMBOL_VALUES.__getitem__, key))
+    except KeyError as e:
+        raise ValueError(f"Invalid character in the puzzle string: {e.args[0]!r}.") from None
+
+
+def score_of(steps):
+    """
+    Score a solve from the number of steps of each rule, the way rate_grid scores the steps it applies.
+    Args:
+        steps (dict): The number of steps of each rule applied, keyed by rule name.
+    Returns:
+        float: The weight of the hardest rule applied plus 0.1 per other step of that weight, 0.0 without steps.
+    """
+    weights = [(WEIGHTS.get(rule, STALLED_SCORE), count) for rule, count in steps.items() if count]
+    if not weights:
+        return 0.0
+    hardest = max(weight for weight, _ in weights)
+    repeats = sum(count for weight, count in weights if weight == hardest)
+    return round(hardest + (min(repeats, MAX_REPEATS) - 1) / 10, 1)
+
+
+def canonical_key(values):
+    """
+    Build the memo key of a grid shared by every grid equal to it up to symmetry.
+    Args:
+        values (list): The cell values, with -1 for empty cells.
+    Returns:
+        str: The puzzle string of the canonical form of the grid, prefixed with 'rating|'.
+    """
+    return 'rating|' + puzzle_key(canonicalize(values)[0])
+
+
+def _init_worker(max_score):
+    """
+    Initialize a worker process with its own rule chain.
+    Args:
+        max_score (float): The score at which rating a grid stops, or None to always finish the grid.
+    """
+    global _worker_rule_chain, _worker_max_score
+    _worker_rule_chain = DeductionRuleFactory().create_rules()
+    _worker_max_score = max_score
+
+
+def rate_grid(values, rule_chain=None, max_score=None):
+    """
+    Rate a single grid from the sequence of rules needed to solve it.
+    The rule chain always applies the cheapest rule that makes progress, so the steps are the easiest
+    sequence the rules can find. The score is the weight of the hardest step plus 0.1 per other step of
+    that weight (up to 0.9); grids the rules cannot finish score STALLED_SCORE.
+    Args:
+        values (list): The cell values, with -1 for empty cells.
+        rule_chain (DeductionRule): The rule chain to use, or None for the worker's chain and max_score.
+        max_score (float): Fast path: stop as soon as the score reaches max_score, the grid being then only
+                           known to score at least that much ('capped'). None always finishes the grid.
+    Returns:
+        dict: The score, difficulty label, hardest rule, number of steps, whether the rules solved the grid
+              and whether the rating was capped by max_score. An inconsistent grid has no score and the
+              label 'Invalid'.
+    """
+    if rule_chain is None:
+        rule_chain, max_score = _worker_rule_chain, _worker_max_score
+    rating = {'score': None, 'label': 'Invalid', 'hardest': None, 'steps': 0, 'solved': False, 'capped': False}
+    used_rules = set()
+    score = 0.0
+    try:
+        grid = SudokuGrid(values)
+        hardest = repeats = 0
+        while not grid.is_solved():
+            rule_name = rule_chain.handle(grid)
+            if grid.singles_propagated:
+                # Naked singles placed by the grid's propagation during a step are the work of DR1
+                used_rules.add('DR1')
+            if not rule_name:
+                break
+            used_rules.add(rule_name)
+            rating['steps'] += 1
+            weight = WEIGHTS.get(rule_name, STALLED_SCORE)
+            if weight > hardest:
+                hardest, repeats = weight, 1
+                rating['hardest'] = rule_name
+            elif weight == hardest:
+                repeats += 1
+            score = round(hardest + (min(repeats, MAX_REPEATS) - 1) / 10, 1)
+            if max_score is not None and score >= max_score:
+                rating['capped'] = True
+                break
+    except ValueError:
+        return rating
+    rating['solved'] = grid.is_solved()
+    if rating['solved'] or rating['capped']:
+        rating['score'] = score
+        rating['label'] = SudokuSolver.difficulty_of(used_rules)
+    else:
+        rating['score'] = STALLED_SCORE
+        rating['label'] = "Very Hard"
+    return rating
+
+
+class DifficultyRater:
+    """
+    Rates grids with rate_grid, reusing the ratings memoized for puzzles already rated.
+    """
+
+    def __init__(self, memo=None, processes=1, chunksize=64, block_size=4096, max_score=None, canonical=False):
+        """
+        Initialize the DifficultyRater.
+        Args:
+            memo (ResultMemo): The memo of ratings, or None to rate every grid.
+            processes (int): The number of worker processes rating the grids missing from the memo,
+                             1 to rate them in this process, or None for one per CPU.
+            chunksize (int): The number of grids sent to a worker at once.
+            block_size (int): The number of grids read from the input before rating the missing ones.
+            max_score (float): The score at which rating a grid stops (see rate_grid), or None to
+                               always finish the grids.
+            canonical (bool): Whether to key the memo on the canonical form of the grids, so that grids
+                              equal up to symmetry share their rating.
+        """
+        self.memo = memo
+        self.processes = processes
+        self.chunksize = chunksize
+        self.block_size = block_size
+        self.max_score = max_score
+        self.canonical = canonical
+        self.rule_chain = DeductionRuleFactory().create_rules() if processes == 1 else None
+
+    def rate(self, values):
+        """
+        Rate a single grid.
+        Args:
+            values (list): The cell values, with -1 for empty cells.
+        Returns:
+            dict: The rating of the grid (see rate_grid), with its puzzle string under 'puzzle'.
+        """
+        return next(self.rate_many([values]))
+
+    def rate_many(self, grids):
+        """
+        Rate many grids, block by block, in input order.
+        Args:
+            grids (iterable): Lists of cell values, with -1 for empty cells.
+        Yields:
+            dict: The rating of each grid (see rate).
+        """
+        grids = iter(grids)
+        pool = None
+        if self.processes != 1:
+            pool = Pool(self.processes, _init_worker, (self.max_score,))
+        try:
+            while True:
+                block = list(islice(grids, self.block_size))
+                if not block:
+                    break
+                yield from self._rate_block(pool, block)
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+    def rate_file(self, file_path):
+        """
+        Rate every grid of a file.
+        Args:
+            file_path (str): Path to a file of grids, in the batch input format.
+        Yields:
+            dict: The rating of each grid (see rate).
+        """
+        # Imported here since Main imports this module
+        from Main import parse_batch_input
+        yield from self.rate_many(parse_batch_input(file_path))
+
+    def _rate_block(self, pool, block):
+        """
+        Rate a block of grids, looking them up in the memo first.
+        Args:
+            pool (Pool): The worker pool, or None to rate the grids in this process.
+            block (list): The grids of the block.
+        Returns:
+            list: The ratings of the block, in input order.
+        """
+        if self.canonical:
+            # Canonicalizing can take a while on grids with many symmetries, the workers share it
+            keys = list(map(canonical_key, block)) if pool is None else pool.map(canonical_key, block, self.chunksize)
+        else:
+            keys = [puzzle_key(values) for values in block]
+        ratings = [None] * len(block)
+        missing = []
+        # Position of the first grid of the block with each missing key, rated once for its duplicates
+        first = {}
+        for k, key in enumerate(keys):
+            if key in first:
+                continue
+            rating = self.memo.get(key) if self.memo is not None else None
+            if rating is not None and rating['capped'] and (self.max_score is None or rating['score'] < self.max_score):
+                # A rating capped lower than now requested does not tell the score
+                rating = None
+            if rating is None:
+                first[key] = k
+                missing.append(k)
+            else:
+                ratings[k] = dict(rating, puzzle=puzzle_key(block[k]))
+        grids = [block[k] for k in missing]
+        if pool is None:
+            computed = (rate_grid(values, self.rule_chain, self.max_score) for values in grids)
+        else:
+            computed = pool.imap(rate_grid, grids, self.chunksize)
+        for k, rating in zip(missing, computed):
+            if self.memo is not None:
+                self.memo.put(keys[k], rating)
+            ratings[k] = dict(rating, puzzle=puzzle_key(block[k]))
+        for k, key in enumerate(keys):
+            if ratings[k] is None:
+                ratings[k] = dict(ratings[first[key]], puzzle=puzzle_key(block[k]))
+        return ratings
@@ -0,0 +1,74 @@
+# Author: Noe Florence
+# Description: Exact-cover backend encoding a Sudoku grid as the constraint matrix solved with Dancing Links
+# (324 constraints for a 9x9 grid).
+
+from DancingLinks import DancingLinks
+
+
+class ExactCoverSolver:
+    """
+    Completes a Sudoku grid by solving its exact-cover encoding.
+    For a grid of n cells and size digits, columns 0 to n-1 require each cell to be filled, and the column
+    n + unit * size + digit - 1 each digit once per unit (rows, then columns, then blocks).
+    On a 9x9 grid, columns 0-80 are the cells, 81-161 the rows, 162-242 the columns and 243-323 the blocks.
+    """
+
+    @staticmethod
+    def _columns(grid, index, value):
+        """
+        Compute the constraint columns covered by placing a value in a cell.
+        Args:
+            grid (SudokuGrid): The Sudoku grid, giving the units of the cell.
+            index (int): The index of the cell.
+            value (int): The value placed in the cell (1 to the grid size).
+        Returns:
+            tuple: The four column indices covered by the placement.
+        """
+        size = grid.size
+        offset = len(grid.cells) + value - 1
+        row, col, block = grid.cell_units[index]
+        return (index, offset + row * size, offset + col * size, offset + block * size)
+
+    def build_matrix(self, grid):
+        """
+        Build the exact-cover matrix seeded from the current state of the grid.
+        Filled cells are selected up front and empty cells only offer their remaining candidates,
+        so every elimination already made by the deduction rules shrinks the search.
+        Args:
+            grid (SudokuGrid): The Sudoku grid to encode.
+        Returns:
+            DancingLinks: The matrix, or None if the filled cells already conflict.
+        """
+        num_cells = len(grid.cells)
+        matrix = DancingLinks(num_cells + len(grid.units) * grid.size)
+        digits = grid.masks.digits
+        for index in range(num_cells):
+            value = grid.cells[index]
+            values = (value,) if value != -1 else digits[grid.candidates[index]]
+            for value in values:
+                matrix.add_row((index, value), self._columns(grid, index, value))
+        for index in range(num_cells):
+            value = grid.cells[index]
+            if value != -1 and not matrix.select((index, value)):
+                return None
+        return matrix
+
+    def solve(self, grid, limit=1):
+        """
+        Find solutions of the grid without modifying it.
+        Args:
+            grid (SudokuGrid): The Sudoku grid to solve.
+            limit (int): The maximum number of solutions to return.
+        Returns:
+            list: Up to limit solutions, each a list of cell values.
+        """
+        matrix = self.build_matrix(grid)
+        if matrix is None:
+            return []
+        solutions = []
+        for rows in matrix.solve(limit):
+            values = grid.cells[:]
+            for index, value in rows:
+                values[index] = value
+            solutions.append(values)
+        return solutions
@@ -0,0 +1,140 @@
+# Author: Noe Florence
+# Description: Interactive hint session: keeps the grid of a player and its candidates up to date edit after
+# edit, and finds the next deduction from the current entries without solving the grid.
+
+from DeductionRuleFactory import DeductionRuleFactory
+from SudokuGrid import SudokuGrid
+
+
+class HintSession:
+    """
+    The grid of a player, from the givens of a puzzle and the values entered since. Setting a value updates
+    the candidates of its peers, and clearing one recomputes the candidates of its peers only, so an edit
+    costs about as much as one placement. Cells are never filled on their own, the grid holds exactly the
+    entries of the player.
+    A hint runs the rules from the current entries until one places a value, on the grid's trail, then
+    undoes them: asking for a hint never changes the session.
+    """
+
+    def __init__(self, values, rule_names=None):
+        """
+        Start a session on a puzzle.
+        Args:
+            values (list): The givens, with -1 for empty cells.
+            rule_names (list): The rules giving the hints, in order, or None for the default chain.
+        Raises:
+            ValueError: If the puzzle is inconsistent or a rule name is unknown.
+        """
+        self.grid = SudokuGrid(values)
+        # The player's entries only: no naked single is placed unless the player or a hint places it
+        self.grid.propagate_singles = False
+        self.givens = frozenset(index for index, value in enumerate(values) if value != -1)
+        if rule_names is None:
+            self.rule_chain = DeductionRuleFactory().create_rules()
+        else:
+            self.rule_chain = DeductionRuleFactory.create_scheduler(rule_names)
+
+    @property
+    def values(self):
+        """
+        list: The current cell values, with -1 for empty cells.
+        """
+        return self.grid.cells[:]
+
+    def candidates(self, index):
+        """
+        Args:
+            index (int): The index of the cell.
+        Returns:
+            tuple: The candidate digits of an empty cell, given the values placed in its units.
+        """
+        return self.grid.get_candidates(index)
+
+    def set_value(self, index, value):
+        """
+        Enter a value in a cell, replacing the value it held.
+        Args:
+            index (int): The index of the cell.
+            value (int): The value (1 to the grid size).
+        Raises:
+            ValueError: If the cell is a given, or if the value is placed in a unit of the cell or leaves a peer
+                        without candidates; the session is then unchanged.
+        """
+        grid = self.grid
+        self._check_editable(index)
+        if not 1 <= value <= grid.size:
+            raise ValueError(f"The value must be between 1 and {grid.size}.")
+        previous = grid.cells[index]
+        if previous == value:
+            return
+        grid.clear_value(index)
+        position = grid.start_trail()
+        try:
+            grid.set_value(index, value)
+        except ValueError:
+            grid.undo(position)
+            if previous != -1:
+                grid.set_value(index, previous)
+            raise ValueError(f"{value} conflicts with the values of the grid.") from None
+        finally:
+            grid.stop_trail()
+
+    def clear(self, index):
+        """
+        Empty a cell, giving its value back to the candidates of its peers.
+        Args:
+            index (int): The index of the cell.
+        Raises:
+            ValueError: If the cell is a given.
+        """
+        self._check_editable(index)
+        self.grid.clear_value(index)
+
+    def _check_editable(self, index):
+        """
+        Args:
+            index (int): The index of a cell.
+        Raises:
+            ValueError: If there is no such cell or the cell is a given.
+        """
+        if not 0 <= index < len(self.grid.cells):
+            raise ValueError(f"The cell index must be between 0 and {len(self.grid.cells) - 1}.")
+        if index in self.givens:
+            raise ValueError(f"Cell {index} is a given.")
+
+    def hint(self):
+        """
+        Find the next value the rules can place from the current entries.
+        Returns:
+            dict: The rule placing it (None if the grid is solved or the rules stall), the (index, value) pairs
+                  it places and the (index, digits) pairs it eliminates, whether the grid is solved and whether
+                  the entries are consistent; 'because' lists the steps that only eliminate candidates needed
+                  first, each with its rule and eliminations.
+        """
+        grid = self.grid
+        hint = {'rule': None, 'placed': [], 'eliminated': [], 'solved': grid.is_solved(), 'consistent': True,
+                'because': []}
+        if hint['solved']:
+            return hint
+        digits = grid.masks.digits
+        position = grid.start_trail()
+        try:
+            while True:
+                state = grid.capture()
+                rule_name = self.rule_chain.handle(grid)
+                if not rule_name:
+                    break
+                changes = grid.changes_since(state)
+                placed = [[index, digit] for index, digit, _ in changes if digit]
+                eliminated = [[index, list(digits[mask])] for index, _, mask in changes if mask]
+                if placed:
+                    hint.update(rule=rule_name, placed=placed, eliminated=eliminated)
+                    break
+                hint['because'].append({'rule': rule_name, 'eliminated': eliminated})
+        except ValueError:
+            # The entries contradict the puzzle: no step follows from them
+            hint.update(rule=None, placed=[], eliminated=[], consistent=False, because=[])
+        finally:
+            grid.undo(position)
+            grid.stop_trail()
+        return hint
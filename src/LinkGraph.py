@@ -0,0 +1,148 @@
+# Author: Noe Florence
+# Description: Strong and weak link graph between the candidates of a Sudoku grid, used by the chain rules.
+# A candidate (cell, digit) is a node numbered index * size + digit - 1, size being the number of digits.
+
+
+class LinkGraph:
+    """
+    Strong and weak links between the candidates of a grid.
+    Two candidates are strongly linked when at least one of them is true: a digit with exactly two places
+    left in a unit (conjugate pair), or the two candidates of a bivalue cell. They are weakly linked when
+    at most one of them is true: the same digit in two peer cells, or two digits of the same cell.
+    Strong links are stored and updated from the units and cells changed since the last update; weak links
+    are read directly from the grid's per-digit bitboards.
+    """
+
+    def __init__(self, key):
+        """
+        Initialize an empty link graph.
+        Args:
+            key (str): The key under which the graph reads the grid's change log.
+        """
+        self.key = key
+        self.grid = None
+        self.size = 9
+        self.conjugates = [None] * (27 * 9)     # For each unit and digit, its conjugate pair of cells or None
+        self.strong = [{} for _ in range(10)]   # For each digit, cell -> {conjugate cell: number of units}
+        self.bivalues = 0                       # Cell mask of the cells with exactly two candidates
+
+    def update(self, grid):
+        """
+        Bring the strong links up to date with the grid.
+        A different grid than the last one is rebuilt from scratch; otherwise only the units and cells
+        changed since the last update are read. The caller records the update with grid.mark_seen(key, ...).
+        Args:
+            grid (SudokuGrid): The Sudoku grid.
+        Returns:
+            bool: True if the grid changed since the last update, False otherwise.
+        """
+        size = grid.size
+        if grid is not self.grid:
+            self.grid = grid
+            self.size = size
+            self.conjugates = [None] * (len(grid.units) * size)
+            self.strong = [{} for _ in range(size + 1)]
+            self.bivalues = 0
+            units = range(len(grid.units))
+            cells = range(len(grid.cells))
+        else:
+            cells = grid.dirty_cells(self.key)
+            if not cells:
+                return False
+            units = grid.dirty_units(self.key)
+        boards = grid.boards
+        unit_masks = grid.unit_masks
+        conjugates = self.conjugates
+        for number in units:
+            unit_mask = unit_masks[number]
+            for digit in range(1, size + 1):
+                slot = number * size + digit - 1
+                where = boards[digit] & unit_mask
+                rest = where & (where - 1)
+                if where and rest and not rest & (rest - 1):
+                    pair = ((where & -where).bit_length() - 1, rest.bit_length() - 1)
+                else:
+                    pair = None
+                if pair != conjugates[slot]:
+                    if conjugates[slot] is not None:
+                        self._unlink(digit, *conjugates[slot])
+                    if pair is not None:
+                        self._link(digit, *pair)
+                    conjugates[slot] = pair
+        candidates = grid.candidates
+        popcount = grid.masks.popcount
+        for index in cells:
+            if popcount[candidates[index]] == 2:
+                self.bivalues |= 1 << index
+            else:
+                self.bivalues &= ~(1 << index)
+        return True
+
+    def _link(self, digit, first, second):
+        """
+        Add a conjugate pair of a digit to the strong links.
+        Args:
+            digit (int): The digit.
+            first (int): The index of the first cell.
+            second (int): The index of the second cell.
+        """
+        strong = self.strong[digit]
+        for cell, other in ((first, second), (second, first)):
+            links = strong.setdefault(cell, {})
+            links[other] = links.get(other, 0) + 1
+
+    def _unlink(self, digit, first, second):
+        """
+        Remove a conjugate pair of a digit from the strong links.
+        A pair stays linked as long as another unit (a row or column and a block) still makes it conjugate.
+        Args:
+            digit (int): The digit.
+            first (int): The index of the first cell.
+            second (int): The index of the second cell.
+        """
+        strong = self.strong[digit]
+        for cell, other in ((first, second), (second, first)):
+            links = strong[cell]
+            if links[other] == 1:
+                del links[other]
+                if not links:
+                    del strong[cell]
+            else:
+                links[other] -= 1
+
+    def strong_links(self, node):
+        """
+        Get the candidates strongly linked to a candidate.
+        Args:
+            node (int): The candidate, numbered index * size + digit - 1.
+        Returns:
+            list: The strongly linked candidates.
+        """
+        size = self.size
+        index, digit = divmod(node, size)
+        digit += 1
+        links = [cell * size + digit - 1 for cell in self.strong[digit].get(index, ())]
+        if self.bivalues >> index & 1:
+            other = self.grid.candidates[index] & ~(1 << (digit - 1))
+            links.append(index * size + other.bit_length() - 1)
+        return links
+
+    def weak_links(self, node):
+        """
+        Get the candidates weakly linked to a candidate.
+        Args:
+            node (int): The candidate, numbered index * size + digit - 1.
+        Returns:
+            list: The weakly linked candidates.
+        """
+        size = self.size
+        index, digit = divmod(node, size)
+        digit += 1
+        grid = self.grid
+        links = [index * size + other - 1 for other in grid.masks.digits[grid.candidates[index]] if other != digit]
+        cells = grid.boards[digit] & grid.peer_masks[index]
+        while cells:
+            lowest = cells & -cells
+            links.append((lowest.bit_length() - 1) * size + digit - 1)
+            cells ^= lowest
+        return links
@@ -1,59 +1,439 @@
 # Author: Noe Florence
 # Description: Main script to run the Sudoku solver.
 
-import sys
+import argparse
+import asyncio
+from contextlib import closing
 
+from BatchSolver import BatchSolver
+from DeductionTrace import DeductionTrace
+from DifficultyRater import DifficultyRater, puzzle_key, puzzle_values
+from PuzzleCorpus import PuzzleCorpus
+from PuzzleGenerator import PuzzleGenerator
+from ResultMemo import ResultMemo
+from ResultsFile import ResultsFile
+from RuleStats import RuleStats
+from SolutionCache import SolutionCache
+from SolveService import SolveService
 from SudokuFacade import SudokuFacade
+from SudokuGrid import SudokuGrid
+from SudokuSolver import SudokuSolver
 
 
 def parse_input(file_path):
     """
-    Parse the input file to extract the Sudoku grid values.
+    Parse the input file to extract the values of its single Sudoku grid, in any of the formats read by
+    parse_batch_input.
     Args:
         file_path (str): Path to the input file.
     Returns:
-        list: A list of 81 integers representing the Sudoku grid.
+        list: A list of integers representing the Sudoku grid (81 for a 9x9 grid).
+    Raises:
+        ValueError: If the input file does not contain exactly one valid Sudoku grid.
+    """
+    grids = parse_batch_input(file_path)
+    grid_values = next(grids, None)
+    if grid_values is None:
+        raise ValueError("The file does not contain any grid.")
+    if next(grids, None) is not None:
+        raise ValueError("The file must contain a single grid.")
+    return grid_values
+
+
+def parse_line(line, size=None):
+    """
+    Parse one comma-separated row of a Sudoku grid.
+    Args:
+        line (str): A stripped, non-empty line of the input file.
+        size (int): The number of values of the rows of the grid, or None for a first row (4, 9, 16 or 25).
+    Returns:
+        list: The integers of the row, with -1 for empty cells.
+    Raises:
+        ValueError: If the line does not contain size valid numbers.
+    """
+    # 0 and -1 both stand for an empty cell
+    numbers = [int(num) or -1 for num in line.split(',')]
+    if size is None:
+        size = len(numbers)
+        if size not in (4, 9, 16, 25):
+            raise ValueError("A row must contain 4, 9, 16 or 25 numbers.")
+    elif len(numbers) != size:
+        raise ValueError(f"Each line must contain {size} numbers.")
+    if min(numbers) < -1 or max(numbers) > size:
+        raise ValueError(f"The values must be between 1 and {size}.")
+    return numbers
+
+
+def parse_puzzle_line(line):
+    """
+    Parse a grid written on a single line: one character per cell (81 for a 9x9 grid), '.' or '0' for
+    empty cells and letters for the values from 10 up. Anything after the first blank is ignored.
+    Args:
+        line (str): A stripped, non-empty line of the input file.
+    Returns:
+        list: The integers of the grid, with -1 for empty cells.
+    Raises:
+        ValueError: If the line is not a valid grid.
+    """
+    grid_values = puzzle_values(line.split(None, 1)[0])
+    size = SudokuGrid.box_size_of(len(grid_values)) ** 2
+    if max(grid_values) > size:
+        raise ValueError(f"The values must be between 1 and {size}.")
+    return grid_values
+
+
+def parse_batch_input(file_path):
+    """
+    Parse an input file holding many Sudoku grids, one after another, reading it as a stream.
+    A text file mixes two layouts, blank lines being ignored:
+    - comma-separated rows, as many as the first row of the grid has numbers (9 for a 9x9 grid);
+    - one grid per line, without commas (see parse_puzzle_line).
+    A packed binary corpus (see PuzzleCorpus) is read through mmap instead.
+    Args:
+        file_path (str): Path to the input file.
+    Yields:
+        list: A list of integers for each grid, in file order.
     Raises:
         ValueError: If the input file does not contain valid Sudoku grid data.
     """
-    with open(file_path, 'r') as file:
-        lines = file.readlines()
+    if PuzzleCorpus.is_corpus(file_path):
+        with PuzzleCorpus(file_path) as corpus:
+            yield from corpus
+        return
     grid_values = []
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        numbers = []
-        for num in line.split(','):
-            num = num.strip()
-            if num in ('0', '-1'):
-                numbers.append(-1)
-            else:
-                numbers.append(int(num))
-        if len(numbers) != 9:
-            raise ValueError("Each line must contain 9 numbers.")
-        grid_values.extend(numbers)
-    if len(grid_values) != 81:
-        raise ValueError("The grid must contain 81 numbers.")
-    return grid_values
+    size = None
+    with open(file_path, 'r') as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            if size is None and ',' not in line:
+                yield parse_puzzle_line(line)
+                continue
+            row = parse_line(line, size)
+            size = len(row)
+            grid_values.extend(row)
+            if len(grid_values) == size * size:
+                yield grid_values
+                grid_values = []
+                size = None
+    if grid_values:
+        raise ValueError(f"The last grid must contain {size * size} numbers.")
+
+
+def pack_corpus(file_path, corpus_path):
+    """
+    Convert the grids of a file to a packed binary corpus and print how many were packed.
+    Args:
+        file_path (str): Path to the input file, in any format read by parse_batch_input.
+        corpus_path (str): Path of the corpus file, overwritten.
+    """
+    try:
+        count = PuzzleCorpus.write(corpus_path, parse_batch_input(file_path))
+        print(f"Packed {count} grids into {corpus_path}")
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+def parse_band(text):
+    """
+    Parse a band of difficulty scores.
+    Args:
+        text (str): 'LOW:HIGH', either bound being optional (1 and 10 by default).
+    Returns:
+        tuple: The lowest and highest scores of the band.
+    Raises:
+        ValueError: If the band is malformed.
+    """
+    low, separator, high = text.partition(':')
+    if not separator:
+        raise ValueError(f"Invalid band {text!r}, expected LOW:HIGH.")
+    return float(low or 1.0), float(high or 10.0)
+
+
+def explain_trace(trace_path):
+    """
+    Replay a deduction trace and print the starting grid, then one line per step.
+    Args:
+        trace_path (str): Path of the trace file.
+    """
+    try:
+        trace = DeductionTrace.load(trace_path)
+        SudokuGrid(trace.start).print_grid()
+        for line in trace.explain():
+            print(line)
+        print(f"Replayed {trace.step_count} steps, {len(trace)} changes")
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+def show_results(results_path):
+    """
+    Print the records of a results file, one line per grid, then how many grids are done.
+    Args:
+        results_path (str): Path of the results file.
+    """
+    try:
+        with ResultsFile(results_path) as results:
+            for record in results:
+                score = '-' if record['score'] is None else f"{record['score']:.1f}"
+                rules = ','.join(record['rules']) or '-'
+                print(f"{record['index'] + 1}: {record['status']} | {record['difficulty'] or '-'} | {score} "
+                      f"| {rules} | {puzzle_key(record['cells'])}")
+            print(f"{results.done_count()} of {len(results)} grids done")
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+def generate_puzzles(output_path, count, band, workers=None, seed=0, max_attempts=PuzzleGenerator.MAX_ATTEMPTS):
+    """
+    Generate puzzles within a band of difficulty scores and write each one to a file as soon as it is accepted,
+    as a puzzle line followed by its score and difficulty label.
+    Args:
+        output_path (str): Path of the output file, overwritten; it can be read back by parse_batch_input.
+        count (int): The number of puzzles to generate.
+        band (tuple): The lowest and highest scores accepted.
+        workers (int): The number of worker processes, or None for one per CPU.
+        seed (int): The seed of the first candidate.
+        max_attempts (int): The number of candidates tried before giving up.
+    """
+    generated = 0
+    try:
+        generator = PuzzleGenerator(band[0], band[1], processes=workers)
+        with open(output_path, 'w') as file:
+            for puzzle in generator.generate(count, seed, max_attempts):
+                generated += 1
+                rating = puzzle['rating']
+                file.write(f"{puzzle_key(puzzle['values'])} {rating['score']:.1f} {rating['label']}\n")
+                file.flush()
+                print(f"{generated}: {rating['score']:.1f} | {rating['label']} | {puzzle['clues']} clues "
+                      f"| seed {puzzle['seed']}")
+    except Exception as e:
+        print(f"Error: {e}")
+    print(f"Generated {generated} puzzles into {output_path}")
 
 
 def main():
     """
     Main function to run the Sudoku solver.
     """
-    if len(sys.argv) != 2:
-        print("Usage: python sudoku_solver.py <input_file>")
+    parser = argparse.ArgumentParser(description="Solve a Sudoku puzzle with deduction rules.")
+    parser.add_argument('input_file', nargs='?',
+                        help="file containing the grid (4x4, 9x9, 16x16 or 25x25), one comma-separated row per line "
+                             "or the whole grid on one line; several grids, or a packed corpus, in batch mode")
+    parser.add_argument('--batch', action='store_true',
+                        help="solve every grid of the file in parallel, without prompting")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="number of worker processes in batch mode and of the parallel backend "
+                             "(default: one per CPU)")
+    parser.add_argument('--vectorized', action='store_true',
+                        help="in batch mode, propagate the singles over many grids at once with NumPy first")
+    parser.add_argument('--backend', choices=SudokuSolver.BACKENDS, default='rules',
+                        help="how to finish the grid when the rules stall: prompt the user (rules), "
+                             "solve it with Dancing Links (dlx), backtrack, running the rules at every node (search), "
+                             "or split that search across --workers processes (parallel)")
+    parser.add_argument('--rules', type=lambda value: value.split(','), metavar='DR1,DR2,...',
+                        help="comma-separated rules to apply, in order (default: DR1 to DR9)")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="reorder the rules from their observed hit rate and cost")
+    parser.add_argument('--stats', metavar='FILE',
+                        help="record per-rule statistics and write them to FILE as JSON")
+    parser.add_argument('--rate', action='store_true',
+                        help="rate the difficulty of every grid of the file instead of solving it")
+    parser.add_argument('--memo', metavar='FILE',
+                        help="with --rate, reuse and record the ratings in the on-disk memo FILE")
+    parser.add_argument('--max-score', type=float, default=None,
+                        help="with --rate, stop rating a grid once its score reaches this value")
+    parser.add_argument('--cache', metavar='FILE',
+                        help="reuse and record the results of grids equal up to symmetry (solutions, "
+                             "or ratings with --rate) in the on-disk cache FILE")
+    parser.add_argument('--cache-size', type=int, default=ResultMemo.MAX_STORED, metavar='N',
+                        help="the number of results kept in the --cache or --memo FILE, the oldest being evicted "
+                             f"first (default: {ResultMemo.MAX_STORED})")
+    parser.add_argument('--serve', metavar='ADDRESS',
+                        help="serve JSON solve, rate and hint requests on ADDRESS (host:port or a Unix socket "
+                             "path) instead of reading a file")
+    parser.add_argument('--client-limit', type=int, default=16,
+                        help="with --serve, the number of requests of a client processed at once")
+    parser.add_argument('--max-pending', type=int, default=256,
+                        help="with --serve, the number of requests waiting for or running in the workers")
+    parser.add_argument('--pack', metavar='CORPUS',
+                        help="convert the grids of the file to the packed binary corpus CORPUS instead of solving them")
+    parser.add_argument('--generate', metavar='FILE',
+                        help="generate unique puzzles scoring within --band and write them to FILE, one per line, "
+                             "instead of reading a file")
+    parser.add_argument('--count', type=int, default=10,
+                        help="with --generate, the number of puzzles to generate")
+    parser.add_argument('--band', type=parse_band, default=(1.0, 10.0), metavar='LOW:HIGH',
+                        help="with --generate, the scores accepted, bounds included (default: 1:10)")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="with --generate, the seed of the first candidate")
+    parser.add_argument('--max-attempts', type=int, default=PuzzleGenerator.MAX_ATTEMPTS,
+                        help="with --generate, the number of candidates tried before giving up on the band "
+                             f"(default: {PuzzleGenerator.MAX_ATTEMPTS})")
+    parser.add_argument('--trace', metavar='FILE',
+                        help="record every deduction step of the solve in the binary trace FILE")
+    parser.add_argument('--explain', metavar='TRACE',
+                        help="replay a trace recorded with --trace and print its steps instead of solving")
+    parser.add_argument('--results', metavar='FILE',
+                        help="in batch mode, write the results to the binary results FILE; if FILE holds a run "
+                             "interrupted on the same grids and settings, only the grids left are solved")
+    parser.add_argument('--show-results', metavar='FILE',
+                        help="print the records of a results file written with --results instead of solving")
+    args = parser.parse_args()
+    if args.explain:
+        explain_trace(args.explain)
+        return
+    if args.show_results:
+        show_results(args.show_results)
+        return
+    if args.generate:
+        generate_puzzles(args.generate, args.count, args.band, args.workers, args.seed, args.max_attempts)
+        return
+    if args.serve:
+        serve(args.serve, args.backend, args.workers, args.rules, args.adaptive, args.max_score,
+              args.max_pending, args.client_limit)
+        return
+    if args.input_file is None:
+        parser.error("an input file is required unless --serve, --generate, --explain or --show-results is given")
+    if args.pack:
+        pack_corpus(args.input_file, args.pack)
+        return
+    if args.rate:
+        if args.cache:
+            rate_batch(args.input_file, args.workers, args.cache, args.max_score, canonical=True,
+                       memo_size=args.cache_size)
+        else:
+            rate_batch(args.input_file, args.workers, args.memo, args.max_score, memo_size=args.cache_size)
+        return
+    if args.batch:
+        solve_batch(args.input_file, args.backend, args.workers, args.vectorized, args.stats,
+                    args.rules, args.adaptive, args.cache, args.results, args.cache_size)
         return
-    file_path = sys.argv[1]
     try:
-        initial_values = parse_input(file_path)
-        # Create a SudokuFacade object and solve the puzzle
-        facade = SudokuFacade(initial_values)
-        facade.solve()
+        initial_values = parse_input(args.input_file)
+        with ResultMemo(args.cache, max_stored=args.cache_size) as memo:
+            cache = SolutionCache(memo) if args.cache else None
+            # Create a SudokuFacade object and solve the puzzle
+            facade = SudokuFacade(initial_values, args.backend, args.stats is not None, args.rules, args.adaptive,
+                                  cache, args.workers)
+            with DeductionTrace(facade.grid if args.trace else None, args.trace):
+                facade.solve()
+        if args.stats:
+            facade.solver.stats.dump(args.stats)
 
     except Exception as e:
         print(f"Error: {e}")
 
+def solve_batch(file_path, backend, workers, vectorized=False, stats_path=None, rule_names=None, adaptive=False,
+                cache_path=None, results_path=None, cache_size=ResultMemo.MAX_STORED):
+    """
+    Solve every grid of a file with a pool of worker processes and print one line per grid.
+    Args:
+        file_path (str): Path to the input file.
+        backend (str): The backend used when the deduction rules stall.
+        workers (int): The number of worker processes, or None for one per CPU.
+        vectorized (bool): Whether to propagate the singles with the NumPy engine first.
+        stats_path (str): Path of the JSON file receiving the per-rule statistics summed over the grids, or None.
+        rule_names (list): The rules to apply, in order, or None for the default chain.
+        adaptive (bool): Whether to reorder the rules from their observed hit rate and cost.
+        cache_path (str): Path of the on-disk cache of results, or None to solve every grid.
+        results_path (str): Path of the results file of the run, created or resumed, or None.
+        cache_size (int): The maximum number of results kept in the on-disk cache.
+    """
+    counts = {}
+    stats = RuleStats()
+    memo = ResultMemo(cache_path, max_stored=cache_size)
+    results = None
+    try:
+        cache = SolutionCache(memo) if cache_path else None
+        if results_path:
+            # The grids are read once more to size the file, or to check that it belongs to this run
+            results = ResultsFile.open_for(results_path, parse_batch_input(file_path),
+                                           SolutionCache.namespace_of(backend, rule_names, adaptive))
+            if results.done_count():
+                print(f"Resuming: {results.done_count()} of {len(results)} grids already done")
+        batch = BatchSolver(backend, workers, vectorized=vectorized, collect_stats=stats_path is not None,
+                            rule_names=rule_names, adaptive=adaptive, cache=cache, results=results)
+        # Closed before the counts are printed, so that the grids received are checkpointed on an interruption
+        with closing(batch.solve(parse_batch_input(file_path))) as solved:
+            for result in solved:
+                counts[result['status']] = counts.get(result['status'], 0) + 1
+                if stats_path and 'stats' in result:
+                    stats.merge(result['stats'])
+                solution = puzzle_key(result['cells'])
+                rules = ','.join(result['rules']) or '-'
+                print(f"{result['index'] + 1}: {result['status']} | {result['difficulty'] or '-'} | {rules} "
+                      f"| {solution}")
+    except KeyboardInterrupt:
+        if results is not None:
+            print(f"Interrupted: {results.done_count()} of {len(results)} grids done, "
+                  f"run again with --results {results_path} to finish")
+        else:
+            print("Interrupted")
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        memo.close()
+        if results is not None:
+            results.close()
+    summary = ', '.join(f"{count} {status}" for status, count in sorted(counts.items()))
+    print(f"Processed {sum(counts.values())} grids: {summary or 'none'}")
+    if stats_path:
+        print(stats)
+        stats.dump(stats_path)
+
+
+def rate_batch(file_path, workers=1, memo_path=None, max_score=None, canonical=False,
+               memo_size=ResultMemo.MAX_STORED):
+    """
+    Rate every grid of a file and print one line per grid.
+    Args:
+        file_path (str): Path to the input file.
+        workers (int): The number of worker processes, or None to rate the grids in this process.
+        memo_path (str): Path of the on-disk memo of ratings, or None to keep them in memory only.
+        max_score (float): The score at which rating a grid stops, or None to always finish the grids.
+        canonical (bool): Whether to key the memo on the canonical form of the grids.
+        memo_size (int): The maximum number of ratings kept in the on-disk memo.
+    """
+    count = 0
+    with ResultMemo(memo_path, max_stored=memo_size) as memo:
+        try:
+            rater = DifficultyRater(memo, workers or 1, max_score=max_score, canonical=canonical)
+            for rating in rater.rate_file(file_path):
+                count += 1
+                score = '-' if rating['score'] is None else f"{rating['score']:.1f}"
+                if rating['capped']:
+                    score = f">={score}"
+                print(f"{count}: {score} | {rating['label']} | {rating['hardest'] or '-'} | {rating['puzzle']}")
+        except Exception as e:
+            print(f"Error: {e}")
+        print(f"Rated {count} grids: {memo.hits} from the memo, {memo.misses} rated")
+
+
+def serve(address, backend, workers, rule_names=None, adaptive=False, max_score=None, max_pending=256,
+          client_limit=16):
+    """
+    Run the solve service until interrupted.
+    Args:
+        address (str): The listening address, host:port or the path of a Unix socket.
+        backend (str): The backend used when the deduction rules stall.
+        workers (int): The number of worker processes, or None for one per CPU.
+        rule_names (list): The rules to apply when solving, in order, or None for the default chain.
+        adaptive (bool): Whether to reorder the rules from their observed hit rate and cost.
+        max_score (float): The score at which rating a grid stops, or None to always finish the grids.
+        max_pending (int): The maximum number of requests waiting for or running in the workers.
+        client_limit (int): The maximum number of requests of a client processed at once.
+    """
+    try:
+        service = SolveService(backend, workers, rule_names, adaptive, max_score, max_pending, client_limit)
+        print(f"Serving on {address}")
+        asyncio.run(service.serve_forever(address))
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"Error: {e}")
+
+
 if __name__ == "__main__":
     main()
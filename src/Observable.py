@@ -4,6 +4,8 @@
 class Observable:
     """
     A class that allows observers to subscribe and be notified of events.
+    Events can be batched: between begin_batch and end_batch they are held back, and the observers are
+    notified once when the batch closes. Nothing is recorded while nobody is subscribed.
     """
 
     def __init__(self):
@@ -11,6 +13,9 @@ class Observable:
         Initialize the Observable with an empty list of observers
         """
         self.observers = []
+        # Events held back by the open batches, and where each open batch starts in that list
+        self._held = []
+        self._batch_starts = []
 
     def add_observer(self, observer):
         """
@@ -32,10 +37,39 @@ class Observable:
 
     def notify_observers(self, event=None):
         """
-        Notify all observers about an event.
+        Notify all observers about an event, or hold it back until the open batch closes.
         Args:
             event: An optional event object containing event data.
         """
-
+        if not self.observers:
+            return
+        if self._batch_starts:
+            self._held.append(event)
+            return
         for observer in self.observers:
             observer.update(self, event)
+
+    def begin_batch(self):
+        """
+        Open a batch: the events notified until the matching end_batch are held back. Batches may be nested.
+        """
+        self._batch_starts.append(len(self._held))
+
+    def end_batch(self, event=None, discard=False):
+        """
+        Close the innermost batch, replacing the events it held with a single event. The observers are notified
+        of it when the outermost batch closes; an inner batch adds it to the events of the enclosing one.
+        Args:
+            event: The event summing up the batch, or None for ('batch', events held) if any events were held.
+            discard (bool): Whether to drop the events held without any notification, event being ignored.
+        """
+        start = self._batch_starts.pop()
+        held = self._held[start:]
+        del self._held[start:]
+        if discard:
+            return
+        if event is None:
+            if not held:
+                return
+            event = ('batch', held)
+        self.notify_observers(event)
@@ -0,0 +1,348 @@
+# Author: Noe Florence
+# Description: Parallel backtracking search for a single hard grid: the search tree is split below the point
+# where the deduction rules stall, and its subtrees are searched by worker processes sharing their work.
+
+import multiprocessing
+import os
+import time
+from queue import Empty
+
+from DeductionRuleFactory import DeductionRuleFactory
+from SudokuGrid import SudokuGrid
+
+# Number of nodes a worker searches between two checks of idle workers
+CHECK_INTERVAL = 32
+
+# Number of seconds between two checks that every worker is still running, while waiting for their results
+WATCH_INTERVAL = 0.1
+
+
+def _propagate(grid, rule_chain, stop=None):
+    """
+    Apply the rules until the grid is solved or they stall.
+    Args:
+        grid (SudokuGrid): The Sudoku grid.
+        rule_chain (DeductionRule or RuleScheduler): The rules.
+        stop (Event): Checked before every step, so that a stopped search does not finish the propagation,
+                      or None.
+    Returns:
+        bool: True if the rules ran until the grid is solved or they stall, False if the search was stopped.
+    Raises:
+        ValueError: If the grid reaches a contradiction.
+    """
+    while not grid.is_solved():
+        if stop is not None and stop.is_set():
+            return False
+        if not rule_chain.handle(grid):
+            break
+    return True
+
+
+def _search_worker(root, rule_names, tasks, results, pending, idle, stop):
+    """
+    Search subtrees taken from the task queue until the search is stopped or no subtree is left.
+    A subtree is the list of (index, digit) guesses leading to it from the root grid. While other workers wait
+    for a subtree, the worker gives away the untried guesses of its shallowest branching, the largest subtrees
+    it holds.
+    Args:
+        root (tuple): The snapshot of the grid where the rules stall (see SudokuGrid.snapshot).
+        rule_names (list): The rules to apply at every node, or None for the default chain.
+        tasks (Queue): The subtrees left to search.
+        results (Queue): Receives ('solution', cells) for each solution and ('done', nodes) when the worker exits.
+        pending (Value): The number of subtrees queued or being searched.
+        idle (Value): The number of workers waiting for a subtree.
+        stop (Event): Set once the search is over.
+    """
+    rule_chain = DeductionRuleFactory.create_rules() if rule_names is None else \
+        DeductionRuleFactory.create_scheduler(rule_names)
+    grid = SudokuGrid(root[0])
+    grid.restore(root)
+    base = grid.start_trail()
+    nodes = 0
+    while not stop.is_set():
+        with idle.get_lock():
+            idle.value += 1
+        try:
+            prefix = tasks.get(timeout=0.05)
+        except Empty:
+            prefix = None
+        with idle.get_lock():
+            idle.value -= 1
+        if prefix is None:
+            if pending.value == 0:
+                break
+            continue
+        try:
+            nodes += _search_subtree(grid, rule_chain, prefix, tasks, results, pending, idle, stop)
+        finally:
+            grid.undo(base)
+            with pending.get_lock():
+                pending.value -= 1
+    # Subtrees given away but left unsearched once the search stops must not hold the exit
+    tasks.cancel_join_thread()
+    results.put(('done', nodes))
+
+
+def _search_subtree(grid, rule_chain, prefix, tasks, results, pending, idle, stop):
+    """
+    Depth-first search of a subtree, branching on the cell with the fewest candidates and undoing the
+    guesses through the grid's trail.
+    Args:
+        grid (SudokuGrid): The grid at the root of the search, recording its trail.
+        rule_chain (DeductionRule or RuleScheduler): The rules applied at every node.
+        prefix (list): The (index, digit) guesses leading from the root to the subtree.
+        tasks, results, pending, idle, stop: See _search_worker.
+    Returns:
+        int: The number of nodes searched.
+    """
+    try:
+        for index, digit in prefix:
+            grid.set_value(index, digit)
+        if not _propagate(grid, rule_chain, stop):
+            return 0
+    except ValueError:
+        return 0
+    nodes = 0
+    # The guesses leading to the current node, and one branching per level: the trail position before the
+    # branch, the cell and the digits left to try
+    path = list(prefix)
+    branches = []
+    consistent = True
+    while True:
+        if consistent:
+            if grid.is_solved():
+                results.put(('solution', grid.cells[:]))
+            else:
+                nodes += 1
+                if stop.is_set():
+                    return nodes
+                if nodes % CHECK_INTERVAL == 0 and idle.value:
+                    _share(path, len(prefix), branches, tasks, pending)
+                index = grid.most_constrained_cell()
+                branches.append((grid.start_trail(), index, list(grid.get_candidates(index))))
+        while branches:
+            position, index, digits = branches[-1]
+            grid.undo(position)
+            del path[len(prefix) + len(branches) - 1:]
+            if not digits:
+                branches.pop()
+                continue
+            digit = digits.pop(0)
+            path.append((index, digit))
+            try:
+                grid.set_value(index, digit)
+                break
+            except ValueError:
+                continue
+        else:
+            return nodes
+        try:
+            if not _propagate(grid, rule_chain, stop):
+                return nodes
+            consistent = True
+        except ValueError:
+            consistent = False
+
+
+def _share(path, depth, branches, tasks, pending):
+    """
+    Give the untried digits of the shallowest branching with any left to the other workers, as new subtrees.
+    Args:
+        path (list): The guesses leading to the current node.
+        depth (int): The number of guesses of the subtree being searched.
+        branches (list): The branchings of the current search (see _search_subtree).
+        tasks (Queue): The subtrees left to search.
+        pending (Value): The number of subtrees queued or being searched.
+    """
+    for level, (_, index, digits) in enumerate(branches):
+        if digits:
+            shared = [path[:depth + level] + [(index, digit)] for digit in digits]
+            digits.clear()
+            # Counted before being queued, so that the count never drops to zero while subtrees are left
+            with pending.get_lock():
+                pending.value += len(shared)
+            for subtree in shared:
+                tasks.put(subtree)
+            return
+
+
+class ParallelSearch:
+    """
+    Searches the solutions of one grid on several cores. The rules run first, in this process; where they stall,
+    the first branching levels are expanded into at least split_factor subtrees per worker, queued for the
+    worker processes. A worker gives part of its subtree away whenever another one is idle, so that no core
+    waits while one subtree holds the rest of the search. Every worker stops as soon as limit solutions are
+    found (2 to check uniqueness), or when the time limit is reached.
+    """
+
+    def __init__(self, processes=None, rule_names=None, split_factor=4, max_split_depth=6, time_limit=60.0):
+        """
+        Initialize the search.
+        Args:
+            processes (int): The number of worker processes, or None for one per CPU.
+            rule_names (list): The rules to apply at every node, in order, or None for the default chain.
+            split_factor (int): The number of subtrees to queue per worker before the search starts.
+            max_split_depth (int): The number of branching levels the split may expand at most.
+            time_limit (float): The number of seconds after which the search gives up, or None.
+        Raises:
+            ValueError: If a rule name is unknown.
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self.rule_names = rule_names
+        self.split_factor = split_factor
+        self.max_split_depth = max_split_depth
+        self.time_limit = time_limit
+        self.rule_chain = DeductionRuleFactory.create_rules() if rule_names is None else \
+            DeductionRuleFactory.create_scheduler(rule_names)
+
+    def solve(self, values, limit=1):
+        """
+        Search the solutions of a grid, up to a limit.
+        Args:
+            values (list): The cell values, with -1 for empty cells.
+            limit (int): The number of solutions at which the search stops.
+        Returns:
+            dict: The solutions found (lists of cell values, at most limit), whether the search is complete
+                  (every solution was found, or limit of them), and the number of nodes searched.
+        Raises:
+            ValueError: If the grid is inconsistent.
+            RuntimeError: If a worker process dies during the search.
+        """
+        grid = SudokuGrid(values)
+        solutions = []
+        result = {'solutions': solutions, 'complete': True, 'nodes': 0}
+        try:
+            _propagate(grid, self.rule_chain)
+        except ValueError:
+            return result
+        if grid.is_solved():
+            solutions.append(grid.cells[:])
+            return result
+        subtrees = self._split(grid, solutions, limit)
+        if len(solutions) >= limit or not subtrees:
+            del solutions[limit:]
+            return result
+        self._run(grid.snapshot(), subtrees, limit, result)
+        return result
+
+    def is_unique(self, values):
+        """
+        Check whether a grid has exactly one solution, stopping at the second one.
+        Args:
+            values (list): The cell values, with -1 for empty cells.
+        Returns:
+            bool: True if the grid has a single solution, False if it has none or several, or if the search gave up.
+        """
+        result = self.solve(values, 2)
+        return result['complete'] and len(result['solutions']) == 1
+
+    def _split(self, grid, solutions, limit):
+        """
+        Expand the first branching levels of the stalled grid, breadth first, until there are enough subtrees.
+        Subtrees solved or refuted by the rules during the split are not queued.
+        Args:
+            grid (SudokuGrid): The grid where the rules stall.
+            solutions (list): Receives the solutions reached during the split.
+            limit (int): The number of solutions at which the search stops.
+        Returns:
+            list: The subtrees left to search, as lists of (index, digit) guesses from the grid.
+        """
+        wanted = self.processes * self.split_factor
+        root = grid.start_trail()
+        subtrees = [[]]
+        try:
+            for _ in range(self.max_split_depth):
+                if len(subtrees) >= wanted:
+                    break
+                expanded = []
+                for prefix in subtrees:
+                    try:
+                        for index, digit in prefix:
+                            grid.set_value(index, digit)
+                        _propagate(grid, self.rule_chain)
+                        consistent = True
+                    except ValueError:
+                        consistent = False
+                    if consistent and grid.is_solved():
+                        solutions.append(grid.cells[:])
+                    elif consistent:
+                        index = grid.most_constrained_cell()
+                        expanded.extend(prefix + [(index, digit)] for digit in grid.get_candidates(index))
+                    grid.undo(root)
+                    if len(solutions) >= limit:
+                        return []
+                subtrees = expanded
+        finally:
+            grid.stop_trail()
+        return subtrees
+
+    def _run(self, root, subtrees, limit, result):
+        """
+        Search the subtrees with the worker processes, until limit solutions are found, the subtrees are exhausted
+        or the time limit is reached, and stop every worker.
+        Args:
+            root (tuple): The snapshot of the grid where the rules stall.
+            subtrees (list): The subtrees to search.
+            limit (int): The number of solutions at which the search stops.
+            result (dict): The result of the search (see solve), completed in place.
+        Raises:
+            RuntimeError: If a worker process dies before reporting, the search being then stopped.
+        """
+        context = multiprocessing.get_context()
+        tasks = context.Queue()
+        results = context.Queue()
+        pending = context.Value('i', len(subtrees))
+        idle = context.Value('i', 0)
+        stop = context.Event()
+        for subtree in subtrees:
+            tasks.put(subtree)
+        workers = [context.Process(target=_search_worker, daemon=True,
+                                   args=(root, self.rule_names, tasks, results, pending, idle, stop))
+                   for _ in range(self.processes)]
+        for worker in workers:
+            worker.start()
+        deadline = None if self.time_limit is None else time.monotonic() + self.time_limit
+        solutions = result['solutions']
+        running = len(workers)
+        try:
+            while running:
+                timeout = WATCH_INTERVAL if deadline is None else min(WATCH_INTERVAL, deadline - time.monotonic())
+                try:
+                    kind, payload = results.get(timeout=max(timeout, 0))
+                except Empty:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        # Out of time: the solutions found so far may not be all
+                        result['complete'] = False
+                        break
+                    # A worker that died never reports, and the subtree it held is never searched
+                    for worker in workers:
+                        if worker.exitcode:
+                            raise RuntimeError(f"A search worker exited with code {worker.exitcode}.")
+                    continue
+                if kind == 'done':
+                    running -= 1
+                    result['nodes'] += payload
+                elif len(solutions) < limit:
+                    solutions.append(payload)
+                    if len(solutions) == limit:
+                        stop.set()
+        finally:
+            stop.set()
+            # The subtrees left in the queue are dropped rather than flushed when this process exits
+            tasks.cancel_join_thread()
+            # Workers finish their current check interval and report; the late solutions are ignored
+            grace = time.monotonic() + 1.0
+            while running and time.monotonic() < grace:
+                try:
+                    kind, payload = results.get(timeout=0.05)
+                except Empty:
+                    if not any(worker.is_alive() for worker in workers):
+                        break
+                    continue
+                if kind == 'done':
+                    running -= 1
+                    result['nodes'] += payload
+            for worker in workers:
+                worker.join(0.1)
+                if worker.is_alive():
+                    worker.terminate()
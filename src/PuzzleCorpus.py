@@ -0,0 +1,160 @@
+# Author: Noe Florence
+# Description: Packed binary corpus of Sudoku grids, read through mmap so that any grid can be read by its
+# position without parsing the rest of the file.
+
+import mmap
+import struct
+
+from SudokuGrid import SudokuGrid
+
+# File header: magic, format version, box size, bits per cell, number of grids
+_HEADER = struct.Struct('<4sBBBxQ')
+_MAGIC = b'SDKC'
+_VERSION = 1
+
+# Value of each hexadecimal digit of a nibble-packed record, -1 for empty cells: reading the record as hex
+# text splits it into its nibbles, first cell first, in a single pass
+_NIBBLES = {digit: int(digit, 16) or -1 for digit in '0123456789abcdef'}
+
+
+class PuzzleCorpus:
+    """
+    Sequence of grids of one size stored in a binary file: a header, then one fixed-size record per grid.
+    Grids of up to 15 values pack two cells per byte (41 bytes for a 9x9 grid), larger grids one cell per
+    byte; 0 stands for an empty cell. Records are read straight from the memory-mapped file, so reading
+    grid k costs the same at any position and only the pages read are loaded.
+    """
+
+    def __init__(self, path):
+        """
+        Open a corpus.
+        Args:
+            path (str): Path of the corpus file, as written by PuzzleCorpus.write.
+        Raises:
+            ValueError: If the file is not a corpus.
+        """
+        self.path = path
+        with open(path, 'rb') as file:
+            header = file.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise ValueError(f"{path} is not a packed corpus.")
+            magic, version, box, self.bits, self.count = _HEADER.unpack(header)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError(f"{path} is not a packed corpus.")
+            self.num_cells = box ** 4
+            self.record_size = self.record_size_of(self.num_cells, self.bits)
+            expected = _HEADER.size + self.count * self.record_size
+            file.seek(0, 2)
+            if file.tell() < expected:
+                raise ValueError(f"{path} is truncated: {self.count} grids announced.")
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if self.count else b''
+
+    @staticmethod
+    def record_size_of(num_cells, bits):
+        """
+        Args:
+            num_cells (int): The number of cells of a grid.
+            bits (int): The bits per cell, 4 or 8.
+        Returns:
+            int: The number of bytes of a grid's record.
+        """
+        return (num_cells * bits + 7) // 8
+
+    @staticmethod
+    def is_corpus(path):
+        """
+        Check whether a file is a packed corpus, from its first bytes.
+        Args:
+            path (str): Path of the file.
+        Returns:
+            bool: True if the file starts with the corpus magic, False otherwise.
+        """
+        with open(path, 'rb') as file:
+            return file.read(len(_MAGIC)) == _MAGIC
+
+    @staticmethod
+    def write(path, grids):
+        """
+        Pack grids into a corpus file.
+        Args:
+            path (str): Path of the corpus file, overwritten.
+            grids (iterable): Lists of cell values, with -1 for empty cells, all of the same size.
+        Returns:
+            int: The number of grids written.
+        Raises:
+            ValueError: If the grids are not all of the same size, of no valid size, or hold invalid values.
+        """
+        count = 0
+        num_cells = None
+        with open(path, 'wb') as file:
+            # The header is written again with the count once every grid is known
+            file.write(_HEADER.pack(_MAGIC, _VERSION, 0, 0, 0))
+            for values in grids:
+                if num_cells is None:
+                    num_cells = len(values)
+                    box = SudokuGrid.box_size_of(num_cells)
+                    size = box * box
+                    bits = 4 if size <= 15 else 8
+                elif len(values) != num_cells:
+                    raise ValueError(f"Every grid of a corpus must have {num_cells} cells, not {len(values)}.")
+                cells = [value if value != -1 else 0 for value in values]
+                if not 0 <= min(cells) <= max(cells) <= size:
+                    raise ValueError(f"The values must be between 1 and {size}.")
+                if bits == 4:
+                    if num_cells % 2:
+                        cells.append(0)
+                    record = bytes(high << 4 | low for high, low in zip(cells[0::2], cells[1::2]))
+                else:
+                    record = bytes(cells)
+                file.write(record)
+                count += 1
+            if num_cells is not None:
+                file.seek(0)
+                file.write(_HEADER.pack(_MAGIC, _VERSION, box, bits, count))
+        return count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, k):
+        """
+        Read a grid.
+        Args:
+            k (int): The position of the grid in the corpus; negative positions count from the end.
+        Returns:
+            list: The cell values, with -1 for empty cells.
+        Raises:
+            IndexError: If there is no grid at that position.
+        """
+        if k < 0:
+            k += self.count
+        if not 0 <= k < self.count:
+            raise IndexError(f"No grid {k} in a corpus of {self.count}.")
+        start = _HEADER.size + k * self.record_size
+        record = self.map[start:start + self.record_size]
+        if self.bits == 8:
+            return [value or -1 for value in record]
+        values = list(map(_NIBBLES.__getitem__, record.hex()))
+        del values[self.num_cells:]
+        return values
+
+    def __iter__(self):
+        """
+        Yields:
+            list: The cell values of each grid, in corpus order.
+        """
+        for k in range(self.count):
+            yield self[k]
+
+    def close(self):
+        """
+        Unmap the corpus file.
+        """
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,193 @@
+# Author: Noe Florence
+# Description: Generates unique-solution puzzles whose difficulty score falls in a requested band,
+# trying candidates in parallel across worker processes.
+
+import random
+from itertools import count as counter
+from multiprocessing import Pool
+
+from DeductionRuleFactory import DeductionRuleFactory
+from DifficultyRater import rate_grid
+from SolutionCounter import SolutionCounter
+from SudokuGrid import SudokuGrid
+
+# Settings and helpers of the current worker process, created once by _init_worker
+_worker_generator = None
+
+
+def _init_worker(generator):
+    """
+    Initialize a worker process with the generator settings, its own rule chain and solution counter.
+    Args:
+        generator (PuzzleGenerator): The generator, whose settings the worker uses.
+    """
+    global _worker_generator
+    _worker_generator = generator
+    generator.prepare()
+
+
+def _attempt(seed):
+    """
+    Try one candidate puzzle in a worker process.
+    Args:
+        seed (int): The seed of the candidate.
+    Returns:
+        dict: The accepted puzzle (see PuzzleGenerator.attempt), or None.
+    """
+    return _worker_generator.attempt(seed)
+
+
+class PuzzleGenerator:
+    """
+    Each candidate starts from a random full grid and loses its clues in symmetric pairs (cell i and its
+    180 degree rotation), in random order, each removal being kept only if the solution stays unique.
+    Once no pair can be removed, the puzzle is rated with the deduction rules, and accepted when its score
+    is within the band. Candidates are independent and reproducible from their seed.
+    """
+
+    # Default number of candidates tried before giving up on a band
+    MAX_ATTEMPTS = 10000
+
+    def __init__(self, min_score=1.0, max_score=10.0, box=3, symmetric=True, processes=None, chunksize=4):
+        """
+        Initialize the generator.
+        Args:
+            min_score (float): The lowest score accepted (see DifficultyRater.rate_grid).
+            max_score (float): The highest score accepted; rating a candidate stops beyond it.
+            box (int): The box size of the grids (3 for 9x9 grids).
+            symmetric (bool): Whether to remove the clues in pairs symmetric about the center.
+            processes (int): The number of worker processes, 1 to generate in this process, or None for
+                             one per CPU.
+            chunksize (int): The number of candidates sent to a worker at once.
+        Raises:
+            ValueError: If the band is empty.
+        """
+        if min_score > max_score:
+            raise ValueError(f"The band {min_score}:{max_score} is empty.")
+        self.min_score = min_score
+        self.max_score = max_score
+        self.box = box
+        self.symmetric = symmetric
+        self.processes = processes
+        self.chunksize = chunksize
+        self.rule_chain = None
+        self.counter = None
+
+    def __getstate__(self):
+        # Workers receive the settings only, and build their own rule chain and counter
+        return dict(self.__dict__, rule_chain=None, counter=None)
+
+    def prepare(self):
+        """
+        Build the rule chain rating the candidates and the counter checking their uniqueness.
+        """
+        self.rule_chain = DeductionRuleFactory().create_rules()
+        self.counter = SolutionCounter()
+
+    def generate(self, count, seed=0, max_attempts=MAX_ATTEMPTS):
+        """
+        Generate puzzles until count of them are accepted.
+        Args:
+            count (int): The number of puzzles to generate.
+            seed (int): The seed of the first candidate; candidate k uses seed + k, so that a run is reproducible.
+            max_attempts (int): The number of candidates tried before giving up, or None to try until count
+                                puzzles are accepted, which never ends if the band cannot be reached.
+        Yields:
+            dict: Each accepted puzzle (see attempt), in candidate order.
+        Raises:
+            ValueError: If fewer than count puzzles were accepted after max_attempts candidates.
+        """
+        if count <= 0:
+            return
+        seeds = counter(seed) if max_attempts is None else range(seed, seed + max_attempts)
+        accepted = 0
+        if self.processes == 1:
+            self.prepare()
+            results = map(self.attempt, seeds)
+            pool = None
+        else:
+            pool = Pool(self.processes, _init_worker, (self,))
+            results = pool.imap(_attempt, seeds, self.chunksize)
+        try:
+            for puzzle in results:
+                if puzzle is not None:
+                    yield puzzle
+                    accepted += 1
+                    if accepted == count:
+                        return
+        finally:
+            if pool is not None:
+                pool.terminate()
+        raise ValueError(f"Only {accepted} of {count} puzzles scored within {self.min_score}:{self.max_score} "
+                         f"after {max_attempts} candidates.")
+
+    def attempt(self, seed):
+        """
+        Build and rate one candidate puzzle.
+        Args:
+            seed (int): The seed of the candidate.
+        Returns:
+            dict: The cell values of the puzzle (-1 for empty cells), its seed, its number of clues and its
+                  rating, or None if its score is out of the band.
+        """
+        rng = random.Random(seed)
+        solution = self.random_solution(rng)
+        values = self.remove_clues(solution, rng)
+        rating = rate_grid(values, self.rule_chain, self.max_score + 0.1)
+        # A capped rating is beyond the band
+        if rating['capped'] or not self.min_score <= rating['score'] <= self.max_score:
+            return None
+        return {'values': values, 'seed': seed, 'clues': len(values) - values.count(-1), 'rating': rating}
+
+    def random_solution(self, rng):
+        """
+        Draw a random full grid: a depth-first search filling the cell with the fewest candidates first,
+        trying its candidates in random order.
+        Args:
+            rng (Random): The random generator.
+        Returns:
+            list: The cell values of the full grid.
+        """
+        size = self.box * self.box
+        stack = [SudokuGrid([-1] * (size * size))]
+        while stack:
+            grid = stack.pop()
+            if grid.is_solved():
+                return grid.cells
+            index = grid.most_constrained_cell()
+            digits = list(grid.masks.digits[grid.candidates[index]])
+            rng.shuffle(digits)
+            # The first digit drawn is tried first, so it is pushed last
+            for digit in reversed(digits):
+                child = grid.clone()
+                try:
+                    child.set_value(index, digit)
+                except ValueError:
+                    continue
+                stack.append(child)
+        raise ValueError("No full grid found.")
+
+    def remove_clues(self, solution, rng):
+        """
+        Remove clues from a full grid, in random order, as long as the solution stays unique.
+        Args:
+            solution (list): The cell values of the full grid.
+            rng (Random): The random generator.
+        Returns:
+            list: The cell values of the puzzle, with -1 for empty cells; no clue (or symmetric pair of
+                  clues) can be removed from it without losing uniqueness.
+        """
+        values = solution[:]
+        last = len(values) - 1
+        if self.symmetric:
+            groups = [(index, last - index) if index != last - index else (index,) for index in range(last // 2 + 1)]
+        else:
+            groups = [(index,) for index in range(len(values))]
+        rng.shuffle(groups)
+        for group in groups:
+            for index in group:
+                values[index] = -1
+            if not self.counter.is_unique(SudokuGrid(values)):
+                for index in group:
+                    values[index] = solution[index]
+        return values
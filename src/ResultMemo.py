@@ -0,0 +1,117 @@
+# Author: Noe Florence
+# Description: Bounded memo of results (ratings, solutions) keyed by string: an in-memory LRU in front of
+# an optional on-disk store, so that results are reused within a run and between runs.
+
+import dbm
+import json
+from collections import OrderedDict
+
+
+class ResultMemo:
+    """
+    Least-recently-used cache of JSON-serializable results, backed by a dbm file when a path is given.
+    Lookups that miss the LRU fall back to the file and promote the result into the LRU.
+    The file keeps at most max_stored results, evicting the oldest ones first.
+    """
+
+    # Default number of results kept on disk
+    MAX_STORED = 1000000
+
+    def __init__(self, path=None, maxsize=65536, max_stored=MAX_STORED):
+        """
+        Initialize the memo.
+        Args:
+            path (str): Path of the on-disk store, created if needed, or None to keep results in memory only.
+            maxsize (int): The maximum number of results kept in memory.
+            max_stored (int): The maximum number of results kept on disk, or None for no limit.
+        """
+        self.maxsize = maxsize
+        self.max_stored = max_stored
+        self.entries = OrderedDict()
+        self.store = dbm.open(path, 'c') if path is not None else None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Get the result memoized for a key.
+        Args:
+            key (str): The key, e.g. a puzzle string (one character per cell, '.' for empty cells).
+        Returns:
+            dict: The memoized result, or None if there is none.
+        """
+        result = self.entries.get(key)
+        if result is not None:
+            self.entries.move_to_end(key)
+        elif self.store is not None and key in self.store:
+            result = json.loads(self.store[key])
+            self._remember(key, result)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def put(self, key, result):
+        """
+        Record the result of a key, in memory and on disk.
+        Args:
+            key (str): The key; keys starting with '#' are reserved.
+            result (dict): The result, serializable to JSON.
+        """
+        self._remember(key, result)
+        if self.store is not None:
+            if key not in self.store:
+                self._append(key)
+            self.store[key] = json.dumps(result)
+
+    def _remember(self, key, result):
+        """
+        Insert a result in the LRU, evicting the least recently used one when it is full.
+        Args:
+            key (str): The key.
+            result (dict): The result.
+        """
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def _append(self, key):
+        """
+        Record a new key in the insertion order of the store, evicting the oldest keys beyond max_stored.
+        The order is kept in the store itself: '#head' and '#tail' delimit the '#<n>' entries naming the keys.
+        Args:
+            key (str): The new key.
+        """
+        store = self.store
+        head = int(store.get('#head', b'0'))
+        tail = int(store.get('#tail', b'0'))
+        store[f'#{tail}'] = key
+        tail += 1
+        store['#tail'] = str(tail)
+        if self.max_stored is None:
+            return
+        while tail - head > self.max_stored:
+            oldest = f'#{head}'
+            evicted = store[oldest].decode()
+            if evicted in store:
+                del store[evicted]
+            del store[oldest]
+            self.entries.pop(evicted, None)
+            head += 1
+        store['#head'] = str(head)
+
+    def close(self):
+        """
+        Close the on-disk store, flushing the results written to it.
+        """
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
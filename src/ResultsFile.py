@@ -0,0 +1,258 @@
+# Author: Noe Florence
+# Description: Preallocated binary file of batch results, one fixed-size record per grid filled in place
+# through mmap, with a progress bitmap from which an interrupted run resumes.
+
+import hashlib
+import mmap
+import os
+import struct
+
+from SudokuGrid import SudokuGrid
+
+# File header: magic, format version, box size, number of grids, fingerprint of the grids and solver settings
+_HEADER = struct.Struct('<4sBBxxQ8s')
+_MAGIC = b'SDKR'
+_VERSION = 1
+
+# Start of a record: status, difficulty, score in tenths (NO_SCORE if none) and mask of the rules used;
+# the counters of each rule of RULES follow, then the cells, one byte per cell (0 for an empty cell)
+_RECORD = struct.Struct('<BBHH')
+# Counters of a rule: invocations, firings, cells placed, candidates eliminated, time in seconds
+_COUNTERS = struct.Struct('<IIIIf')
+
+
+class ResultsFile:
+    """
+    Results of a batch run, in a file sized for every grid when the run starts: the header, a progress bitmap
+    with one bit per grid, then one record per grid. Each process solving grids maps the file and writes the
+    records of its grids in place, so that results never go through a text form. A grid's bit is only set once
+    its record has been flushed to disk (see checkpoint), and a run restarted on the same file solves the
+    grids whose bit is clear only.
+    """
+
+    # Status of each code; a record still 'pending' has not been written
+    STATUSES = ('pending', 'solved', 'unsolved', 'invalid')
+
+    # Difficulty of each code, 0 standing for no difficulty (see SudokuSolver.difficulty_of)
+    DIFFICULTIES = (None, "Simple", "Easy", "Intermediate", "Hard", "Very Hard",
+                    "Not possible to evaluate with current rules")
+
+    # Rules of the bits of the rules mask, and whose counters are recorded, in record order
+    RULES = ('DR1', 'DR2', 'DR3', 'DR4', 'DR5', 'DR6', 'DR7', 'DR8', 'DR9')
+
+    # Score field of a grid without a score
+    NO_SCORE = 0xFFFF
+
+    _STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+    _DIFFICULTY_CODES = {difficulty: code for code, difficulty in enumerate(DIFFICULTIES)}
+    _RULE_BITS = {rule: 1 << bit for bit, rule in enumerate(RULES)}
+    _COUNTER_FIELDS = ('invocations', 'firings', 'cells_placed', 'candidates_eliminated', 'time')
+
+    def __init__(self, path):
+        """
+        Open a results file for reading and writing.
+        Args:
+            path (str): Path of the results file, as created by ResultsFile.create.
+        Raises:
+            ValueError: If the file is not a results file or is truncated.
+        """
+        self.path = path
+        with open(path, 'r+b') as file:
+            header = file.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise ValueError(f"{path} is not a results file.")
+            magic, version, self.box, self.count, self.fingerprint = _HEADER.unpack(header)
+            if magic != _MAGIC or version != _VERSION or not 2 <= self.box <= 5:
+                raise ValueError(f"{path} is not a results file.")
+            self.num_cells = self.box ** 4
+            self.record_size = self.record_size_of(self.num_cells)
+            # The records start on an 8-byte boundary after the bitmap
+            self.records_start = _HEADER.size + ((self.count + 63) // 64) * 8
+            expected = self.records_start + self.count * self.record_size
+            file.seek(0, 2)
+            if file.tell() < expected:
+                raise ValueError(f"{path} is truncated: {self.count} grids announced.")
+            self.map = mmap.mmap(file.fileno(), expected, access=mmap.ACCESS_WRITE)
+
+    @staticmethod
+    def record_size_of(num_cells):
+        """
+        Args:
+            num_cells (int): The number of cells of a grid.
+        Returns:
+            int: The number of bytes of a grid's record.
+        """
+        return _RECORD.size + len(ResultsFile.RULES) * _COUNTERS.size + num_cells
+
+    @staticmethod
+    def fingerprint_of(grids, settings=''):
+        """
+        Read the grids of a run once, to size its results file and tell it from the file of another run.
+        Args:
+            grids (iterable): Lists of cell values, with -1 for empty cells, all of the same size.
+            settings (str): The solver settings of the run (see SolutionCache.namespace_of).
+        Returns:
+            tuple: The number of grids, their box size (3 if there are none) and an 8-byte digest of the
+                   settings and of every grid, in order.
+        Raises:
+            ValueError: If the grids are not all of the same size, or of no valid size.
+        """
+        digest = hashlib.blake2b(settings.encode(), digest_size=8)
+        count = 0
+        num_cells = None
+        box = 3
+        for values in grids:
+            if num_cells is None:
+                num_cells = len(values)
+                box = SudokuGrid.box_size_of(num_cells)
+            elif len(values) != num_cells:
+                raise ValueError(f"Every grid of a results file must have {num_cells} cells, not {len(values)}.")
+            digest.update(bytes(value if value != -1 else 0 for value in values))
+            count += 1
+        return count, box, digest.digest()
+
+    @classmethod
+    def create(cls, path, count, box, fingerprint):
+        """
+        Create a results file with every record pending, and open it.
+        Args:
+            path (str): Path of the results file, overwritten.
+            count (int): The number of grids.
+            box (int): The box size of the grids (3 for 9x9 grids).
+            fingerprint (bytes): The 8-byte fingerprint of the run (see fingerprint_of).
+        Returns:
+            ResultsFile: The open results file.
+        """
+        num_cells = box ** 4
+        size = _HEADER.size + ((count + 63) // 64) * 8 + count * cls.record_size_of(num_cells)
+        with open(path, 'wb') as file:
+            file.write(_HEADER.pack(_MAGIC, _VERSION, box, count, fingerprint))
+            # Zero-filled up to its final size: every bit clear, every record pending
+            file.truncate(size)
+        return cls(path)
+
+    @classmethod
+    def open_for(cls, path, grids, settings=''):
+        """
+        Open the results file of a run, creating it unless a previous run on the same grids with the same
+        settings left it, in which case the run resumes from its progress bitmap.
+        Args:
+            path (str): Path of the results file.
+            grids (iterable): The grids of the run (see fingerprint_of), read once.
+            settings (str): The solver settings of the run.
+        Returns:
+            ResultsFile: The open results file.
+        Raises:
+            ValueError: If the file exists but holds the results of other grids or settings, or is not a
+                        results file.
+        """
+        count, box, fingerprint = cls.fingerprint_of(grids, settings)
+        if not os.path.exists(path):
+            return cls.create(path, count, box, fingerprint)
+        results = cls(path)
+        if (results.count, results.box, results.fingerprint) != (count, box, fingerprint):
+            results.close()
+            raise ValueError(f"{path} holds the results of other grids or settings.")
+        return results
+
+    def __len__(self):
+        return self.count
+
+    def is_done(self, k):
+        """
+        Args:
+            k (int): The position of a grid.
+        Returns:
+            bool: Whether the grid's record is complete and on disk.
+        """
+        return bool(self.map[_HEADER.size + (k >> 3)] >> (k & 7) & 1)
+
+    def done_count(self):
+        """
+        Returns:
+            int: The number of grids whose bit is set.
+        """
+        return sum(bin(byte).count('1') for byte in self.map[_HEADER.size:self.records_start])
+
+    def write(self, result):
+        """
+        Write the record of a grid, leaving its progress bit alone.
+        Args:
+            result (dict): The result of the grid (see BatchSolver.solve_grid): its index, status, difficulty,
+                           rules and cells, plus its score and per-rule 'stats' if they were collected.
+        """
+        score = result.get('score')
+        rules = 0
+        for rule in result['rules']:
+            rules |= self._RULE_BITS.get(rule, 0)
+        stats = result.get('stats', {})
+        counters = b''.join(_COUNTERS.pack(*(stats[rule][field] for field in self._COUNTER_FIELDS))
+                            if rule in stats else bytes(_COUNTERS.size) for rule in self.RULES)
+        record = _RECORD.pack(self._STATUS_CODES[result['status']], self._DIFFICULTY_CODES[result['difficulty']],
+                              self.NO_SCORE if score is None else round(score * 10), rules)
+        start = self.records_start + result['index'] * self.record_size
+        self.map[start:start + self.record_size] = record + counters + bytes(
+            value if value != -1 else 0 for value in result['cells'])
+
+    def checkpoint(self, indices):
+        """
+        Flush the records written so far, then set the progress bits of some grids. The bits reach the disk
+        with the next flush, and never before the records they stand for.
+        Args:
+            indices (iterable): The positions of the grids whose records were written.
+        """
+        self.map.flush()
+        for k in indices:
+            self.map[_HEADER.size + (k >> 3)] |= 1 << (k & 7)
+
+    def __getitem__(self, k):
+        """
+        Read the record of a grid.
+        Args:
+            k (int): The position of the grid; negative positions count from the end.
+        Returns:
+            dict: The index, status, difficulty, score (None if none), rules used and cells of the grid, with
+                  -1 for empty cells, and the counters of each rule invoked under 'stats'.
+        Raises:
+            IndexError: If there is no grid at that position.
+        """
+        if k < 0:
+            k += self.count
+        if not 0 <= k < self.count:
+            raise IndexError(f"No grid {k} in a results file of {self.count}.")
+        start = self.records_start + k * self.record_size
+        status, difficulty, score, rules = _RECORD.unpack_from(self.map, start)
+        stats = {}
+        offset = start + _RECORD.size
+        for rule in self.RULES:
+            counters = _COUNTERS.unpack_from(self.map, offset)
+            offset += _COUNTERS.size
+            if counters[0]:
+                stats[rule] = dict(zip(self._COUNTER_FIELDS, counters))
+        cells = [value or -1 for value in self.map[offset:offset + self.num_cells]]
+        return {'index': k, 'status': self.STATUSES[status], 'difficulty': self.DIFFICULTIES[difficulty],
+                'score': None if score == self.NO_SCORE else score / 10,
+                'rules': [rule for rule in self.RULES if rules & self._RULE_BITS[rule]],
+                'cells': cells, 'stats': stats}
+
+    def __iter__(self):
+        """
+        Yields:
+            dict: The record of each grid, in input order.
+        """
+        for k in range(self.count):
+            yield self[k]
+
+    def close(self):
+        """
+        Flush and unmap the results file.
+        """
+        if not self.map.closed:
+            self.map.flush()
+            self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
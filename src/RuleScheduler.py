@@ -0,0 +1,98 @@
+# Author: Noe Florence
+# Description: Cost-aware scheduler applying a configurable set of deduction rules.
+# It can replace the chain of responsibility wherever a rule chain is used, since it exposes the same handle method.
+
+import time
+
+
+class RuleScheduler:
+    """
+    Applies an ordered set of deduction rules. Each call to handle tries the rules in order and stops at the
+    first one that fires; since the next call starts again from the first rule, the cheap rules at the front
+    always reach their fixpoint before a more expensive rule is tried.
+    In adaptive mode, the order is periodically recomputed from the hit rate and cost observed for each rule.
+    """
+
+    def __init__(self, rules, adaptive=False, reorder_interval=64, decay=0.5):
+        """
+        Initialize the scheduler.
+        Args:
+            rules (list): The deduction rules, cheapest and most productive first.
+            adaptive (bool): Whether to reorder the rules from their observed firings and cost.
+            reorder_interval (int): The number of handle calls between two reorderings.
+            decay (float): The weight kept by past observations at each reordering, so the order
+                           follows changes in the puzzle population.
+        Raises:
+            ValueError: If no rule is given.
+        """
+        if not rules:
+            raise ValueError("The scheduler needs at least one rule.")
+        self.rules = list(rules)
+        self.adaptive = adaptive
+        self.reorder_interval = reorder_interval
+        self.decay = decay
+        self.order = list(range(len(self.rules)))  # Positions in self.rules, in the order they are tried
+        self.invocations = [0.0] * len(self.rules)
+        self.firings = [0.0] * len(self.rules)
+        self.cost = [0.0] * len(self.rules)  # Seconds spent in each rule
+        self._calls = 0
+
+    @property
+    def names(self):
+        """
+        Get the names of the rules in the order they are currently tried.
+        Returns:
+            list: The rule names.
+        """
+        return [self.rules[position].__class__.__name__ for position in self.order]
+
+    def handle(self, grid, stats=None):
+        """
+        Apply the first rule of the current order that changes the grid. A rule interrupted by its budget
+        is applied again until it makes changes or completes its search (see DeductionRule.handle).
+        Args:
+            grid (SudokuGrid): The Sudoku grid to apply the rules to.
+            stats (RuleStats): Statistics recording each rule application, or None to skip the measures.
+        Returns:
+            str: The name of the rule that was applied, or None if no rule made changes.
+        """
+        fired_name = None
+        for position in self.order:
+            rule = self.rules[position]
+            while True:
+                if self.adaptive:
+                    start = time.perf_counter()
+                    fired = rule.apply(grid) if stats is None else stats.run(rule, grid)
+                    self.cost[position] += time.perf_counter() - start
+                    self.invocations[position] += 1
+                else:
+                    fired = rule.apply(grid) if stats is None else stats.run(rule, grid)
+                if fired or not rule.interrupted():
+                    break
+            if fired:
+                self.firings[position] += 1
+                fired_name = rule.__class__.__name__
+                break
+        if self.adaptive:
+            self._calls += 1
+            if self._calls >= self.reorder_interval:
+                self.reorder()
+        return fired_name
+
+    def reorder(self):
+        """
+        Sort the rules by decreasing yield, the firings observed per second spent in the rule.
+        Rules that were never invoked have no yield yet: they come after the measured rules, in their
+        configured order, so that the cheap rules still reach their fixpoint before they are tried.
+        """
+        def key(position):
+            if not self.invocations[position]:
+                return 1, 0.0, position
+            # One firing as prior, so a measured rule that has not fired yet is not starved
+            return 0, -(self.firings[position] + 1) / max(self.cost[position], 1e-9), position
+
+        self.order.sort(key=key)
+        self.invocations = [invocations * self.decay for invocations in self.invocations]
+        self.firings = [firings * self.decay for firings in self.firings]
+        self.cost = [cost * self.decay for cost in self.cost]
+        self._calls = 0
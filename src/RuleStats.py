@@ -0,0 +1,113 @@
+# Author: Noe Florence
+# Description: Per-rule counters collected while the deduction chain runs.
+
+import json
+import time
+
+
+class RuleStats:
+    """
+    Counts, for each deduction rule, its invocations, successful firings, wall time,
+    cells placed and candidates eliminated.
+    """
+
+    FIELDS = ('invocations', 'firings', 'time', 'cells_placed', 'candidates_eliminated')
+
+    def __init__(self):
+        """
+        Initialize empty statistics.
+        """
+        self.rules = {}  # Counters of each rule, keyed by rule name, in order of first invocation
+
+    @staticmethod
+    def _open_candidates(grid):
+        """
+        Count the candidates left in the grid, each filled cell counting as its single value.
+        Placing a value thus only counts the other candidates of the cell as eliminated.
+        Args:
+            grid (SudokuGrid): The Sudoku grid.
+        Returns:
+            int: The number of open candidates.
+        """
+        return sum(map(grid.masks.popcount.__getitem__, grid.candidates)) + len(grid.cells) - grid.empty_count
+
+    def run(self, rule, grid):
+        """
+        Apply a rule to the grid while recording its counters.
+        Args:
+            rule (DeductionRule): The rule to apply.
+            grid (SudokuGrid): The Sudoku grid.
+        Returns:
+            bool: The result of the rule's apply method.
+        """
+        empty_before = grid.empty_count
+        open_before = self._open_candidates(grid)
+        start = time.perf_counter()
+        try:
+            fired = rule.apply(grid)
+        finally:
+            elapsed = time.perf_counter() - start
+            counters = self.counters(rule.__class__.__name__)
+            counters['invocations'] += 1
+            counters['time'] += elapsed
+            counters['cells_placed'] += empty_before - grid.empty_count
+            counters['candidates_eliminated'] += open_before - self._open_candidates(grid)
+        if fired:
+            counters['firings'] += 1
+        return fired
+
+    def counters(self, name):
+        """
+        Get the counters of a rule, creating them if needed.
+        Args:
+            name (str): The name of the rule.
+        Returns:
+            dict: The counters of the rule.
+        """
+        counters = self.rules.get(name)
+        if counters is None:
+            counters = self.rules[name] = dict.fromkeys(self.FIELDS, 0)
+            counters['time'] = 0.0
+        return counters
+
+    def merge(self, other):
+        """
+        Add the counters of other statistics to these ones.
+        Args:
+            other (RuleStats or dict): The statistics to add, or their as_dict() form.
+        """
+        rules = other.rules if isinstance(other, RuleStats) else other
+        for name, values in rules.items():
+            counters = self.counters(name)
+            for field in self.FIELDS:
+                counters[field] += values[field]
+
+    def as_dict(self):
+        """
+        Return the statistics as plain data.
+        Returns:
+            dict: The counters of each rule, keyed by rule name.
+        """
+        return {name: dict(counters) for name, counters in self.rules.items()}
+
+    def dump(self, file_path):
+        """
+        Write the statistics to a JSON file.
+        Args:
+            file_path (str): Path to the output file.
+        """
+        with open(file_path, 'w') as file:
+            json.dump(self.as_dict(), file, indent=2)
+
+    def __str__(self):
+        """
+        Format the statistics as a table.
+        Returns:
+            str: One line per rule.
+        """
+        lines = [f"{'rule':<6}{'calls':>8}{'fired':>8}{'time ms':>10}{'placed':>8}{'eliminated':>12}"]
+        for name, counters in self.rules.items():
+            lines.append(f"{name:<6}{counters['invocations']:>8}{counters['firings']:>8}"
+                         f"{counters['time'] * 1000:>10.3f}{counters['cells_placed']:>8}"
+                         f"{counters['candidates_eliminated']:>12}")
+        return '\n'.join(lines)
@@ -0,0 +1,77 @@
+# Author: Noe Florence
+# Description: Cache of solving results keyed on the canonical form of the grids, so that a grid equal to
+# a cached one up to symmetry reuses its result.
+
+from Canonicalizer import canonicalize
+from DifficultyRater import puzzle_key
+
+
+class SolutionCache:
+    """
+    Stores results (status, difficulty, rules used, cells) in a ResultMemo under the canonical form of
+    their grid, and maps the cached cells back to the frame of each grid looked up.
+    """
+
+    def __init__(self, memo):
+        """
+        Initialize the cache.
+        Args:
+            memo (ResultMemo): The bounded memory and file store holding the results.
+        """
+        self.memo = memo
+
+    @staticmethod
+    def namespace_of(backend, rule_names=None, adaptive=False):
+        """
+        Build the namespace of the results computed with some solver settings.
+        Args:
+            backend (str): The backend used when the deduction rules stall.
+            rule_names (list): The rules applied, or None for the default chain.
+            adaptive (bool): Whether the rules are scheduled adaptively.
+        Returns:
+            str: The prefix of the keys of these results.
+        """
+        return f"{backend}|{','.join(rule_names or ())}|{'adaptive' if adaptive else ''}|"
+
+    @staticmethod
+    def locate(values, namespace=''):
+        """
+        Find the key of a grid and the transform to its canonical form.
+        Args:
+            values (list): The cell values, with -1 for empty cells.
+            namespace (str): A prefix separating results computed with different settings.
+        Returns:
+            tuple: The key and the GridTransform, to pass to get and put.
+        """
+        canonical, transform = canonicalize(values)
+        return namespace + puzzle_key(canonical), transform
+
+    def get(self, key, transform):
+        """
+        Get the cached result of a grid.
+        Args:
+            key (str): The key returned by locate.
+            transform (GridTransform): The transform returned by locate.
+        Returns:
+            dict: The result, with its cells in the frame of the grid, or None if it is not cached.
+        """
+        entry = self.memo.get(key)
+        if entry is None:
+            return None
+        return dict(entry, cells=transform.invert(entry['cells']))
+
+    def put(self, key, transform, result):
+        """
+        Cache the result of a grid, unless it is unsolved: the search backends give up on node and time
+        limits, so a grid they left unsolved may be solved by another run.
+        Args:
+            key (str): The key returned by locate.
+            transform (GridTransform): The transform returned by locate.
+            result (dict): The result, its cells in the frame of the grid. Only the status, difficulty,
+                           rules, cells and score (None if the result has none) are kept.
+        """
+        if result['status'] == 'unsolved':
+            return
+        self.memo.put(key, {'status': result['status'], 'difficulty': result['difficulty'],
+                            'rules': list(result['rules']), 'cells': transform.apply(result['cells']),
+                            'score': result.get('score')})
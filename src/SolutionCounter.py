@@ -0,0 +1,102 @@
+# Author: Noe Florence
+# Description: Counts the solutions of a Sudoku grid up to a limit, propagating the deduction rules and
+# branching on the cell with the fewest candidates, so that telling a unique puzzle from an ambiguous one
+# costs about as much as solving it.
+
+from DeductionRuleFactory import DeductionRuleFactory
+
+# Rules applied at each node of the search: the singles settle most cells between branchings, the costlier
+# rules slow the search down more than they prune it
+PROPAGATION_RULES = ('DR1', 'DR2')
+
+# Counter used by count_solutions and is_unique, created on first use
+_counter = None
+
+
+class SolutionCounter:
+    """
+    Depth-first search over the grid: at each node the rules run until they stall, then the empty cell with
+    the fewest candidates is tried with each of them in turn. Branches ending in a contradiction are dropped,
+    and the search stops as soon as the limit is reached.
+    """
+
+    def __init__(self, rule_names=PROPAGATION_RULES):
+        """
+        Initialize the counter.
+        Args:
+            rule_names (tuple): The rules propagated at each node, in order.
+        Raises:
+            ValueError: If a rule name is unknown.
+        """
+        self.rule_chain = DeductionRuleFactory.create_scheduler(list(rule_names))
+
+    def count(self, grid, limit=2):
+        """
+        Count the solutions of a grid, without modifying it.
+        Args:
+            grid (SudokuGrid): The Sudoku grid.
+            limit (int): The number of solutions at which the search stops.
+        Returns:
+            int: The number of solutions, or limit if there are at least that many.
+        """
+        count = 0
+        stack = [grid.clone()]
+        while stack:
+            current = stack.pop()
+            try:
+                while not current.is_solved() and self.rule_chain.handle(current):
+                    pass
+            except ValueError:
+                continue
+            if current.is_solved():
+                count += 1
+                if count >= limit:
+                    break
+                continue
+            index = current.most_constrained_cell()
+            # The smallest digit is tried first: it is pushed last, reusing the node itself
+            digits = current.masks.digits[current.candidates[index]]
+            for digit in reversed(digits):
+                child = current.clone() if digit != digits[0] else current
+                try:
+                    child.set_value(index, digit)
+                except ValueError:
+                    continue
+                stack.append(child)
+        return count
+
+    def is_unique(self, grid):
+        """
+        Check whether a grid has exactly one solution, stopping at the second one.
+        Args:
+            grid (SudokuGrid): The Sudoku grid.
+        Returns:
+            bool: True if the grid has a single solution, False if it has none or several.
+        """
+        return self.count(grid, 2) == 1
+
+
+def count_solutions(grid, limit=2):
+    """
+    Count the solutions of a grid up to a limit (see SolutionCounter.count).
+    Args:
+        grid (SudokuGrid): The Sudoku grid, left unchanged.
+        limit (int): The number of solutions at which the search stops.
+    Returns:
+        int: The number of solutions, or limit if there are at least that many.
+    """
+    global _counter
+    if _counter is None:
+        _counter = SolutionCounter()
+    return _counter.count(grid, limit)
+
+
+def is_unique(grid):
+    """
+    Check whether a grid has exactly one solution (see SolutionCounter.is_unique).
+    Args:
+        grid (SudokuGrid): The Sudoku grid, left unchanged.
+    Returns:
+        bool: True if the grid has a single solution, False if it has none or several.
+    """
+    return count_solutions(grid, 2) == 1
@@ -0,0 +1,361 @@
+# Author: Noe Florence
+# Description: Long-running solve service answering newline-delimited JSON requests over a local TCP or
+# Unix socket. The solving runs in a warm pool of worker processes, so no request pays for an interpreter
+# start, and the service never prompts.
+
+import asyncio
+import json
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from BatchSolver import _init_worker as _init_solve_worker, solve_grid
+from CandidateMask import tables_of
+from DeductionRuleFactory import DeductionRuleFactory
+from DifficultyRater import _init_worker as _init_rate_worker, puzzle_values, rate_grid
+from SolutionCounter import count_solutions
+from SudokuGrid import SudokuGrid
+
+# Rule chain giving the hints of the current worker process, created once by _init_worker
+_worker_hint_chain = None
+
+
+def _init_worker(backend, rule_names=None, adaptive=False, max_score=None):
+    """
+    Initialize a worker process: build the rule chains of each operation and the topology and mask tables
+    of every grid size up front, so that the first request of a worker is as fast as the others.
+    Args:
+        backend (str): The backend used when the deduction rules stall.
+        rule_names (list): The rules to apply when solving, in order, or None for the default chain.
+        adaptive (bool): Whether to schedule the rules adaptively when solving.
+        max_score (float): The score at which rating a grid stops, or None to always finish the grid.
+    """
+    global _worker_hint_chain
+    _init_solve_worker(backend, False, rule_names, adaptive)
+    _init_rate_worker(max_score)
+    _worker_hint_chain = DeductionRuleFactory().create_rules()
+    for box in range(2, 6):
+        SudokuGrid.topology_of(box)
+        tables_of(box * box)
+
+
+def _ready():
+    """
+    Task run once by each worker when the pool starts, forcing the workers to start and initialize.
+    Returns:
+        bool: Always True.
+    """
+    return True
+
+
+def count_grid(values, limit=2):
+    """
+    Count the solutions of a grid, up to a limit.
+    Args:
+        values (list): The cell values, with -1 for empty cells.
+        limit (int): The number of solutions at which the count stops.
+    Returns:
+        dict: The number of solutions (0 for an inconsistent grid) and whether the grid has exactly one.
+    """
+    try:
+        solutions = count_solutions(SudokuGrid(values), limit)
+    except ValueError:
+        solutions = 0
+    return {'solutions': solutions, 'unique': solutions == 1}
+
+
+def hint_grid(values, rule_chain=None):
+    """
+    Find the next value the rules can place in a grid, as HintSession.hint does: since a request only carries
+    cell values, the steps that only eliminate candidates are applied first and listed under 'because', so
+    that a client placing the hint's values gets a new hint on its next request.
+    The naked singles the placing step leaves are not placed, they are the next hints.
+    Args:
+        values (list): The cell values, with -1 for empty cells.
+        rule_chain (DeductionRule): The rule chain to use, or None for the worker's chain.
+    Returns:
+        dict: The rule placing the values (None if the grid is solved or the rules stall), the (index, value)
+              pairs of the cells it placed, the (index, digits) pairs of the candidates it eliminated, whether
+              the grid is solved, and under 'because' the rule and eliminations of each step needed first.
+    Raises:
+        ValueError: If the grid is inconsistent.
+    """
+    if rule_chain is None:
+        rule_chain = _worker_hint_chain
+    grid = SudokuGrid(values)
+    # One step per rule: the values the rule places do not cascade into the singles they create
+    grid.propagate_singles = False
+    hint = {'rule': None, 'placed': [], 'eliminated': [], 'solved': grid.is_solved(), 'because': []}
+    digits = grid.masks.digits
+    while not grid.is_solved():
+        state = grid.capture()
+        rule_name = rule_chain.handle(grid)
+        if not rule_name:
+            break
+        changes = grid.changes_since(state)
+        placed = [[index, digit] for index, digit, _ in changes if digit]
+        eliminated = [[index, list(digits[mask])] for index, _, mask in changes if mask]
+        if placed:
+            hint.update(rule=rule_name, placed=placed, eliminated=eliminated, solved=grid.is_solved())
+            break
+        hint['because'].append({'rule': rule_name, 'eliminated': eliminated})
+    return hint
+
+
+class SolveService:
+    """
+    Serves solve, rate, hint and count requests, one JSON object per line, answered one JSON object per line:
+        {"id": 1, "op": "solve", "grid": "..3.2.6..9..3.5..1..."}  ->  {"id": 1, "op": "solve", "result": {...}}
+    The grid is a puzzle string (see DifficultyRater.puzzle_key) or a list of cell values with -1 or 0 for
+    empty cells; count requests may give the "limit" of solutions at which to stop (2 by default, enough to
+    check uniqueness). Answers come back as soon as they are ready, possibly out of order, tagged with the id of
+    their request; a request that cannot be served is answered with an "error" message instead.
+    Backpressure: a client with client_limit requests in progress is not read any further until one is
+    answered, at most max_pending requests wait for or occupy the pool, and answers are only written as
+    fast as the client reads them.
+    """
+
+    OPERATIONS = ('solve', 'rate', 'hint', 'count')
+
+    # Largest limit of a count request
+    MAX_COUNT = 1000
+
+    def __init__(self, backend='rules', processes=None, rule_names=None, adaptive=False, max_score=None,
+                 max_pending=256, client_limit=16, max_line=65536):
+        """
+        Initialize the service.
+        Args:
+            backend (str): The backend used when the deduction rules stall.
+            processes (int): The number of worker processes, or None for one per CPU.
+            rule_names (list): The rules to apply when solving, in order, or None for the default chain.
+            adaptive (bool): Whether to schedule the rules adaptively when solving.
+            max_score (float): The score at which rating a grid stops, or None to always finish the grids.
+            max_pending (int): The maximum number of requests waiting for or running in the pool.
+            client_limit (int): The maximum number of requests of a client in progress at once.
+            max_line (int): The maximum length of a request line, in bytes.
+        Raises:
+            ValueError: If the backend is 'parallel': the requests are already served in parallel.
+        """
+        if backend == 'parallel':
+            raise ValueError("The parallel backend spreads one grid over every core, use 'search' in the service.")
+        self.backend = backend
+        self.processes = processes
+        self.rule_names = rule_names
+        self.adaptive = adaptive
+        self.max_score = max_score
+        self.max_pending = max_pending
+        self.client_limit = client_limit
+        self.max_line = max_line
+        self.pool = None
+        self.server = None
+        self._pending = None
+
+    @staticmethod
+    def parse_address(address):
+        """
+        Split a listening address into a TCP host and port, or a Unix socket path.
+        Args:
+            address (str): 'host:port', ':port' for localhost, or the path of a Unix socket.
+        Returns:
+            tuple: (host, port) for TCP, or (path, None) for a Unix socket.
+        """
+        host, separator, port = address.rpartition(':')
+        if separator and port.isdigit() and '/' not in address:
+            return host or '127.0.0.1', int(port)
+        return address, None
+
+    async def start(self, address):
+        """
+        Start the worker pool and listen on an address.
+        Args:
+            address (str): The listening address (see parse_address).
+        """
+        loop = asyncio.get_running_loop()
+        processes = self.processes or os.cpu_count() or 1
+        self.pool = self._create_pool()
+        # Start every worker now rather than on the first requests
+        await asyncio.gather(*(loop.run_in_executor(self.pool, _ready) for _ in range(processes)))
+        self._pending = asyncio.Semaphore(self.max_pending)
+        host, port = self.parse_address(address)
+        if port is None:
+            self.server = await asyncio.start_unix_server(self._serve_client, host, limit=self.max_line)
+        else:
+            self.server = await asyncio.start_server(self._serve_client, host, port, limit=self.max_line)
+
+    def _create_pool(self):
+        """
+        Create the worker pool, each worker initializing its rule chains.
+        Returns:
+            ProcessPoolExecutor: The pool.
+        """
+        return ProcessPoolExecutor(self.processes or os.cpu_count() or 1, initializer=_init_worker,
+                                   initargs=(self.backend, self.rule_names, self.adaptive, self.max_score))
+
+    async def serve_forever(self, address):
+        """
+        Serve requests on an address until the process receives SIGINT or SIGTERM, or the task is cancelled.
+        Args:
+            address (str): The listening address (see parse_address).
+        """
+        await self.start(address)
+        loop = asyncio.get_running_loop()
+        stopped = asyncio.Event()
+        signals = []
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, stopped.set)
+                signals.append(signum)
+            except NotImplementedError:
+                # Windows event loops have no signal handlers, Ctrl+C still interrupts the service
+                pass
+        try:
+            await stopped.wait()
+        finally:
+            for signum in signals:
+                loop.remove_signal_handler(signum)
+            self.close()
+
+    def close(self):
+        """
+        Stop listening and shut the worker pool down.
+        """
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    async def _serve_client(self, reader, writer):
+        """
+        Read the requests of a client and answer them concurrently, up to client_limit at a time.
+        Args:
+            reader (StreamReader): The client's input stream.
+            writer (StreamWriter): The client's output stream.
+        """
+        slots = asyncio.Semaphore(self.client_limit)
+        lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                await slots.acquire()
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # The line exceeds max_line: the rest of the stream cannot be split reliably
+                    await self._send(writer, lock, {'id': None, 'error': "The request line is too long."})
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    slots.release()
+                    continue
+                task = asyncio.create_task(self._answer(line, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                task.add_done_callback(lambda _: slots.release())
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def _answer(self, line, writer, lock):
+        """
+        Answer one request line.
+        Args:
+            line (bytes): The request, a JSON object.
+            writer (StreamWriter): The client's output stream.
+            lock (Lock): The lock serializing the answers written to the client.
+        """
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("A request must be a JSON object.")
+            request_id = request.get('id')
+            operation = request.get('op', 'solve')
+            if operation not in self.OPERATIONS:
+                raise ValueError(f"Unknown operation {operation!r}, expected one of {', '.join(self.OPERATIONS)}.")
+            values = self._values_of(request.get('grid'))
+            limit = request.get('limit', 2)
+            if type(limit) is not int or not 1 <= limit <= self.MAX_COUNT:
+                raise ValueError(f"The limit must be an integer between 1 and {self.MAX_COUNT}.")
+            answer = {'id': request_id, 'op': operation, 'result': await self._run(operation, values, limit)}
+        except Exception as e:
+            # Malformed requests, inconsistent grids and worker failures are reported to the client alone
+            answer = {'id': request_id, 'error': str(e) or e.__class__.__name__}
+        await self._send(writer, lock, answer)
+
+    @staticmethod
+    def _values_of(grid):
+        """
+        Read the cell values of a request's grid.
+        Args:
+            grid (str or list): A puzzle string or a list of cell values, -1 or 0 for empty cells.
+        Returns:
+            list: The cell values, with -1 for empty cells.
+        Raises:
+            ValueError: If the grid is missing or malformed.
+        """
+        if isinstance(grid, str):
+            values = puzzle_values(grid)
+        elif isinstance(grid, list) and all(type(value) is int for value in grid):
+            values = [-1 if value == 0 else value for value in grid]
+        else:
+            raise ValueError("The grid must be a puzzle string or a list of integers.")
+        size = SudokuGrid.box_size_of(len(values)) ** 2
+        if any(not (1 <= value <= size or value == -1) for value in values):
+            raise ValueError(f"The values must be between 1 and {size}.")
+        return values
+
+    async def _run(self, operation, values, limit=2):
+        """
+        Run an operation on a grid in the worker pool, waiting for a slot when max_pending are in progress.
+        Args:
+            operation (str): 'solve', 'rate', 'hint' or 'count'.
+            values (list): The cell values, with -1 for empty cells.
+            limit (int): The number of solutions at which a count stops.
+        Returns:
+            dict: The result of the operation.
+        Raises:
+            BrokenProcessPool: If a worker died during the operation; the pool is then replaced, so that the
+                               following requests are served.
+        """
+        loop = asyncio.get_running_loop()
+        async with self._pending:
+            pool = self.pool
+            try:
+                if operation == 'solve':
+                    result = await loop.run_in_executor(pool, solve_grid, (0, values, ()))
+                    del result['index']
+                elif operation == 'rate':
+                    result = await loop.run_in_executor(pool, rate_grid, values)
+                elif operation == 'count':
+                    result = await loop.run_in_executor(pool, count_grid, values, limit)
+                else:
+                    result = await loop.run_in_executor(pool, hint_grid, values)
+            except BrokenProcessPool:
+                # Every request in progress fails with the pool, the first one to get here replaces it
+                if self.pool is pool:
+                    self.pool = self._create_pool()
+                    pool.shutdown(wait=False, cancel_futures=True)
+                raise
+        return result
+
+    @staticmethod
+    async def _send(writer, lock, answer):
+        """
+        Write an answer to a client, waiting while its buffer is full.
+        Args:
+            writer (StreamWriter): The client's output stream.
+            lock (Lock): The lock serializing the answers written to the client.
+            answer (dict): The answer, serializable to JSON.
+        """
+        async with lock:
+            writer.write(json.dumps(answer).encode() + b'\n')
+            await writer.drain()
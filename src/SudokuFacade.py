@@ -1,6 +1,8 @@
 # Author: Noe Florence
 # Description: Facade class for solving Sudoku puzzles.
 
+from DeductionRuleFactory import DeductionRuleFactory
+from SolutionCache import SolutionCache
 from SudokuGrid import SudokuGrid
 from SudokuSolver import SudokuSolver
 
@@ -10,27 +12,63 @@ class SudokuFacade:
     Facade class for solving Sudoku puzzles.
     """
 
-    def __init__(self, initial_values):
+    def __init__(self, initial_values, backend='rules', collect_stats=False, rule_names=None, adaptive=False,
+                 cache=None, processes=None):
         """
         Initialize the SudokuFacade with initial cell values.
         Args:
-            initial_values (list): A list of 81 integers representing the initial cell values.
+            initial_values (list): A list of integers representing the initial cell values (81 for a 9x9 grid).
                                    Use -1 for empty cells
+            backend (str): The backend used when the deduction rules stall (see SudokuSolver.BACKENDS).
+            collect_stats (bool): Whether to record and print per-rule statistics.
+            rule_names (list): The rules to apply, in order, or None for the default DR1-DR9 chain.
+            adaptive (bool): Whether to reorder the rules from their observed hit rate and cost.
+            cache (SolutionCache): The cache of solutions to look the grid up in, or None to always solve it.
+            processes (int): The number of worker processes of the 'parallel' backend, or None for one per CPU.
         """
+        self.initial_values = initial_values
         self.grid = SudokuGrid(initial_values)
-        self.solver = SudokuSolver(self.grid)
+        self.cache = cache
+        self.namespace = SolutionCache.namespace_of(backend, rule_names, adaptive)
+        rule_chain = None
+        if rule_names is not None or adaptive:
+            rule_chain = DeductionRuleFactory.create_scheduler(rule_names, adaptive)
+        self.solver = SudokuSolver(self.grid, backend, rule_chain, collect_stats=collect_stats, processes=processes,
+                                   rule_names=rule_names)
 
     def solve(self):
         """
         Solve the Sudoku puzzle and print the solution.
+        A grid equal up to symmetry to a cached one is not solved again.
         """
+        if self.cache is not None:
+            frame = self.cache.locate(self.initial_values, self.namespace)
+            entry = self.cache.get(*frame)
+            if entry is not None and entry['status'] == 'solved':
+                print("Sudoku solved successfully!")
+                SudokuGrid(entry['cells']).print_grid()
+                print(f"Used rules: {set(entry['rules'])}")
+                print(f"Difficulty Level: {entry['difficulty']}")
+                print("The solution was found in the cache.")
+                return
         if self.solver.solve():
             print("Sudoku solved successfully!")
             self.grid.print_grid()
+            print(f"Used rules: {self.solver.used_rules}")
             difficulty = self.solver.evaluate_difficulty()
             print(f"Difficulty Level: {difficulty}")
             if self.solver.user_intervened:
                 print("The grid was completed after you manually entered a number.")
+            if self.solver.exact_cover_used:
+                print("The grid was completed by the exact-cover backend.")
+            if self.solver.search_used:
+                print(f"The grid was completed by the search backend ({self.solver.search_nodes} nodes).")
+            if self.cache is not None and not self.solver.user_intervened:
+                # Grids completed from the user's input are not cached, the user may have guessed
+                self.cache.put(*frame, {'status': 'solved', 'difficulty': difficulty,
+                                        'rules': sorted(self.solver.used_rules), 'cells': self.grid.cells})
         else:
             print("Could not solve the Sudoku.")
-            print("Difficulty Level: Very High")
\ No newline at end of file
+            print("Difficulty Level: Very High")
+        if self.solver.stats is not None:
+            print(self.solver.stats)
\ No newline at end of file
@@ -1,106 +1,469 @@
 # Author: Noe Florence
 # Description: SudokuGrid class representing the state of a Sudoku grid, extending Observable.
 
+from array import array
+from collections import deque
+from math import isqrt
+
+from CandidateMask import tables_of
 from Observable import Observable
 
 
 class SudokuGrid(Observable):
     """
     Represents a Sudoku grid and manages cell values, candidates, units, and peers.
+    Observers receive ('set_value', index, value) for each value set outside a deduction step, and a single
+    ('step', rule_name, changes) event per step (see begin_step and end_step).
+    A grid of box size b has b*b digits, b*b rows, columns and blocks, and b**4 cells (81 cells for b = 3).
+    The topology tables never change for a given box size: they are computed once per size
+    (see topology_of) and shared by every grid of that size. The tables of the 9x9 board are also
+    available as class attributes.
     """
 
+    units = ()       # The 27 units: rows 0-8, columns 9-17, blocks 18-26
+    peers = ()       # For each cell, the 20 cells sharing a unit with it
+    cell_units = ()  # For each cell, its (row, column, block) unit numbers
+    unit_masks = ()  # For each unit, the bit mask of its cells
+    peer_masks = ()  # For each cell, the bit mask of its peers
+    crossings = ()   # For each block, the rows and columns crossing it; for each row or column, the blocks
+
+    # Topology tables of each box size, built on first use by topology_of
+    _topologies = {}
+
+    # Length of the change log beyond which the changes every rule has read are dropped (see mark_seen)
+    LOG_LIMIT = 4096
+
     def __init__(self, initial_values):
         """
         Initialize the Sudoku grid with initial cell values.
         Args:
-            initial_values (list): A list of 81 integers representing the initial cell values.
-                                   Use -1 for empty cells.
+            initial_values (list): A list of b**4 integers representing the initial cell values
+                                   (81 for a 9x9 grid). Use -1 for empty cells.
+        Raises:
+            ValueError: If the grid is not 4x4, 9x9, 16x16 or 25x25, or is inconsistent.
         """
         super().__init__()
+        self._set_topology(self.box_size_of(len(initial_values)))
         # Copy the initial cell values
-        self.cells = initial_values[:]  # List of 81 elements
-        # Initialize candidates: for empty cells (-1), candidates are numbers 1-9; otherwise, empty set
-        self.candidates = [set(range(1, 10)) if val == -1 else set() for val in self.cells]
-        # Generate units (rows, columns, blocks) and peers for each cell
-        self.units = self._generate_units()
-        self.peers = self._generate_peers()
+        self.cells = initial_values[:]
+        # Initialize candidates as one mask per cell: all digits for empty cells (-1), none otherwise.
+        # 16-bit storage holds up to 16 digits, wider grids use 32-bit storage.
+        all_digits = self.masks.all_digits
+        self.candidates = array('H' if self.size <= 16 else 'L',
+                                [all_digits if val == -1 else 0 for val in self.cells])
+        # Log of the cells whose value or candidates changed, and how far each rule has read it.
+        # Every cell starts out as changed so that each rule scans the whole grid on its first run.
+        # Positions count from the start of the grid's history: log_start changes were dropped before the log.
+        self.change_log = list(range(len(self.cells)))
+        self.log_start = 0
+        self.log_positions = {}
+        # Number of empty cells, so that is_solved does not scan the grid
+        self.empty_count = self.cells.count(-1)
+        # Worklist of pending assignments (index, value, forced), drained iteratively by _propagate.
+        # When propagate_singles is set, a cell reduced to one candidate is queued as a forced assignment.
+        self._pending = deque()
+        self.propagate_singles = False
+        self.singles_propagated = 0
+        # Undo trail of the changes made since start_trail, or None while changes are not recorded
+        self.trail = None
         # Update candidates based on initial values
         self._initialize_candidates()
+        self.propagate_singles = True
+        # Per-digit bitboards: bit i of boards[d] is set while digit d is a candidate of cell i
+        self.boards = self._build_boards()
 
     @staticmethod
-    def _generate_units():
+    def box_size_of(num_cells):
+        """
+        Get the box size of a grid from its number of cells.
+        Args:
+            num_cells (int): The number of cells of the grid.
+        Returns:
+            int: The box size (3 for a 9x9 grid).
+        Raises:
+            ValueError: If the number of cells is not the fourth power of a box size between 2 and 5.
+        """
+        size = isqrt(num_cells)
+        box = isqrt(size)
+        if not 2 <= box <= 5 or box * box != size or size * size != num_cells:
+            raise ValueError(f"A grid must have 16, 81, 256 or 625 cells, not {num_cells}.")
+        return box
+
+    @classmethod
+    def topology_of(cls, box=3):
+        """
+        Get the topology tables of a box size, shared by every grid of that size.
+        Args:
+            box (int): The box size.
+        Returns:
+            dict: The units, peers, cell_units, unit_masks, peer_masks and crossings tables.
+        """
+        topology = cls._topologies.get(box)
+        if topology is None:
+            units = tuple(tuple(unit) for unit in cls._generate_units(box))
+            peers = tuple(tuple(sorted(peers)) for peers in cls._generate_peers(box))
+            cell_units = tuple(cls._generate_cell_units(units))
+            topology = cls._topologies[box] = {
+                'units': units,
+                'peers': peers,
+                'cell_units': cell_units,
+                'unit_masks': tuple(sum(1 << index for index in unit) for unit in units),
+                'peer_masks': tuple(sum(1 << peer for peer in cell_peers) for cell_peers in peers),
+                'crossings': tuple(cls._generate_crossings(units, cell_units)),
+            }
+        return topology
+
+    def _set_topology(self, box):
+        """
+        Attach the shared topology and candidate mask tables of a box size to the grid.
+        Args:
+            box (int): The box size.
+        """
+        self.box = box
+        self.size = box * box
+        self.masks = tables_of(self.size)
+        topology = self.topology_of(box)
+        self.units = topology['units']
+        self.peers = topology['peers']
+        self.cell_units = topology['cell_units']
+        self.unit_masks = topology['unit_masks']
+        self.peer_masks = topology['peer_masks']
+        self.crossings = topology['crossings']
+
+    @staticmethod
+    def _generate_units(box=3):
         """
         Generate the units (rows, columns, and blocks) for the Sudoku grid.
+        Args:
+            box (int): The box size.
         Returns:
             list: A list containing all units of the grid.
         """
+        size = box * box
         units = []
         # Generate rows
-        rows = [range(i * 9, (i + 1) * 9) for i in range(9)]
+        rows = [range(i * size, (i + 1) * size) for i in range(size)]
         # Generate columns
-        cols = [range(i, 81, 9) for i in range(9)]
+        cols = [range(i, size * size, size) for i in range(size)]
         # Generate blocks
         blocks = []
-        for i in (0, 3, 6):
-            for j in (0, 27, 54):
-                # Each block contains 9 cells
-                block = [i + j + k for k in [0, 1, 2, 9, 10, 11, 18, 19, 20]]
+        offsets = [r * size + c for r in range(box) for c in range(box)]
+        for i in range(0, size, box):
+            for j in range(0, size * size, box * size):
+                # Each block contains size cells
+                block = [i + j + k for k in offsets]
                 blocks.append(block)
         # Combine all units
         units.extend(rows + cols + blocks)
         return units
 
     @staticmethod
-    def _generate_peers():
+    def _generate_peers(box=3):
         """
         Generate the peers for each cell in the Sudoku grid.
+        Args:
+            box (int): The box size.
         Returns:
             list: A list of sets, where each set contains the indices of the peers for a cell.
         """
-        peers = [set() for _ in range(81)]
-        for index in range(81):
-            row = index // 9
-            col = index % 9
+        size = box * box
+        peers = [set() for _ in range(size * size)]
+        for index in range(size * size):
+            row = index // size
+            col = index % size
             # Calculate block starting positions
-            block_row = (row // 3) * 3
-            block_col = (col // 3) * 3
+            block_row = (row // box) * box
+            block_col = (col // box) * box
             # Indices of cells in the same block
             block_indices = [
-                (block_row + r) * 9 + block_col + c
-                for r in range(3) for c in range(3)
+                (block_row + r) * size + block_col + c
+                for r in range(box) for c in range(box)
             ]
             # Combine indices of cells in the same row, column, and block
             peer_indices = set(
-                [row * 9 + c for c in range(9)] +    # Same row
-                [r * 9 + col for r in range(9)] +    # Same column
-                block_indices                         # Same block
+                [row * size + c for c in range(size)] +    # Same row
+                [r * size + col for r in range(size)] +    # Same column
+                block_indices                               # Same block
             )
             peer_indices.remove(index)  # Remove the cell itself
             peers[index] = peer_indices
         return peers
 
+    @staticmethod
+    def _generate_cell_units(units):
+        """
+        Generate, for each cell, the numbers of the units containing it.
+        Args:
+            units (list): The units of the grid, as returned by _generate_units.
+        Returns:
+            list: For each cell, the tuple (row unit, column unit, block unit).
+        """
+        cell_units = [[] for _ in range(len(units) // 3 * len(units) // 3)]
+        for number, unit in enumerate(units):
+            for index in unit:
+                cell_units[index].append(number)
+        return [tuple(numbers) for numbers in cell_units]
+
+    @staticmethod
+    def _generate_crossings(units, cell_units):
+        """
+        Generate, for each unit, the units of the other kind crossing it.
+        Args:
+            units (tuple): The units of the grid.
+            cell_units (tuple): The (row, column, block) unit numbers of each cell.
+        Returns:
+            list: For each block, the numbers of its rows then its columns; for each row or column,
+                  the numbers of the blocks it crosses.
+        """
+        size = len(units) // 3
+        crossings = []
+        for number, unit in enumerate(units):
+            if number < 2 * size:
+                crossing = sorted({cell_units[index][2] for index in unit})
+            else:
+                crossing = (sorted({cell_units[index][0] for index in unit})
+                            + sorted({cell_units[index][1] for index in unit}))
+            crossings.append(tuple(crossing))
+        return crossings
+
     def _initialize_candidates(self):
         """
         Initialize candidates for each cell based on initial values.
         """
+        # Mask of the digits already placed in each unit
+        unit_digits = [0] * len(self.units)
+        cell_units = self.cell_units
+        bits = self.masks.bit
         for index, value in enumerate(self.cells):
             if value != -1:
-                # Update candidates for peers when a cell has an initial value
-                self.update_candidates(index, value)
+                row, col, block = cell_units[index]
+                bit = bits[value]
+                if (unit_digits[row] | unit_digits[col] | unit_digits[block]) & bit:
+                    # The same value is given twice in a unit
+                    raise ValueError("Inconsistency detected in the grid.")
+                unit_digits[row] |= bit
+                unit_digits[col] |= bit
+                unit_digits[block] |= bit
+        candidates = self.candidates
+        for index, mask in enumerate(candidates):
+            if mask:
+                row, col, block = cell_units[index]
+                # Remove the digits placed in the peers of the cell
+                mask &= ~(unit_digits[row] | unit_digits[col] | unit_digits[block])
+                if not mask:
+                    raise ValueError("Inconsistency detected in the grid.")
+                candidates[index] = mask
+
+    def _build_boards(self):
+        """
+        Build the per-digit bitboards from the candidate masks.
+        Returns:
+            list: For each digit (index 0 unused), the mask of the cells where it is a candidate.
+        """
+        boards = [0] * (self.size + 1)
+        digits = self.masks.digits
+        for index, mask in enumerate(self.candidates):
+            for digit in digits[mask]:
+                boards[digit] |= 1 << index
+        return boards
+
+    def snapshot(self):
+        """
+        Capture the mutable state of the grid (cells and candidates), without observers or topology.
+        Returns:
+            tuple: An opaque snapshot to pass to restore.
+        """
+        return self.cells[:], self.candidates[:], self.empty_count, self.boards[:]
+
+    def restore(self, snapshot):
+        """
+        Restore the grid to a state captured by snapshot.
+        Every rule rescans the whole grid on its next run, since any cell may have changed.
+        Args:
+            snapshot (tuple): A snapshot returned by snapshot().
+        """
+        cells, candidates, empty_count, boards = snapshot
+        self.cells[:] = cells
+        self.candidates[:] = candidates
+        self.empty_count = empty_count
+        self.boards[:] = boards
+        self._pending.clear()
+        self.change_log = list(range(len(self.cells)))
+        self.log_start = 0
+        self.log_positions = {}
+        # The changes recorded before the snapshot was restored can no longer be undone
+        self.trail = None
+
+    def clone(self):
+        """
+        Create an independent copy of the grid, copying only the cells and candidates.
+        The copy shares the topology tables and starts without observers.
+        Returns:
+            SudokuGrid: The copy of the grid.
+        """
+        grid = SudokuGrid.__new__(SudokuGrid)
+        Observable.__init__(grid)
+        grid._set_topology(self.box)
+        grid.cells = self.cells[:]
+        grid.candidates = self.candidates[:]
+        grid.empty_count = self.empty_count
+        grid.boards = self.boards[:]
+        grid.change_log = list(range(len(self.cells)))
+        grid.log_start = 0
+        grid.log_positions = {}
+        grid._pending = deque()
+        grid.propagate_singles = self.propagate_singles
+        grid.singles_propagated = 0
+        grid.trail = None
+        return grid
 
     def set_value(self, index, value):
         """
-        Set a value for a cell and update candidates.
+        Set a value for a cell, update candidates and propagate the resulting naked singles.
         Args:
-            index (int): The index of the cell (0-80).
-            value (int): The value to set (1-9).
+            index (int): The index of the cell.
+            value (int): The value to set (1 to the grid size).
+        Raises:
+            ValueError: If the value is not a candidate of the cell or the propagation reaches a contradiction.
         """
-        self.cells[index] = value
-        self.candidates[index] = set()
-        # Update candidates for peers
-        self.update_candidates(index, value)
-        # Notify observers about the change
-        self.notify_observers(('set_value', index, value))
+        self._pending.append((index, value, False))
+        self._propagate()
+        # Notify observers about the change; without any, not even the event is built
+        if self.observers:
+            self.notify_observers(('set_value', index, value))
+
+    def begin_step(self):
+        """
+        Start a deduction step: until end_step, the observers are not notified of each value set, but once
+        for the whole step. Costs nothing when no observer is subscribed.
+        Returns:
+            tuple: The state of the grid before the step, to pass to end_step, or None without observers.
+        """
+        if not self.observers:
+            return None
+        self.begin_batch()
+        return self.capture()
+
+    def end_step(self, start, rule_name):
+        """
+        End a deduction step, notifying the observers of every change it made as a single event
+        ('step', rule_name, changes). Each change is a tuple (index, digit, eliminated), in order of first
+        change: the digit placed in the cell, or 0 and the mask of the candidates the cell lost.
+        Singles propagated during the step belong to it.
+        Args:
+            start (tuple): The state returned by begin_step.
+            rule_name (str): The name of the rule that made the step, or None.
+        """
+        if start is None:
+            return
+        changes = self.changes_since(start)
+        # A step without any net change, such as a search that gave up, notifies nothing
+        self.end_batch(('step', rule_name, changes), discard=not changes)
+
+    def capture(self):
+        """
+        Capture the state of the grid, to compare it with later on with changes_since.
+        Returns:
+            tuple: The position in the change log, and copies of the cells and candidates.
+        """
+        return self.checkpoint(), self.cells[:], self.candidates[:]
+
+    def changes_since(self, state):
+        """
+        List the net changes made to the grid since a state was captured, reading only the cells logged since.
+        If those changes were dropped from the log since, every cell is compared instead.
+        Args:
+            state (tuple): A state returned by capture.
+        Returns:
+            list: The (index, digit, eliminated) tuple of each changed cell, in order of first change: the digit
+                  placed in the cell, or 0 and the mask of the candidates the cell lost.
+        """
+        position, cells, candidates = state
+        changes = []
+        position -= self.log_start
+        indices = dict.fromkeys(self.change_log[position:]) if position >= 0 else range(len(self.cells))
+        for index in indices:
+            digit = max(self.cells[index], 0) if cells[index] == -1 else 0
+            # Placing a digit eliminates every other candidate of the cell, which is not repeated
+            eliminated = 0 if digit else candidates[index] & ~self.candidates[index]
+            if digit or eliminated:
+                changes.append((index, digit, eliminated))
+        return changes
+
+    def clear_value(self, index):
+        """
+        Empty a cell, recomputing the candidates of the cell and of its peers only, from the values placed in
+        their units: candidates eliminated by the rules in those cells come back. The change is not recorded on
+        the trail.
+        Args:
+            index (int): The index of the cell.
+        Returns:
+            bool: True if the cell held a value, False if it was already empty.
+        """
+        if self.cells[index] == -1:
+            return False
+        self.cells[index] = -1
+        self.empty_count += 1
+        bits = self.masks.bit
+        digits = self.masks.digits
+        all_digits = self.masks.all_digits
+        # Digits placed in each unit read, computed once
+        placed = {}
+        for cell in (index,) + self.peers[index]:
+            if self.cells[cell] != -1:
+                continue
+            mask = all_digits
+            for number in self.cell_units[cell]:
+                unit_mask = placed.get(number)
+                if unit_mask is None:
+                    unit_mask = placed[number] = sum(bits[self.cells[other]] for other in self.units[number]
+                                                     if self.cells[other] != -1)
+                mask &= ~unit_mask
+            current = self.candidates[cell]
+            if mask != current:
+                cell_bit = 1 << cell
+                for digit in digits[mask & ~current]:
+                    self.boards[digit] |= cell_bit
+                for digit in digits[current & ~mask]:
+                    self.boards[digit] &= ~cell_bit
+                self.candidates[cell] = mask
+                self.change_log.append(cell)
+        return True
+
+    def _propagate(self):
+        """
+        Drain the worklist of pending assignments, updating candidates for the peers of each placed cell.
+        Raises:
+            ValueError: If an assignment conflicts with the grid or a cell loses its last candidate.
+        """
+        pending = self._pending
+        trail = self.trail
+        try:
+            while pending:
+                index, value, forced = pending.popleft()
+                if self.cells[index] != -1:
+                    if self.cells[index] != value:
+                        raise ValueError("Inconsistency detected in the grid.")
+                    continue
+                if not self.candidates[index] & self.masks.bit[value]:
+                    raise ValueError("Inconsistency detected in the grid.")
+                if trail is not None:
+                    # The peers about to lose the value are the cells of its board among the peers
+                    trail.append((index, self.candidates[index], value, self.boards[value] & self.peer_masks[index]))
+                self.cells[index] = value
+                cell_bit = 1 << index
+                for digit in self.masks.digits[self.candidates[index]]:
+                    self.boards[digit] &= ~cell_bit
+                self.candidates[index] = 0
+                self.empty_count -= 1
+                self.change_log.append(index)
+                if forced:
+                    self.singles_propagated += 1
+                # Update candidates for peers
+                self.update_candidates(index, value)
+        except ValueError:
+            pending.clear()
+            raise
 
     def update_candidates(self, index, value):
         """
@@ -109,12 +472,228 @@ class SudokuGrid(Observable):
             index (int): The index of the cell that was assigned a value.
             value (int): The value that was assigned to the cell.
         """
+        candidates = self.candidates
+        bit = self.masks.bit[value]
+        self.boards[value] &= ~self.peer_masks[index]
         for peer in self.peers[index]:
-            if value in self.candidates[peer]:
-                self.candidates[peer].discard(value)
-                # If a peer has no candidates left and is empty, the grid is inconsistent
-                if not self.candidates[peer] and self.cells[peer] == -1:
-                    raise ValueError("Inconsistency detected in the grid.")
+            mask = candidates[peer]
+            if mask & bit:
+                mask ^= bit
+                candidates[peer] = mask
+                self.change_log.append(peer)
+                if self.cells[peer] == -1:
+                    self._check_candidates(peer, mask)
+
+    def _check_candidates(self, index, mask):
+        """
+        Check the candidates left in an empty cell, queuing it as a forced assignment if only one remains.
+        Args:
+            index (int): The index of the empty cell.
+            mask (int): The candidates left in the cell.
+        Raises:
+            ValueError: If the cell has no candidates left.
+        """
+        # If an empty cell has no candidates left, the grid is inconsistent
+        if not mask:
+            raise ValueError("Inconsistency detected in the grid.")
+        if self.propagate_singles and self.masks.popcount[mask] == 1:
+            self._pending.append((index, self.masks.lowest_digit[mask], True))
+
+    def remove_candidates(self, index, mask):
+        """
+        Remove candidates from a cell and record the change.
+        Args:
+            index (int): The index of the cell.
+            mask (int): The mask of the candidates to remove.
+        Returns:
+            bool: True if any candidate was removed, False otherwise.
+        Raises:
+            ValueError: If the cell has no candidates left.
+        """
+        current = self.candidates[index]
+        if not current & mask:
+            return False
+        if self.trail is not None:
+            self.trail.append((index, current & mask))
+        cell_bit = 1 << index
+        for digit in self.masks.digits[current & mask]:
+            self.boards[digit] &= ~cell_bit
+        current &= ~mask
+        self.candidates[index] = current
+        self.change_log.append(index)
+        if self.cells[index] == -1:
+            self._check_candidates(index, current)
+            self._propagate()
+        return True
+
+    def eliminate(self, cells, digit):
+        """
+        Remove a digit from the candidates of several cells.
+        Args:
+            cells (int): The mask of the cells (bit i for cell i).
+            digit (int): The digit to remove.
+        Returns:
+            bool: True if any candidate was removed, False otherwise.
+        """
+        changed = False
+        bit = self.masks.bit[digit]
+        while cells:
+            lowest = cells & -cells
+            if self.remove_candidates(lowest.bit_length() - 1, bit):
+                changed = True
+            cells ^= lowest
+        return changed
+
+    def start_trail(self):
+        """
+        Start recording on the undo trail every change made to the grid, if not already recording.
+        Returns:
+            int: The current position on the trail, to pass to undo.
+        """
+        if self.trail is None:
+            self.trail = []
+        return len(self.trail)
+
+    def undo(self, position):
+        """
+        Revert every change recorded on the trail after a position, most recent first. The cells changed
+        again are logged, so that the rules read them as changed; the trail keeps recording.
+        Args:
+            position (int): A position returned by start_trail.
+        """
+        trail = self.trail
+        cells, candidates, boards = self.cells, self.candidates, self.boards
+        digits = self.masks.digits
+        change_log = self.change_log
+        self._pending.clear()
+        while len(trail) > position:
+            change = trail.pop()
+            index = change[0]
+            if len(change) == 2:
+                # Candidates removed from a cell
+                removed = change[1]
+                candidates[index] |= removed
+            else:
+                # Value placed in a cell, and removed from the candidates of its peers
+                _, removed, value, peers = change
+                bit = self.masks.bit[value]
+                boards[value] |= peers
+                while peers:
+                    lowest = peers & -peers
+                    peer = lowest.bit_length() - 1
+                    candidates[peer] |= bit
+                    change_log.append(peer)
+                    peers ^= lowest
+                cells[index] = -1
+                candidates[index] = removed
+                self.empty_count += 1
+            cell_bit = 1 << index
+            for digit in digits[removed]:
+                boards[digit] |= cell_bit
+            change_log.append(index)
+
+    def stop_trail(self):
+        """
+        Stop recording changes and drop the trail: the changes made so far can no longer be undone.
+        """
+        self.trail = None
+
+    def checkpoint(self):
+        """
+        Get the current position in the change log, to be passed to mark_seen once a rule completes.
+        Returns:
+            int: The number of changes recorded so far.
+        """
+        return self.log_start + len(self.change_log)
+
+    def mark_seen(self, key, checkpoint):
+        """
+        Record that a rule has processed every change made before a checkpoint.
+        The position is only moved when the rule run completes, so a run interrupted by an exception
+        or re-entered through the observers never hides changes it did not process. Once the log grows
+        beyond LOG_LIMIT, the changes read by every rule that has run on the grid are dropped, so that the
+        log does not grow without bound over long searches and sessions; a rule that never ran scans the
+        whole grid anyway.
+        Args:
+            key (str): The name of the rule.
+            checkpoint (int): A position returned by checkpoint() before the rule started reading changes.
+        """
+        self.log_positions[key] = checkpoint
+        change_log = self.change_log
+        if len(change_log) > self.LOG_LIMIT:
+            read = min(self.log_positions.values()) - self.log_start
+            # Only dropped once it is most of the log, so that each change is moved a bounded number of times
+            if read > len(change_log) // 2:
+                del change_log[:read]
+                self.log_start += read
+
+    def has_changes(self, key):
+        """
+        Check whether any cell changed since the rule with the given key last completed, without collecting them.
+        Args:
+            key (str): The name of the rule reading the changes.
+        Returns:
+            bool: True if the change log grew since the rule's last position, or if the rule never completed.
+        """
+        return self.log_positions.get(key, 0) < self.checkpoint()
+
+    def dirty_cells(self, key):
+        """
+        Get the cells changed since the rule with the given key last completed.
+        Args:
+            key (str): The name of the rule reading the changes.
+        Returns:
+            list: The indices of the changed cells, in ascending order.
+        """
+        position = self.log_positions.get(key)
+        if position is None:
+            return list(range(len(self.cells)))
+        return sorted(set(self.change_log[position - self.log_start:]))
+
+    def dirty_units(self, key):
+        """
+        Get the units containing a cell changed since the rule with the given key last completed.
+        Args:
+            key (str): The name of the rule reading the changes.
+        Returns:
+            list: The numbers of the changed units (rows, then columns, then blocks: 0-8, 9-17 and 18-26
+                  on a 9x9 grid), in ascending order.
+        """
+        position = self.log_positions.get(key)
+        if position is None:
+            return list(range(len(self.units)))
+        numbers = set()
+        cell_units = self.cell_units
+        for index in self.change_log[position - self.log_start:]:
+            numbers.update(cell_units[index])
+        return sorted(numbers)
+
+    def get_candidates(self, index):
+        """
+        Get the candidates of a cell as digits.
+        Args:
+            index (int): The index of the cell.
+        Returns:
+            tuple: The candidate digits of the cell in ascending order.
+        """
+        return self.masks.digits[self.candidates[index]]
+
+    def most_constrained_cell(self):
+        """
+        Find the empty cell with the fewest candidates, the cell to branch on in a search.
+        Returns:
+            int: The index of the cell, or None if the grid is solved.
+        """
+        popcount = self.masks.popcount
+        best = None
+        fewest = self.size + 1
+        for index, mask in enumerate(self.candidates):
+            if mask and popcount[mask] < fewest:
+                best, fewest = index, popcount[mask]
+                if fewest <= 2:
+                    # Cells with one candidate are placed by the propagation, two is the minimum
+                    break
+        return best
 
     def is_solved(self):
         """
@@ -122,23 +701,31 @@ class SudokuGrid(Observable):
         Returns:
             bool: True if all cells are filled, False otherwise.
         """
-        return all(value != -1 for value in self.cells)
+        return self.empty_count == 0
 
     def print_grid(self):
         """
         Print the current state of the Sudoku grid in a readable format.
         """
-        print('+-------+-------+-------+')
-        for i in range(9):
+        box, size = self.box, self.size
+        width = len(str(size))
+        separator = '+' + '+'.join('-' * ((width + 1) * box + 1) for _ in range(box)) + '+'
+        print(separator)
+        for i in range(size):
             row = ''
-            for j in range(9):
-                val = self.cells[i * 9 + j]
-                if j % 3 == 0:
+            for j in range(size):
+                val = self.cells[i * size + j]
+                if j % box == 0:
                     row += '| '
                 # Use '.' for empty cells
-                row += str(val) if val != -1 else '.'
+                row += (str(val) if val != -1 else '.').rjust(width)
                 row += ' '
             row += '|'
             print(row)
-            if i % 3 == 2:
-                print('+-------+-------+-------+')
+            if i % box == box - 1:
+                print(separator)
+
+
+# Topology tables of the 9x9 board, also shared as class attributes
+for _name, _table in SudokuGrid.topology_of(3).items():
+    setattr(SudokuGrid, _name, _table)
@@ -1,7 +1,12 @@
 # Author: Noe Florence
 # Description: SudokuSolver class that applies deduction rules to solve a Sudoku puzzle.
 
+import time
+
 from DeductionRuleFactory import DeductionRuleFactory
+from ExactCoverSolver import ExactCoverSolver
+from ParallelSearch import ParallelSearch
+from RuleStats import RuleStats
 
 
 class SudokuSolver:
@@ -9,56 +14,93 @@ class SudokuSolver:
     Solver for Sudoku puzzles using deduction rules.
     """
 
-    def __init__(self, grid):
+    # Ways to complete the grid when the deduction rules stall:
+    # 'rules' prompts the user for a value, 'dlx' solves the remaining exact-cover problem,
+    # 'search' backtracks over the candidates, running the rules at every node, and 'parallel' splits that
+    # search across worker processes
+    BACKENDS = ('rules', 'dlx', 'search', 'parallel')
+
+    # Rules whose use makes a grid Hard
+    HARD_RULES = frozenset(('DR4', 'DR5', 'DR6', 'DR7', 'DR8', 'DR9'))
+
+    def __init__(self, grid, backend='rules', rule_chain=None, interactive=True, collect_stats=False,
+                 max_nodes=100000, time_limit=10.0, processes=None, rule_names=None):
         """
         Initialize the SudokuSolver with a grid.
         Args:
             grid (SudokuGrid): The Sudoku grid to solve.
+            backend (str): The backend used when the deduction rules stall, one of BACKENDS.
+            rule_chain (DeductionRule or RuleScheduler): An existing rule chain or scheduler to reuse,
+                                                         or None to create the default chain.
+            interactive (bool): Whether the 'rules' backend may prompt the user when the rules stall.
+            collect_stats (bool): Whether to record per-rule statistics in stats.
+            max_nodes (int): The number of search nodes after which the 'search' backend gives up, or None.
+            time_limit (float): The number of seconds after which the 'search' and 'parallel' backends give up,
+                                or None.
+            processes (int): The number of worker processes of the 'parallel' backend, or None for one per CPU.
+            rule_names (list): The names of the rules of rule_chain, in order, which the workers of the 'parallel'
+                               backend apply at every node, or None for the default chain.
+        Raises:
+            ValueError: If the backend is unknown.
         """
-        self._updating = None
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {', '.join(self.BACKENDS)}.")
         self.grid = grid
-        factory = DeductionRuleFactory()
-        self.rule_chain = factory.create_rules()
+        self.backend = backend
+        if rule_chain is None:
+            factory = DeductionRuleFactory()
+            rule_chain = factory.create_rules()
+        self.rule_chain = rule_chain
+        self.interactive = interactive
         self.used_rules = set()
         self.user_intervened = False
-        grid.add_observer(self)
-
-    def update(self, observable, event=None):
-        """
-        Observer update method, called when the grid changes.
-        Args:
-            observable (Observable): The observable object.
-            event: Optional event data.
-        """
-        if hasattr(self, '_updating') and self._updating:
-            return
-        self._updating = True
-        try:
-            self.apply_rules()
-        finally:
-            self._updating = False
+        self.exact_cover_used = False
+        self.stats = RuleStats() if collect_stats else None
+        self.max_nodes = max_nodes
+        self.time_limit = time_limit
+        self.processes = processes
+        self.rule_names = rule_names
+        self.search_used = False
+        self.search_nodes = 0
 
     def apply_rules(self):
         """
-        Apply deduction rules to the grid iteratively until no progress can be made.
+        Apply deduction rules to the grid iteratively until it is solved or no progress can be made.
+        Contradictions are detected by the grid as soon as a cell loses its last candidate.
+        Returns:
+            bool: True if the grid is solved, False if the rules stalled and no backend could finish it.
+        Raises:
+            ValueError: If an inconsistency is detected in the grid.
         """
-        while True:
-            # Check for inconsistencies in the grid
-            for index in range(81):
-                if self.grid.cells[index] != -1:
-                    continue
-                if not self.grid.candidates[index]:
-                    raise ValueError("Inconsistency detected in the grid.")
-            rule_name = self.rule_chain.handle(self.grid)
+        grid = self.grid
+        while not grid.is_solved():
+            # The observers of the grid are notified once per rule application
+            start = grid.begin_step()
+            rule_name = None
+            try:
+                rule_name = self.rule_chain.handle(grid, self.stats)
+            finally:
+                grid.end_step(start, rule_name)
+            if grid.singles_propagated:
+                # Naked singles placed by the grid's propagation are the work of DR1
+                self.used_rules.add('DR1')
             if rule_name:
                 self.used_rules.add(rule_name)
+            elif self.backend == 'dlx':
+                # Complete the grid with the exact-cover backend, seeded from the current candidates
+                self.exact_cover()
+            elif self.backend == 'search':
+                if not self.search():
+                    return False
+            elif self.backend == 'parallel':
+                if not self.parallel_search():
+                    return False
+            elif not self.interactive:
+                return False
             else:
-                if self.grid.is_solved():
-                    return True
-                else:
-                    # Prompt user input if the grid is not solvable by rules alone
-                    self.user_input()
-                    break
+                # Prompt user input if the grid is not solvable by rules alone
+                self.user_input()
+        return True
 
     def solve(self):
         """
@@ -73,24 +115,149 @@ class SudokuSolver:
             print("Please restart the solving.")
             return False
 
+    def exact_cover(self):
+        """
+        Complete the grid with the Dancing Links exact-cover backend when automatic solving stalls.
+        Raises:
+            ValueError: If the grid has no solution.
+        """
+        solutions = ExactCoverSolver().solve(self.grid)
+        if not solutions:
+            raise ValueError("The grid has no solution.")
+        self.exact_cover_used = True
+        start = self.grid.begin_step()
+        try:
+            for index, value in enumerate(solutions[0]):
+                if self.grid.cells[index] == -1:
+                    self.grid.set_value(index, value)
+        finally:
+            self.grid.end_step(start, 'dlx')
+
+    def search(self):
+        """
+        Complete the grid by backtracking when the rules stall: branch on the empty cell with the fewest
+        candidates, trying each of them in turn, and run the rules at every node until they stall again.
+        A branch reaching a contradiction is undone through the grid's trail instead of copying the grid.
+        Returns:
+            bool: True if the grid is solved, False if the node or time limit was reached first, the grid
+                  being then left as the rules left it.
+        Raises:
+            ValueError: If the grid has no solution.
+        """
+        grid = self.grid
+        deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        # The observers of the grid see the search as a single step, from the stalled grid to its solution
+        start = grid.begin_step()
+        root = grid.start_trail()
+        solved = False
+        try:
+            solved = self._search(deadline)
+        finally:
+            if not solved:
+                grid.undo(root)
+            grid.stop_trail()
+            grid.end_step(start, 'search' if solved else None)
+        self.search_used = self.search_used or solved
+        return solved
+
+    def parallel_search(self):
+        """
+        Complete the grid with a search split across worker processes when the rules stall (see ParallelSearch).
+        Returns:
+            bool: True if the grid is solved, False if the time limit was reached first.
+        Raises:
+            ValueError: If the grid has no solution.
+        """
+        result = ParallelSearch(self.processes, self.rule_names, time_limit=self.time_limit).solve(self.grid.cells)
+        self.search_nodes += result['nodes']
+        if not result['solutions']:
+            if not result['complete']:
+                return False
+            raise ValueError("The grid has no solution.")
+        self.search_used = True
+        start = self.grid.begin_step()
+        try:
+            for index, value in enumerate(result['solutions'][0]):
+                if self.grid.cells[index] == -1:
+                    self.grid.set_value(index, value)
+        finally:
+            self.grid.end_step(start, 'search')
+        return True
+
+    def _search(self, deadline):
+        """
+        Depth-first search from the current grid, leaving the grid solved if it succeeds.
+        Args:
+            deadline (float): The time.perf_counter() value at which to give up, or None.
+        Returns:
+            bool: True if the grid is solved, False if the node or time limit was reached.
+        Raises:
+            ValueError: If the grid has no solution.
+        """
+        grid = self.grid
+        # One branching per level: the trail position before the branch, the cell and the digits left to try
+        branches = []
+        consistent = True
+        while True:
+            if consistent:
+                if grid.is_solved():
+                    return True
+                self.search_nodes += 1
+                if self.max_nodes is not None and self.search_nodes > self.max_nodes:
+                    return False
+                if deadline is not None and time.perf_counter() > deadline:
+                    return False
+                index = grid.most_constrained_cell()
+                branches.append((grid.start_trail(), index, list(grid.get_candidates(index))))
+            # Try the next digit of the deepest branching with digits left, undoing the current branch first
+            while branches:
+                position, index, digits = branches[-1]
+                grid.undo(position)
+                if not digits:
+                    branches.pop()
+                    continue
+                try:
+                    grid.set_value(index, digits.pop(0))
+                    break
+                except ValueError:
+                    continue
+            else:
+                raise ValueError("The grid has no solution.")
+            try:
+                while not grid.is_solved() and self.rule_chain.handle(grid, self.stats):
+                    pass
+                consistent = True
+            except ValueError:
+                consistent = False
+
     def user_input(self):
         """
         Prompt the user to manually input a value when automatic solving is not possible.
         """
         self.user_intervened = True  # User intervention occurred
         self.grid.print_grid()
+        last_index = len(self.grid.cells) - 1
+        size = self.grid.size
         while True:
             try:
-                index = int(input("Enter cell index (0-80): "))
-                if not (0 <= index < 81):
+                index = int(input(f"Enter cell index (0-{last_index}): "))
+                if not (0 <= index <= last_index):
                     raise ValueError()
                 if self.grid.cells[index] != -1:
                     print("Cell is already filled.")
                     continue
-                value = int(input("Enter value (1-9): "))
-                if not (1 <= value <= 9):
+                value = int(input(f"Enter value (1-{size}): "))
+                if not (1 <= value <= size):
                     raise ValueError()
-                self.grid.set_value(index, value)
+                # A value contradicting the grid is undone, and the user is asked again
+                position = self.grid.start_trail()
+                try:
+                    self.grid.set_value(index, value)
+                except ValueError:
+                    self.grid.undo(position)
+                    raise
+                finally:
+                    self.grid.stop_trail()
                 break
             except ValueError:
                 print("Invalid input. Please try again.")
@@ -101,16 +268,27 @@ class SudokuSolver:
         Returns:
             str: A string representing the difficulty level.
         """
-        if not self.grid.is_solved():
+        if not self.grid.is_solved() or self.exact_cover_used or self.search_used:
+            # Grids the rules could not finish on their own
             return "Very Hard"
-        print(f"Used rules: {self.used_rules}")
-        if 'DR1' in self.used_rules and len(self.used_rules) == 1:
+        return self.difficulty_of(self.used_rules)
+
+    @staticmethod
+    def difficulty_of(used_rules):
+        """
+        Map the rules used to solve a grid to a difficulty level.
+        Args:
+            used_rules (set): The names of the rules used.
+        Returns:
+            str: A string representing the difficulty level.
+        """
+        if 'DR1' in used_rules and len(used_rules) == 1:
             return "Simple"
-        elif 'DR4' in self.used_rules or 'DR5' in self.used_rules:
+        elif SudokuSolver.HARD_RULES & set(used_rules):
             return "Hard"
-        elif 'DR3' in self.used_rules:
+        elif 'DR3' in used_rules:
             return "Intermediate"
-        elif 'DR2' in self.used_rules:
+        elif 'DR2' in used_rules:
             return "Easy"
         else:
             return "Not possible to evaluate with current rules"
@@ -0,0 +1,193 @@
+# Author: Noe Florence
+# Description: NumPy engine applying naked singles, hidden singles and peer elimination to many grids at once.
+# NumPy is an optional dependency, only needed by this engine.
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from DifficultyRater import score_of
+from SudokuGrid import SudokuGrid
+from SudokuSolver import SudokuSolver
+
+
+class VectorizedPropagator:
+    """
+    Holds N grids as one boolean candidate tensor of shape (N, 81, 9) and propagates
+    naked singles (DR1), hidden singles (DR2) and peer elimination as whole-batch array operations.
+    Grids that reach a fixpoint or a contradiction are masked out of the following rounds.
+    """
+
+    ACTIVE = 0
+    SOLVED = 1
+    STALLED = 2
+    INVALID = 3
+    STATUS_NAMES = ('active', 'solved', 'stalled', 'invalid')
+
+    # Index tables shared by every instance, built on first use from SudokuGrid's units
+    _units = None       # (27, 9) cells of each unit
+    _cell_units = None  # (81, 3) row, column and block unit of each cell
+    _group_order = None # (3, 81) cells of the rows, columns and blocks, unit after unit
+
+    def __init__(self, grids):
+        """
+        Initialize the engine with a batch of grids.
+        Args:
+            grids (list): Lists of 81 integers representing the grids, with -1 for empty cells.
+        Raises:
+            ImportError: If NumPy is not installed.
+        """
+        if np is None:
+            raise ImportError("VectorizedPropagator requires NumPy.")
+        self._build_tables()
+        values = np.array(grids, dtype=np.int8).reshape(-1, 81)
+        values[values < 0] = 0
+        # values holds the placed digits (0 for empty cells), candidates the remaining digits of each cell
+        self.values = values
+        self.candidates = np.zeros(values.shape + (9,), dtype=bool)
+        self.candidates[values == 0] = True
+        self.status = np.full(len(values), self.ACTIVE, dtype=np.int8)
+        # Whether naked singles (DR1) were used on each grid, and the steps of DR1 and hidden singles (DR2).
+        # As in SudokuGrid, which places the naked singles left by each placement as part of the step,
+        # the naked singles found before any hidden single make one DR1 step, and each round placing
+        # hidden singles is a DR2 step
+        self.naked_used = np.zeros(len(values), dtype=bool)
+        self.naked_steps = np.zeros(len(values), dtype=np.int32)
+        self.hidden_steps = np.zeros(len(values), dtype=np.int32)
+
+    @classmethod
+    def _build_tables(cls):
+        """
+        Build the unit index tables from SudokuGrid's shared units table.
+        """
+        if cls._units is not None:
+            return
+        units = np.array(SudokuGrid.units, dtype=np.intp)
+        cell_units = np.zeros((81, 3), dtype=np.intp)
+        for number, unit in enumerate(units):
+            cell_units[unit, number // 9] = number
+        cls._units = units
+        cls._cell_units = cell_units
+        cls._group_order = units.reshape(3, 81)
+
+    def propagate(self):
+        """
+        Apply the singles and peer elimination to every active grid until each one is solved,
+        stalled or inconsistent. Like the rule chain, hidden singles are only used on a grid
+        when it has no naked single left.
+        """
+        units, cell_units, group_order = self._units, self._cell_units, self._group_order
+        active = np.flatnonzero(self.status == self.ACTIVE)
+        while active.size:
+            values = self.values[active]
+            candidates = self.candidates[active]
+            count = len(active)
+            empty = values == 0
+            # One-hot tensor of the placed digits
+            placed = np.zeros(candidates.shape, dtype=bool)
+            grid_index, cell_index = np.nonzero(~empty)
+            placed[grid_index, cell_index, values[grid_index, cell_index] - 1] = True
+            # Peer elimination: remove every digit already placed in one of the cell's units
+            unit_placed = placed[:, units, :].sum(axis=2)
+            unit_digits = unit_placed > 0
+            candidates &= ~unit_digits[:, cell_units, :].any(axis=2)
+            # Contradictions: a digit twice in a unit, or an empty cell without candidates
+            cell_counts = candidates.sum(axis=2)
+            invalid = (unit_placed > 1).any(axis=(1, 2)) | (empty & (cell_counts == 0)).any(axis=1)
+            solved = ~empty.any(axis=1) & ~invalid
+            # Naked singles (DR1)
+            naked_cells = empty & (cell_counts == 1)
+            has_naked = naked_cells.any(axis=1) & ~invalid
+            placements = candidates & naked_cells[:, :, None]
+            # Hidden singles (DR2), for the grids without naked singles
+            unit_candidates = candidates[:, units, :]
+            unit_counts = unit_candidates.sum(axis=2)
+            invalid |= ((unit_counts == 0) & ~unit_digits).any(axis=(1, 2)) & ~solved
+            hidden_units = unit_candidates & (unit_counts == 1)[:, :, None, :]
+            hidden = np.zeros(candidates.shape, dtype=bool)
+            for group in range(3):
+                hidden[:, group_order[group], :] |= hidden_units[:, group * 9:(group + 1) * 9].reshape(count, 81, 9)
+            invalid |= (hidden.sum(axis=2) > 1).any(axis=1)
+            use_hidden = ~has_naked & hidden.any(axis=(1, 2)) & ~invalid
+            placements[use_hidden] = hidden[use_hidden]
+            progress = has_naked | use_hidden
+            placements[~progress] = False
+            # Place the digits and clear the candidates of the filled cells
+            grid_index, cell_index, digit = np.nonzero(placements)
+            values[grid_index, cell_index] = digit + 1
+            candidates[grid_index, cell_index, :] = False
+            self.values[active] = values
+            self.candidates[active] = candidates
+            self.naked_used[active[has_naked]] = True
+            self.naked_steps[active[has_naked & (self.hidden_steps[active] == 0)]] = 1
+            self.hidden_steps[active[use_hidden]] += 1
+            status = np.full(count, self.ACTIVE, dtype=np.int8)
+            status[~progress] = self.STALLED
+            status[solved] = self.SOLVED
+            status[invalid] = self.INVALID
+            self.status[active] = status
+            active = active[status == self.ACTIVE]
+
+    def status_name(self, k):
+        """
+        Get the status of a grid.
+        Args:
+            k (int): The position of the grid in the batch.
+        Returns:
+            str: 'active', 'solved', 'stalled' or 'invalid'.
+        """
+        return self.STATUS_NAMES[self.status[k]]
+
+    def grid_values(self, k):
+        """
+        Get the current cell values of a grid.
+        Args:
+            k (int): The position of the grid in the batch.
+        Returns:
+            list: A list of 81 integers, with -1 for empty cells.
+        """
+        return [int(value) if value else -1 for value in self.values[k]]
+
+    def used_rules(self, k):
+        """
+        Get the rules used so far on a grid.
+        Args:
+            k (int): The position of the grid in the batch.
+        Returns:
+            set: The names of the rules used.
+        """
+        return set(self.steps(k))
+
+    def steps(self, k):
+        """
+        Get the number of steps of each rule applied so far to a grid.
+        Args:
+            k (int): The position of the grid in the batch.
+        Returns:
+            dict: The number of steps of each rule used, keyed by rule name.
+        """
+        steps = {}
+        if self.naked_used[k]:
+            steps['DR1'] = int(self.naked_steps[k])
+        if self.hidden_steps[k]:
+            steps['DR2'] = int(self.hidden_steps[k])
+        return steps
+
+    def result(self, k, index):
+        """
+        Build the batch result of a grid, in the format of BatchSolver.solve_grid.
+        Args:
+            k (int): The position of the grid in the batch.
+            index (int): The position of the grid in the whole input.
+        Returns:
+            dict: The index, status, difficulty, rules used, cells and score of the grid, the score being
+                  computed from the steps (see steps) and None for an inconsistent or stalled grid.
+        """
+        status = self.status_name(k)
+        steps = self.steps(k)
+        if status == 'stalled':
+            status = 'unsolved'
+        difficulty = SudokuSolver.difficulty_of(set(steps)) if status == 'solved' else None
+        return {'index': index, 'status': status, 'difficulty': difficulty, 'rules': sorted(steps),
+                'cells': self.grid_values(k), 'score': score_of(steps) if status == 'solved' else None}
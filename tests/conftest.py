@@ -0,0 +1,50 @@
+# Author: Noe Florence
+# Description: Shared setup of the tests: the modules of src are imported by name, as Main.py imports them,
+# and the example grids are read with their difficulty level as the baseline solver labels them.
+
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, SRC_DIR)
+
+EXAMPLE_DIR = os.path.join(SRC_DIR, 'example')
+
+# Difficulty level of each example grid, as printed by the baseline solver
+EXAMPLE_LABELS = {
+    'simple.txt': "Simple",
+    'Easy1.txt': "Easy",
+    'Easy2.txt': "Easy",
+    'Intermediate1.txt': "Intermediate",
+    'Intermediate2.txt': "Intermediate",
+    'Hard1.txt': "Hard",
+    'Hard2.txt': "Hard",
+}
+
+
+def example_values(name):
+    """
+    Read an example grid.
+    Args:
+        name (str): The file name of the grid in the example folder.
+    Returns:
+        list: The cell values, with -1 for empty cells.
+    """
+    from Main import parse_input
+    return parse_input(os.path.join(EXAMPLE_DIR, name))
+
+
+def is_solution(values, cells):
+    """
+    Check that cells hold a full, valid grid keeping the givens of values.
+    Args:
+        values (list): The initial cell values, with -1 for empty cells.
+        cells (list): The cell values of the solution.
+    Returns:
+        bool: True if every unit holds each digit once and the givens are unchanged, False otherwise.
+    """
+    from SudokuGrid import SudokuGrid
+    units = SudokuGrid.topology_of(SudokuGrid.box_size_of(len(cells)))['units']
+    size = len(units[0])
+    return all(sorted(cells[index] for index in unit) == list(range(1, size + 1)) for unit in units) and \
+        all(given in (-1, cell) for given, cell in zip(values, cells))
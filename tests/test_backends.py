@@ -0,0 +1,70 @@
+# Author: Noe Florence
+# Description: Every backend solves the example grids with the difficulty level the baseline solver gives them,
+# one grid at a time and in batch mode.
+
+import pytest
+
+from conftest import EXAMPLE_LABELS, example_values, is_solution
+
+from BatchSolver import BatchSolver
+from DeductionRuleFactory import DeductionRuleFactory
+from ParallelSearch import ParallelSearch
+from SudokuGrid import SudokuGrid
+from SudokuSolver import SudokuSolver
+
+BACKENDS = [
+    ('rules', {}),
+    ('dlx', {}),
+    ('search', {}),
+    ('parallel', {'processes': 2}),
+]
+
+
+@pytest.mark.parametrize('backend, options', BACKENDS, ids=[backend for backend, _ in BACKENDS])
+@pytest.mark.parametrize('name', list(EXAMPLE_LABELS))
+def test_backend_solves_examples(name, backend, options):
+    values = example_values(name)
+    grid = SudokuGrid(values)
+    solver = SudokuSolver(grid, backend, interactive=False, **options)
+    assert solver.apply_rules()
+    assert is_solution(values, grid.cells)
+    assert solver.evaluate_difficulty() == EXAMPLE_LABELS[name]
+
+
+@pytest.mark.parametrize('vectorized', [False, True])
+@pytest.mark.parametrize('backend', ['rules', 'dlx', 'search'])
+def test_batch_solves_examples(backend, vectorized):
+    if vectorized:
+        pytest.importorskip('numpy')
+    grids = [example_values(name) for name in EXAMPLE_LABELS]
+    results = list(BatchSolver(backend, processes=1, vectorized=vectorized).solve(grids))
+    assert [result['index'] for result in results] == list(range(len(grids)))
+    for values, result, label in zip(grids, results, EXAMPLE_LABELS.values()):
+        assert result['status'] == 'solved'
+        assert is_solution(values, result['cells'])
+        assert result['difficulty'] == label
+
+
+# With naked singles alone the rules stall, and the searches and the workers of the parallel backend run
+@pytest.mark.parametrize('backend, options', BACKENDS[1:], ids=[backend for backend, _ in BACKENDS[1:]])
+@pytest.mark.parametrize('name', ['Hard1.txt', 'Hard2.txt'])
+def test_backend_finishes_stalled_rules(name, backend, options):
+    values = example_values(name)
+    grid = SudokuGrid(values)
+    rule_chain = DeductionRuleFactory.create_scheduler(['DR1'])
+    solver = SudokuSolver(grid, backend, rule_chain, interactive=False, rule_names=['DR1'], **options)
+    assert solver.apply_rules()
+    assert is_solution(values, grid.cells)
+    assert solver.evaluate_difficulty() == "Very Hard"
+
+
+@pytest.mark.parametrize('name', ['Hard1.txt', 'Hard2.txt'])
+def test_parallel_workers_check_uniqueness(name):
+    # A single split level leaves the subtrees to the worker processes, which search them to the end
+    values = example_values(name)
+    search = ParallelSearch(2, ['DR1'], split_factor=1, max_split_depth=1)
+    result = search.solve(values, 2)
+    assert result['complete'] and result['nodes'] > 0
+    assert len(result['solutions']) == 1
+    assert is_solution(values, result['solutions'][0])
+    assert search.is_unique(values)
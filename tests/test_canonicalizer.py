@@ -0,0 +1,99 @@
+# Author: Noe Florence
+# Description: Canonicalizer checks: transforms map grids back and forth, and grids equal up to symmetry
+# share their canonical form.
+
+import random
+
+import pytest
+
+from conftest import EXAMPLE_LABELS, example_values
+
+from Canonicalizer import canonicalize
+from SudokuGrid import SudokuGrid
+from SudokuSolver import SudokuSolver
+
+
+def symmetric_copy(values, rng):
+    """
+    Apply a random symmetry of the 9x9 grid: band, stack, row and column permutations, transposition
+    and digit relabeling.
+    Args:
+        values (list): The 81 cell values, with -1 for empty cells.
+        rng (Random): The random generator.
+    Returns:
+        list: The cell values of the copy.
+    """
+    def lines():
+        bands = rng.sample(range(3), 3)
+        return [band * 3 + line for band in bands for line in rng.sample(range(3), 3)]
+
+    rows, columns = lines(), lines()
+    transpose = rng.random() < 0.5
+    relabel = [-1] + rng.sample(range(1, 10), 9)
+    copy = []
+    for row in range(9):
+        for column in range(9):
+            if transpose:
+                index = columns[column] * 9 + rows[row]
+            else:
+                index = rows[row] * 9 + columns[column]
+            value = values[index]
+            copy.append(-1 if value == -1 else relabel[value])
+    return copy
+
+
+def solution_of(values):
+    grid = SudokuGrid(values)
+    SudokuSolver(grid, 'dlx', interactive=False).apply_rules()
+    return grid.cells[:]
+
+
+@pytest.mark.parametrize('name', list(EXAMPLE_LABELS))
+def test_transform_round_trip(name):
+    values = example_values(name)
+    canonical, transform = canonicalize(values)
+    assert transform.apply(values) == canonical
+    assert transform.invert(canonical) == values
+    # A result computed in the canonical frame maps back onto the grid: its solution keeps the givens
+    solution = solution_of(values)
+    assert transform.invert(transform.apply(solution)) == solution
+
+
+@pytest.mark.parametrize('name', list(EXAMPLE_LABELS))
+def test_canonical_form_is_shared_by_symmetric_grids(name):
+    values = example_values(name)
+    canonical, _ = canonicalize(values)
+    rng = random.Random(name)
+    for _ in range(5):
+        copy = symmetric_copy(values, rng)
+        copy_canonical, transform = canonicalize(copy)
+        assert copy_canonical == canonical
+        assert transform.invert(copy_canonical) == copy
+
+
+def test_canonical_solution_solves_symmetric_grid():
+    values = example_values('Hard2.txt')
+    copy = symmetric_copy(values, random.Random(1))
+    _, transform = canonicalize(values)
+    _, copy_transform = canonicalize(copy)
+    # The solution of one grid, through the canonical frame, is the solution of the other
+    solution = copy_transform.invert(transform.apply(solution_of(values)))
+    assert solution == solution_of(copy)
+
+
+def test_other_sizes_are_their_own_canonical_form():
+    values = [-1] * 16
+    values[0], values[5] = 1, 3
+    canonical, transform = canonicalize(values)
+    assert canonical == values
+    assert transform.invert(transform.apply(values)) == values
+
+
+def test_nearly_empty_grid_is_bounded():
+    # Grids with many symmetries keep at most MAX_PARTIALS partial transforms, and still map back
+    values = [-1] * 81
+    values[0] = 5
+    canonical, transform = canonicalize(values)
+    assert canonical.count(-1) == 80
+    assert transform.invert(canonical) == values
+
@@ -0,0 +1,123 @@
+# Author: Noe Florence
+# Description: Round trips of the binary file formats: packed corpora, results files and deduction traces.
+
+import pytest
+
+from conftest import EXAMPLE_LABELS, example_values, is_solution
+
+from BatchSolver import solve_grid
+from DeductionRuleFactory import DeductionRuleFactory
+from DeductionTrace import DeductionTrace
+from PuzzleCorpus import PuzzleCorpus
+from ResultsFile import ResultsFile
+from SolutionCache import SolutionCache
+from SudokuGrid import SudokuGrid
+from SudokuSolver import SudokuSolver
+
+
+def example_grids():
+    return [example_values(name) for name in EXAMPLE_LABELS]
+
+
+def test_corpus_round_trip(tmp_path):
+    grids = example_grids() + [[-1] * 81]
+    path = str(tmp_path / 'grids.sdk')
+    assert PuzzleCorpus.write(path, grids) == len(grids)
+    assert PuzzleCorpus.is_corpus(path)
+    with PuzzleCorpus(path) as corpus:
+        assert len(corpus) == len(grids)
+        assert list(corpus) == grids
+        assert corpus[-1] == grids[-1]
+        with pytest.raises(IndexError):
+            corpus[len(grids)]
+
+
+def test_corpus_round_trip_one_cell_per_byte(tmp_path):
+    # 16x16 grids hold values up to 16, beyond a nibble
+    values = [-1] * 256
+    values[0], values[17], values[255] = 16, 1, 9
+    path = str(tmp_path / 'grids16.sdk')
+    PuzzleCorpus.write(path, [values])
+    with PuzzleCorpus(path) as corpus:
+        assert corpus.bits == 8
+        assert corpus[0] == values
+
+
+def test_corpus_rejects_other_files(tmp_path):
+    path = tmp_path / 'grids.sdk'
+    PuzzleCorpus.write(str(path), example_grids())
+    data = path.read_bytes()
+    path.write_bytes(data[:-1])
+    with pytest.raises(ValueError):
+        PuzzleCorpus(str(path))
+    path.write_bytes(b'not a corpus')
+    assert not PuzzleCorpus.is_corpus(str(path))
+    with pytest.raises(ValueError):
+        PuzzleCorpus(str(path))
+
+
+def test_results_file_round_trip(tmp_path):
+    grids = example_grids()
+    # An inconsistent grid has no score and no difficulty
+    invalid = grids[0][:]
+    invalid[invalid.index(-1)] = next(value for value in grids[0] if value != -1)
+    grids.append(invalid)
+    settings = SolutionCache.namespace_of('dlx')
+    path = str(tmp_path / 'run.sdr')
+    rule_chain = DeductionRuleFactory().create_rules()
+    solved = [solve_grid((k, values, ()), rule_chain, 'dlx', collect_stats=True) for k, values in enumerate(grids)]
+    with ResultsFile.open_for(path, grids, settings) as results:
+        assert len(results) == len(grids) and results.done_count() == 0
+        for result in solved:
+            results.write(result)
+        results.checkpoint(range(len(grids) - 1))
+    with ResultsFile.open_for(path, grids, settings) as results:
+        assert results.done_count() == len(grids) - 1
+        assert not results.is_done(len(grids) - 1)
+        for result, record in zip(solved, results):
+            for field in ('index', 'status', 'difficulty', 'rules', 'cells'):
+                assert record[field] == result[field]
+            score = result.get('score')
+            assert record['score'] == (None if score is None else pytest.approx(score))
+            for rule, counters in record['stats'].items():
+                assert counters['firings'] == result['stats'][rule]['firings']
+        assert results[-1]['status'] == 'invalid' and results[-1]['score'] is None
+
+
+def test_results_file_refuses_other_runs(tmp_path):
+    grids = example_grids()
+    path = str(tmp_path / 'run.sdr')
+    ResultsFile.open_for(path, grids, SolutionCache.namespace_of('dlx')).close()
+    with pytest.raises(ValueError):
+        ResultsFile.open_for(path, grids, SolutionCache.namespace_of('search'))
+    with pytest.raises(ValueError):
+        ResultsFile.open_for(path, grids[1:], SolutionCache.namespace_of('dlx'))
+
+
+# With naked singles alone, the rules stall and the search records its own step
+@pytest.mark.parametrize('backend, rule_names', [('rules', None), ('search', ['DR1'])])
+def test_trace_round_trip(tmp_path, backend, rule_names):
+    values = example_values('Hard1.txt')
+    path = str(tmp_path / 'solve.trc')
+    grid = SudokuGrid(values)
+    rule_chain = DeductionRuleFactory.create_scheduler(rule_names) if rule_names else None
+    with DeductionTrace(grid, path) as trace:
+        assert SudokuSolver(grid, backend, rule_chain, interactive=False).apply_rules()
+    loaded = DeductionTrace.load(path)
+    assert len(loaded) == len(trace) > 0
+    assert loaded.start == values
+    assert list(loaded.steps()) == list(trace.steps())
+    assert (backend in [rule for rule, _ in loaded.steps()]) == (backend == 'search')
+    # Replaying every step on the starting values leads to the solution the solver found
+    replayed = None
+    for _, _, replayed in loaded.replay():
+        pass
+    assert replayed.cells == grid.cells
+    assert is_solution(values, replayed.cells)
+
+
+def test_trace_rejects_other_files(tmp_path):
+    path = tmp_path / 'solve.trc'
+    path.write_bytes(b'SDKR')
+    with pytest.raises(ValueError):
+        DeductionTrace.load(str(path))